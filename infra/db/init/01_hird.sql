@@ -210,6 +210,21 @@ CREATE TABLE public.features (
 COMMENT ON TABLE public.features IS
     'Aggregated feature store combining housing, rent, economic, demographic, and macro data by city, month, and property type.';
 
+-- ------------------------------------------------------------
+-- ETL watermarks
+-- Purpose: High-water marks per (job, source table) so incremental
+--          ETL runs only reprocess rows ingested since the last run.
+-- ------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS public.etl_watermarks (
+    job             TEXT NOT NULL,          -- e.g. 'features_build_etl'
+    source          TEXT NOT NULL,          -- source table name
+    watermark_ts    TIMESTAMPTZ,            -- max ingestion timestamp seen
+    watermark_date  DATE,                   -- max observation date seen
+    updated_at      TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (job, source)
+);
+
 -- Migration V5: Create model_features table
 -- ----------------------------------------------------------
 -- Holds normalized, model-ready features derived from public.features
@@ -270,14 +285,38 @@ CREATE TABLE public.model_features (
     processed_at TIMESTAMP WITH TIME ZONE
 );
 
+-- Running per-city z-score state for model_features (Welford / Chan merge).
+-- Lets the incremental ETL fold new months into mean/std without
+-- re-reading history; n counts non-null values of the feature.
+CREATE TABLE IF NOT EXISTS public.model_features_zstate (
+    city TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    n BIGINT NOT NULL,
+    mean DOUBLE PRECISION NOT NULL,
+    m2 DOUBLE PRECISION NOT NULL,        -- sum of squared deviations
+    last_date DATE,                      -- last month folded into the state
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (city, feature)
+);
+
 
 -- -----------------------------------------------------------------------------
 -- Serving-layer predictions cache
 -- This table stores pre-computed forecasts to serve the API.
+--
+-- Declaratively partitioned in two levels so that old runs can be retired with
+-- DETACH/DROP PARTITION instead of a bulk DELETE:
+--   1. LIST (model_name)  -> one partition per model family (forecast vs backtest)
+--   2. RANGE (created_at) -> one sub-partition per run month
+-- API reads always filter on model_name, so the planner prunes to a single
+-- family. The value lists below are the bootstrap set; new model names are
+-- added by public.set_model_family(). Monthly sub-partitions are created by
+-- public.ensure_run_partitions(); ml/pipelines/partition_retention.py keeps
+-- them ahead of the calendar and drops expired months.
 -- -----------------------------------------------------------------------------
 
 CREATE TABLE IF NOT EXISTS public.model_predictions (
-  run_id              UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  run_id              UUID DEFAULT gen_random_uuid(),
   model_name          TEXT NOT NULL,
   target              TEXT NOT NULL,
   horizon_months      INTEGER NOT NULL,
@@ -296,17 +335,45 @@ CREATE TABLE IF NOT EXISTS public.model_predictions (
   y_true              DOUBLE PRECISION,
   features_version    TEXT,
   model_artifact_uri  TEXT,
-  created_at          TIMESTAMPTZ DEFAULT now(),
-  is_micro            BOOLEAN
-);
+  created_at          TIMESTAMPTZ NOT NULL DEFAULT now(),
+  is_micro            BOOLEAN,
+  -- Partition keys must be part of the primary key
+  PRIMARY KEY (run_id, model_name, created_at)
+) PARTITION BY LIST (model_name);
+
+-- Model families (level 1), each sub-partitioned by run month (level 2)
+CREATE TABLE IF NOT EXISTS public.model_predictions_arima
+  PARTITION OF public.model_predictions
+  FOR VALUES IN ('arima', 'arima1')
+  PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS public.model_predictions_prophet
+  PARTITION OF public.model_predictions
+  FOR VALUES IN ('prophet', 'Prophet')
+  PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS public.model_predictions_lstm
+  PARTITION OF public.model_predictions
+  FOR VALUES IN ('lstm')
+  PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS public.model_predictions_backtest
+  PARTITION OF public.model_predictions
+  FOR VALUES IN (
+    'arima_backtest', 'prophet_backtest', 'lstm_backtest', 'naive_backtest'
+  )
+  PARTITION BY RANGE (created_at);
+
+-- Catch-all for ad-hoc / experimental model names
+CREATE TABLE IF NOT EXISTS public.model_predictions_other
+  PARTITION OF public.model_predictions
+  DEFAULT
+  PARTITION BY RANGE (created_at);
 
 CREATE INDEX IF NOT EXISTS idx_model_predictions_city_horizon_date
 ON public.model_predictions (city, target, horizon_months, predict_date);
 
 
-
-
-
 -- ------------------------------------------------------------
 -- Migration: V4__macro_economic_data.sql
 -- Purpose : Create table for GDP growth and CPI YoY
@@ -388,20 +455,162 @@ CREATE TABLE IF NOT EXISTS public.risk_predictions (
 CREATE INDEX IF NOT EXISTS idx_risk_predictions_city_date
   ON public.risk_predictions(city, predict_date);
 
+-- Partitioned by run month only: there is a single detector family
+-- (isolation_forest), so a model_name level would add nothing.
 CREATE TABLE IF NOT EXISTS public.anomaly_signals (
-  run_id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  run_id UUID DEFAULT gen_random_uuid(),
   city TEXT NOT NULL,
   target TEXT NOT NULL,            -- "price" or "rent"
   detect_date DATE NOT NULL,
   anomaly_score NUMERIC(14,4),
   is_anomaly BOOLEAN DEFAULT false,
   model_name TEXT,
-  created_at TIMESTAMPTZ DEFAULT now()
-);
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (run_id, created_at)
+) PARTITION BY RANGE (created_at);
 
 CREATE INDEX IF NOT EXISTS idx_anomaly_signals_city_target_date
   ON public.anomaly_signals(city, target, detect_date);
 
+-- -----------------------------------------------------------------------------
+-- Run-month partition maintenance
+-- The range-partitioned run tables are every model family of model_predictions
+-- plus anomaly_signals (read from the catalog, so new families are covered).
+-- ensure_run_partitions() creates (idempotently) each table's sub-partition for
+-- p_month plus a DEFAULT sub-partition as a safety net. If the DEFAULT already
+-- holds rows for that month it is detached, the month partition is created,
+-- those rows are moved into it and the DEFAULT is re-attached.
+-- Naming: <parent>_pYYYY_MM, e.g. model_predictions_arima_p2025_11.
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION public.run_partition_parents()
+RETURNS SETOF TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT c.relname::text
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'public.model_predictions'::regclass
+      AND c.relkind = 'p'
+    UNION ALL
+    SELECT 'anomaly_signals'
+$$;
+
+CREATE OR REPLACE FUNCTION public.ensure_run_partitions(p_month DATE)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    parent      TEXT;
+    part        TEXT;
+    dflt        TEXT;
+    has_rows    BOOLEAN;
+    month_start DATE := date_trunc('month', p_month)::date;
+    month_end   DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+BEGIN
+    FOR parent IN SELECT public.run_partition_parents()
+    LOOP
+        dflt := parent || '_default';
+        part := parent || to_char(month_start, '"_p"YYYY_MM');
+
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.%I DEFAULT',
+            dflt, parent
+        );
+        CONTINUE WHEN to_regclass(format('public.%I', part)) IS NOT NULL;
+
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM public.%I '
+            'WHERE created_at >= %L AND created_at < %L)',
+            dflt, month_start, month_end
+        ) INTO has_rows;
+
+        IF has_rows THEN
+            -- the DEFAULT would violate the new bound: take it out while its
+            -- rows for the month move into the new partition
+            EXECUTE format(
+                'ALTER TABLE public.%I DETACH PARTITION public.%I', parent, dflt
+            );
+        END IF;
+
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.%I '
+            'FOR VALUES FROM (%L) TO (%L)',
+            part, parent, month_start, month_end
+        );
+
+        IF has_rows THEN
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM public.%I '
+                'WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO public.%I SELECT * FROM moved',
+                dflt, month_start, month_end, part
+            );
+            EXECUTE format(
+                'ALTER TABLE public.%I ATTACH PARTITION public.%I DEFAULT',
+                parent, dflt
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
+
+-- -----------------------------------------------------------------------------
+-- Model family values
+-- The LIST bounds above are only the bootstrap set. The families and their
+-- model names are owned by ml/pipelines/partition_retention.py
+-- (MODEL_FAMILIES), which calls set_model_family() for every family whose
+-- bound lacks a configured name. The family partition is detached, rows for
+-- p_names are moved out of the catch-all model_predictions_other, and it is
+-- re-attached with p_names as its value list. A new family gets a new
+-- partition (with a DEFAULT run-month sub-partition).
+-- -----------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION public.set_model_family(p_family TEXT, p_names TEXT[])
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    part  TEXT := 'model_predictions_' || p_family;
+    bound TEXT := (SELECT string_agg(quote_literal(n), ', ') FROM unnest(p_names) n);
+BEGIN
+    IF to_regclass(format('public.%I', part)) IS NOT NULL THEN
+        EXECUTE format(
+            'ALTER TABLE public.model_predictions DETACH PARTITION public.%I', part
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE public.%I (LIKE public.model_predictions INCLUDING DEFAULTS) '
+            'PARTITION BY RANGE (created_at)',
+            part
+        );
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.%I DEFAULT',
+            part || '_default', part
+        );
+    END IF;
+
+    CREATE TEMP TABLE _hird_moved (LIKE public.model_predictions);
+    WITH moved AS (
+        DELETE FROM public.model_predictions_other
+        WHERE model_name = ANY(p_names)
+        RETURNING *
+    )
+    INSERT INTO _hird_moved SELECT * FROM moved;
+
+    EXECUTE format(
+        'ALTER TABLE public.model_predictions ATTACH PARTITION public.%I '
+        'FOR VALUES IN (%s)',
+        part, bound
+    );
+    INSERT INTO public.model_predictions SELECT * FROM _hird_moved;
+    DROP TABLE _hird_moved;
+END;
+$$;
+
+-- Bootstrap: current month plus two months ahead
+SELECT public.ensure_run_partitions((date_trunc('month', now()) + make_interval(months => m))::date)
+FROM generate_series(0, 2) AS m;
+
 DROP TABLE IF EXISTS public.model_comparison;
 
 CREATE TABLE public.model_comparison (
@@ -419,3 +628,50 @@ CREATE TABLE public.model_comparison (
     PRIMARY KEY (city, target, horizon_months, model_name)
 );
 
+
+-- -----------------------------------------------------------------------------
+-- Backtest results
+-- Narrow store for backtest forecasts (one row per model/city/target/origin/
+-- horizon), written with COPY by the backtest scripts and backtest_engine and
+-- read by compare_models. Replaces the wide backtest rows in model_predictions:
+-- no UUIDs, timestamps or property filters, float4 values, smallint horizon.
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS public.backtest_results (
+    model_name      TEXT     NOT NULL,
+    city            TEXT     NOT NULL,
+    target          TEXT     NOT NULL,
+    origin          DATE     NOT NULL,
+    horizon_months  SMALLINT NOT NULL,
+    predict_date    DATE     NOT NULL,
+    yhat            REAL     NOT NULL,
+    yhat_lower      REAL,
+    yhat_upper      REAL,
+    y_true          REAL     NOT NULL,
+
+    CONSTRAINT backtest_results_pkey
+        PRIMARY KEY (model_name, city, target, origin, horizon_months)
+);
+
+
+-- -----------------------------------------------------------------------------
+-- Pipeline runs
+-- Stage timings written by ml/src/utils/profiling.py (HIRD_PROFILE_SINK=db):
+-- one row per stage (load / fit / predict / write ...) of a training run,
+-- labelled with model/city/target where the stage belongs to one series.
+-- process_peak_rss_mb is the process's lifetime peak RSS when the stage ended.
+-- -----------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS public.pipeline_runs (
+    run_name        TEXT        NOT NULL,
+    run_started_at  TIMESTAMPTZ NOT NULL,
+    stage           TEXT        NOT NULL,
+    model           TEXT,
+    city            TEXT,
+    target          TEXT,
+    wall_s          REAL        NOT NULL,
+    cpu_s           REAL,
+    process_peak_rss_mb REAL,
+    started_at      TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_run
+    ON public.pipeline_runs (run_name, run_started_at);
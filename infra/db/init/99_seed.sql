@@ -69,7 +69,8 @@ INSERT INTO public.construction_permits (
 ON CONFLICT (permit_id) DO NOTHING;
 
 -- 9) Serving-layer predictions cache (two months)
--- Note: your schema set PRIMARY KEY on run_id (UUID DEFAULT gen_random_uuid()).
+-- Note: model_predictions is partitioned, so its PRIMARY KEY is
+-- (run_id, model_name, created_at); 'synthetic_v1' lands in the DEFAULT family.
 -- We provide explicit UUIDs via uuid-ossp (uuid_generate_v4()) which is enabled in your DDL.
 -- 9) Serving-layer predictions cache (seeded from JSON structure)
 INSERT INTO public.model_predictions (
@@ -86,7 +87,7 @@ INSERT INTO public.model_predictions (
      2, 2, 800, 1200, 2000, 2025,
      '2025-10-01', 750000.0000, 720000.0000, 780000.0000, 'feat-v1',
      'synthetic', now())
-ON CONFLICT (run_id) DO NOTHING;
+ON CONFLICT DO NOTHING;
 
 
 COMMIT;
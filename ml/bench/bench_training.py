@@ -0,0 +1,178 @@
+"""
+bench_training.py
+------------------------------------------------------------------
+Offline benchmark for model training throughput: ARIMA and Prophet
+forecast_city_target and LSTM forecast_city on synthetic panels shaped like
+public.model_features (N cities x M months with macro regressors).
+
+Every (city, target) series is one job on the shared training executor,
+exactly as in the trainers' main(). Reported per model family:
+
+    fits/s      series fit + forecast per wall-clock second
+    fit/predict per-series latency (median and p95) from profiling stages
+    peak RSS    highest peak resident set size seen by a job
+
+No database, S3 bucket or ARIMA registry is touched: the engine is an
+in-memory SQLite URL, the artifact store is disabled and the registry points
+at a temporary directory, so every series is a cold fit.
+
+With --workers 1 all jobs run in this process, so peak RSS accumulates
+across model families; bench one family at a time for isolated numbers.
+
+Usage:
+    python -m ml.bench.bench_training
+    python -m ml.bench.bench_training --cities 16 --months 120 --models arima
+    python -m ml.bench.bench_training --models lstm --workers 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Trainer modules build an engine at import time; give them an inert one and
+# keep every fit local (inherited by spawned workers).
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("NEON_DATABASE_URL", "sqlite://")
+os.environ["HIRD_ARTIFACT_STORE"] = "0"
+os.environ["HIRD_PROFILE_SINK"] = "none"
+os.environ.setdefault("HIRD_ARIMA_REGISTRY_DIR", tempfile.mkdtemp(prefix="hird-"))
+
+from ml.src.models.training_executor import run_jobs  # noqa: E402
+
+TARGETS = [
+    ("hpi_benchmark", "price"),
+    ("rent_avg_city", "rent"),
+]
+MACRO_COLS = ["mortgage_rate", "unemployment_rate", "cpi_yoy"]
+
+
+def synthetic_panel(n_cities: int, n_months: int, seed: int = 0) -> pd.DataFrame:
+    """Trending price/rent series per city plus shared macro drivers."""
+    rng = np.random.default_rng(seed)
+    months = pd.date_range(end="2025-08-01", periods=n_months, freq="MS")
+    frames = []
+
+    macro = {
+        "mortgage_rate": 5 + rng.normal(0, 0.1, n_months).cumsum(),
+        "unemployment_rate": 6 + rng.normal(0, 0.1, n_months).cumsum(),
+        "cpi_yoy": 2 + rng.normal(0, 0.2, n_months),
+    }
+    for i in range(n_cities):
+        df = pd.DataFrame({"date": months, "city": f"City_{i:04d}", **macro})
+        growth = rng.normal(0.004, 0.01, n_months)
+        df["hpi_benchmark"] = 300 * (1 + rng.uniform(0, 1)) * np.cumprod(1 + growth)
+        df["rent_avg_city"] = 1500 * np.cumprod(1 + growth / 2)
+
+        hpi = df["hpi_benchmark"]
+        df["roll_3"] = hpi.rolling(3, min_periods=1).mean()
+        df["roll_6"] = hpi.rolling(6, min_periods=1).mean()
+        for col in MACRO_COLS + ["roll_3", "roll_6"]:
+            df[f"{col}_z"] = (df[col] - df[col].mean()) / (df[col].std() + 1e-6)
+        frames.append(df.drop(columns=["roll_3", "roll_6"]))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+# ---------------------------------------------------------
+# Jobs per model family (same shapes as the trainers' main())
+# ---------------------------------------------------------
+def arima_jobs(panel):
+    from ml.src.models.forecasting import train_model_arima as m
+
+    jobs = [
+        ((city, name), (g, city, col, name))
+        for city, g in panel.groupby("city", sort=False)
+        for col, name in TARGETS
+    ]
+    return m.forecast_city_target, jobs, None
+
+
+def prophet_jobs(panel):
+    from ml.src.models.forecasting import prophet_runner
+    from ml.src.models.forecasting import train_model_prophet as m
+
+    jobs = [
+        ((city, name), (g, city, col, name))
+        for city, g in panel.groupby("city", sort=False)
+        for col, name in TARGETS
+    ]
+    return m.forecast_city_target, jobs, prophet_runner.warmup
+
+
+def lstm_jobs(panel):
+    from ml.src.models.forecasting import train_model_lstm as m
+
+    jobs = [
+        ((city, name), (g, col, name, [col] + m.MACRO_COLS))
+        for city, g in panel.groupby("city", sort=False)
+        for col, name in TARGETS
+    ]
+    return m.forecast_city, jobs, None
+
+
+MODELS = {
+    "arima": arima_jobs,
+    "prophet": prophet_jobs,
+    "lstm": lstm_jobs,
+}
+
+
+# ---------------------------------------------------------
+# Run + report
+# ---------------------------------------------------------
+def _stage_secs(results, name):
+    return np.array(
+        [s.wall_s for r in results if r.ok for s in r.stages if s.stage == name]
+    )
+
+
+def bench_model(name, panel, workers):
+    fn, jobs, initializer = MODELS[name](panel)
+
+    t0 = time.perf_counter()
+    results = run_jobs(fn, jobs, max_workers=workers, initializer=initializer)
+    wall = time.perf_counter() - t0
+
+    ok = [r for r in results if r.ok and r.value is not None]
+    fit, predict = _stage_secs(results, "fit"), _stage_secs(results, "predict")
+    return {
+        "model": name,
+        "series": len(jobs),
+        "ok": len(ok),
+        "wall_s": wall,
+        "fits_per_s": len(ok) / wall if wall else float("nan"),
+        "fit_p50_s": np.median(fit) if fit.size else float("nan"),
+        "fit_p95_s": np.percentile(fit, 95) if fit.size else float("nan"),
+        "predict_p50_s": np.median(predict) if predict.size else float("nan"),
+        "cpu_s": sum(r.cpu_seconds for r in results),
+        "peak_rss_mb": max((r.process_peak_rss_mb for r in results), default=0.0),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--cities", type=int, default=4)
+    p.add_argument("--months", type=int, default=248)
+    p.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    p.add_argument("--workers", type=int, default=1)
+    args = p.parse_args()
+
+    panel = synthetic_panel(args.cities, args.months)
+    print(
+        f"[INFO] Panel: {args.cities} cities x {args.months} months, "
+        f"{args.cities * len(TARGETS)} series per model"
+    )
+
+    rows = [bench_model(m, panel, args.workers) for m in args.models]
+
+    report = pd.DataFrame(rows).set_index("model").round(3)
+    print(f"[RESULT] workers={args.workers}")
+    print(report.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Partition maintenance + retention for run tables
+------------------------------------------------
+model_predictions (LIST model family -> RANGE created_at) and anomaly_signals
+(RANGE created_at) are partitioned by run month, see infra/db/init/01_hird.sql.
+
+This job:
+1. Brings the model-family LIST bounds in line with MODEL_FAMILIES
+   (public.set_model_family), so known model names never land in the
+   catch-all family.
+2. Creates the run-month partitions for the current month and N months ahead
+   (public.ensure_run_partitions), so inserts never fall into DEFAULT.
+3. Detaches and drops month partitions older than the retention window —
+   cheap metadata operations instead of DELETE + VACUUM. The month holding a
+   model's latest run is always kept, so a model that has not been retrained
+   within the window keeps its live forecasts.
+
+Usage:
+    python -m ml.pipelines.partition_retention --keep-months 6
+    python -m ml.pipelines.partition_retention --keep-months 6 --dry-run
+"""
+
+import argparse
+import datetime as dt
+import re
+
+import pandas as pd
+from sqlalchemy import text
+
+from ml.src.etl.db import get_engine
+
+# model_predictions LIST partitions: family -> model_name values.
+# Names not listed here go to the catch-all model_predictions_other.
+# Backtests are written to public.backtest_results, so the DDL's
+# model_predictions_backtest family is not synced; it only holds rows from
+# before that table and ages out under --keep-backtest-months.
+MODEL_FAMILIES = {
+    "arima": ["arima", "arima1"],
+    "prophet": ["prophet", "Prophet"],
+    "lstm": ["lstm"],
+}
+
+BACKTEST_PARENTS = {"model_predictions_backtest"}
+
+_MONTH_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+_LIST_VALUE = re.compile(r"'((?:[^']|'')*)'")
+
+# Range-partitioned parents managed by public.ensure_run_partitions()
+_PARENTS_SQL = "SELECT public.run_partition_parents()"
+
+
+def _month_start(d: dt.date) -> dt.date:
+    return d.replace(day=1)
+
+
+def _add_months(d: dt.date, months: int) -> dt.date:
+    return (pd.Timestamp(d) + pd.DateOffset(months=months)).date()
+
+
+def _partition_month(name: str):
+    m = _MONTH_SUFFIX.search(name)
+    return dt.date(int(m.group(1)), int(m.group(2)), 1) if m else None
+
+
+# ---------------------------------------------------------
+# MODEL FAMILIES
+# ---------------------------------------------------------
+def parse_list_bound(bound: str):
+    """Values of a "FOR VALUES IN ('a', 'b')" bound; None for DEFAULT."""
+    if not bound or "IN (" not in bound:
+        return None
+    return {v.replace("''", "'") for v in _LIST_VALUE.findall(bound)}
+
+
+def family_bounds(engine) -> dict:
+    """family -> set of model_name values currently in its LIST bound."""
+    q = text("""
+        SELECT c.relname AS partition, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.model_predictions'::regclass
+    """)
+    with engine.connect() as conn:
+        rows = conn.execute(q).all()
+
+    bounds = {}
+    for partition, bound in rows:
+        values = parse_list_bound(bound)
+        if values is not None:
+            bounds[partition.removeprefix("model_predictions_")] = values
+    return bounds
+
+
+def missing_family_values(current: dict, families: dict = MODEL_FAMILIES) -> dict:
+    """
+    family -> full value list for every family whose bound lacks a configured
+    name (existing values are kept, so rows never fall out of a family).
+    """
+    updates = {}
+    for family, names in families.items():
+        have = current.get(family, set())
+        if not set(names) <= have:
+            updates[family] = sorted(have | set(names))
+    return updates
+
+
+def sync_model_families(engine, dry_run: bool = False) -> dict:
+    updates = missing_family_values(family_bounds(engine))
+    for family, names in updates.items():
+        if dry_run:
+            print(f"[DRY-RUN] Would set model family {family}: {names}")
+            continue
+        with engine.begin() as conn:
+            conn.execute(
+                text("SELECT public.set_model_family(:family, :names)"),
+                {"family": family, "names": names},
+            )
+        print(f"[OK] Model family {family}: {names}")
+    return updates
+
+
+# ---------------------------------------------------------
+# RUN-MONTH PARTITIONS
+# ---------------------------------------------------------
+def run_months(months_ahead: int = 2, today: dt.date | None = None) -> list:
+    """The current month and `months_ahead` months after it."""
+    start = _month_start(today or dt.date.today())
+    return [_add_months(start, m) for m in range(months_ahead + 1)]
+
+
+def missing_partitions(parts: pd.DataFrame, parents, months) -> list:
+    """(parent, month) pairs of `parents` x `months` without a month partition."""
+    have = set(zip(parts["parent"], parts["month"]))
+    return [(p, m) for p in parents for m in months if (p, m) not in have]
+
+
+def ensure_partitions(
+    engine,
+    months_ahead: int = 2,
+    today: dt.date | None = None,
+    dry_run: bool = False,
+) -> list:
+    """
+    Create run-month partitions for the current month and `months_ahead`
+    after it. With dry_run, only report the ones that do not exist yet.
+    """
+    months = run_months(months_ahead, today)
+    if dry_run:
+        parts = list_month_partitions(engine)
+        missing = missing_partitions(parts, run_partition_parents(engine), months)
+        for parent, month in missing:
+            print(f"[DRY-RUN] Would create {parent}_p{month:%Y_%m}")
+        return missing
+
+    with engine.begin() as conn:
+        for month in months:
+            conn.execute(
+                text("SELECT public.ensure_run_partitions(:month)"), {"month": month}
+            )
+            print(f"[DEBUG] Ensured run partitions for {month:%Y-%m}")
+    return []
+
+
+def run_partition_parents(engine) -> list:
+    with engine.connect() as conn:
+        return [r[0] for r in conn.execute(text(_PARENTS_SQL))]
+
+
+def list_month_partitions(engine) -> pd.DataFrame:
+    """Return (parent, partition, month) for every run-month partition."""
+    q = text("""
+        SELECT parent.relname AS parent, child.relname AS partition
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child  ON child.oid  = i.inhrelid
+        JOIN pg_namespace n  ON n.oid = parent.relnamespace
+        WHERE n.nspname = 'public'
+          AND parent.relname = ANY(:parents)
+        ORDER BY parent.relname, child.relname
+    """)
+    parents = run_partition_parents(engine)
+    with engine.connect() as conn:
+        df = pd.read_sql(q, conn, params={"parents": parents})
+
+    df["month"] = [_partition_month(name) for name in df["partition"]]
+
+    # DEFAULT partitions carry no month and are never dropped
+    return df.dropna(subset=["month"]).reset_index(drop=True)
+
+
+def latest_run_months(engine, parents) -> set:
+    """(parent, month) of the latest run of every model in each parent."""
+    latest = set()
+    with engine.connect() as conn:
+        for parent in parents:
+            rows = conn.execute(text(f"""
+                    SELECT date_trunc('month', MAX(created_at))::date
+                    FROM public."{parent}"
+                    GROUP BY model_name
+                """)).all()
+            latest.update((parent, r[0]) for r in rows if r[0] is not None)
+    return latest
+
+
+def expired_partitions(
+    parts: pd.DataFrame,
+    protected: set,
+    keep_months: int = 6,
+    keep_backtest_months: int = 24,
+    today: dt.date | None = None,
+) -> pd.DataFrame:
+    """
+    Month partitions that end before their retention window, except the
+    (parent, month) pairs in `protected` (months holding a latest run).
+    """
+    current = _month_start(today or dt.date.today())
+    expired = []
+    for row in parts.itertuples(index=False):
+        keep = keep_backtest_months if row.parent in BACKTEST_PARENTS else keep_months
+        if row.month >= _add_months(current, -keep):
+            continue
+        if (row.parent, row.month) in protected:
+            print(f"[INFO] Keeping {row.partition}: latest run of a model")
+            continue
+        expired.append(row)
+    return pd.DataFrame(expired, columns=parts.columns)
+
+
+def drop_expired_partitions(
+    engine,
+    keep_months: int = 6,
+    keep_backtest_months: int = 24,
+    today: dt.date | None = None,
+    dry_run: bool = False,
+) -> list:
+    """
+    DETACH + DROP month partitions that end before the retention window.
+    Backtest partitions get their own (longer) window, as model_comparison
+    is recomputed from them; a month holding a model's latest run is kept.
+    """
+    parts = list_month_partitions(engine)
+    protected = latest_run_months(engine, parts["parent"].unique())
+    expired = expired_partitions(
+        parts, protected, keep_months, keep_backtest_months, today
+    )
+
+    dropped = []
+    for row in expired.itertuples(index=False):
+        if dry_run:
+            print(f"[DRY-RUN] Would drop {row.partition} ({row.month:%Y-%m})")
+            dropped.append(row.partition)
+            continue
+
+        # One transaction per partition keeps lock time short
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    f'ALTER TABLE public."{row.parent}" '
+                    f'DETACH PARTITION public."{row.partition}"'
+                )
+            )
+            conn.execute(text(f'DROP TABLE public."{row.partition}"'))
+        print(f"[OK] Dropped {row.partition} ({row.month:%Y-%m})")
+        dropped.append(row.partition)
+
+    if not dropped:
+        print("[INFO] No expired run partitions.")
+    return dropped
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--keep-months",
+        type=int,
+        default=6,
+        help="Forecast/anomaly run months to keep",
+    )
+    p.add_argument(
+        "--keep-backtest-months",
+        type=int,
+        default=24,
+        help="Backtest run months to keep",
+    )
+    p.add_argument(
+        "--months-ahead", type=int, default=2, help="Future partitions to pre-create"
+    )
+    p.add_argument("--dry-run", action="store_true")
+    args = p.parse_args()
+
+    engine = get_engine()
+    sync_model_families(engine, dry_run=args.dry_run)
+    ensure_partitions(engine, months_ahead=args.months_ahead, dry_run=args.dry_run)
+    drop_expired_partitions(
+        engine,
+        keep_months=args.keep_months,
+        keep_backtest_months=args.keep_backtest_months,
+        dry_run=args.dry_run,
+    )
+    print("[DONE] Partition retention complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -82,6 +82,8 @@ class Context:
     s3_secret: str = os.getenv("S3_SECRET_KEY", "minioadmin")
     s3_bucket_raw: str = os.getenv("S3_BUCKET_RAW", "hird-raw")
     s3_raw_prefix: str = os.getenv("S3_RAW_PREFIX", "raw")
+    s3_bucket_artifacts: str = os.getenv("S3_BUCKET_ARTIFACTS", "hird-artifacts")
+    s3_models_prefix: str = os.getenv("S3_MODELS_PREFIX", "models")
 
     @property
     def engine(self):
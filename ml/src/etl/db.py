@@ -1,9 +1,14 @@
 import os
 from functools import lru_cache
+from typing import Callable, Iterator, Mapping, Optional
+
+import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from psycopg2 import connect
 
+DEFAULT_CHUNKSIZE = 50_000
+
 
 @lru_cache(maxsize=1)
 def get_engine() -> Engine:
@@ -36,3 +41,79 @@ def get_conn():
         url = url.replace("postgresql+psycopg2://", "postgresql://")
 
     return connect(url)
+
+
+def _build_select(
+    table: str,
+    columns: str,
+    date_col: Optional[str],
+    start,
+    end,
+    where: Optional[str],
+) -> str:
+    clauses = []
+    if date_col and start is not None:
+        clauses.append(f"{date_col} >= :_start")
+    if date_col and end is not None:
+        clauses.append(f"{date_col} <= :_end")
+    if where:
+        clauses.append(f"({where})")
+
+    q = f"SELECT {columns} FROM public.{table}"
+    if clauses:
+        q += " WHERE " + " AND ".join(clauses)
+    return q
+
+
+def iter_sql_chunks(
+    engine: Engine,
+    table: str,
+    columns: str = "*",
+    date_col: Optional[str] = None,
+    start=None,
+    end=None,
+    where: Optional[str] = None,
+    params: Optional[Mapping] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream public.<table> as DataFrame chunks through a server-side cursor.
+
+    The optional [start, end] window on `date_col` (both inclusive) and any extra
+    `where` predicate are pushed into SQL, so only the needed rows leave Postgres
+    and at most `chunksize` rows are held client-side at a time.
+    """
+    q = _build_select(table, columns, date_col, start, end, where)
+    bind = dict(params or {})
+    if start is not None:
+        bind["_start"] = start
+    if end is not None:
+        bind["_end"] = end
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql_query(text(q), conn, params=bind, chunksize=chunksize):
+            yield chunk
+
+
+def read_sql_chunked(
+    engine: Engine,
+    table: str,
+    columns: str = "*",
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    Read public.<table> via iter_sql_chunks() and concatenate the chunks.
+
+    `transform` runs on every chunk before it is kept (e.g. Decimal → float
+    conversion, column pruning), so peak memory is bounded by the compact,
+    transformed representation rather than the raw driver rows.
+    """
+    parts = []
+    for chunk in iter_sql_chunks(engine, table, columns, **kwargs):
+        parts.append(transform(chunk) if transform else chunk)
+
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True)
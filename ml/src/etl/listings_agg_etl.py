@@ -12,9 +12,12 @@ Aggregates by (date, city):
 from dotenv import load_dotenv, find_dotenv
 from sqlalchemy import create_engine, text
 from datetime import datetime
+import argparse
 import pandas as pd
 import os
 
+from ml.src.etl.db import iter_sql_chunks, read_sql_chunked
+
 # ---------------------------------------------------------------------
 # 1. Load environment and connect to Neon
 # ---------------------------------------------------------------------
@@ -30,13 +33,21 @@ print("[DEBUG] Connected to Neon via .env")
 # ---------------------------------------------------------------------
 # 2. Load raw listings
 # ---------------------------------------------------------------------
-def load_raw_listings() -> pd.DataFrame:
-    query = """
-        SELECT city, date_posted::date AS date_posted, listing_type, price
-        FROM public.listings_raw
-        WHERE price IS NOT NULL AND city IS NOT NULL;
-    """
-    df = pd.read_sql_query(query, engine)
+RAW_COLUMNS = "city, date_posted::date AS date_posted, listing_type, price"
+RAW_FILTER = "price IS NOT NULL AND city IS NOT NULL"
+
+
+def load_raw_listings(start=None, end=None) -> pd.DataFrame:
+    """Materialize listings_raw (optionally a date_posted window). Small tables only."""
+    df = read_sql_chunked(
+        engine,
+        "listings_raw",
+        RAW_COLUMNS,
+        date_col="date_posted",
+        start=start,
+        end=end,
+        where=RAW_FILTER,
+    )
     print(f"[INFO] Loaded {len(df):,} listings_raw rows from database")
     return df
 
@@ -44,38 +55,36 @@ def load_raw_listings() -> pd.DataFrame:
 # ---------------------------------------------------------------------
 # 3. Transform → monthly aggregates
 # ---------------------------------------------------------------------
-def transform(df: pd.DataFrame) -> pd.DataFrame:
-    if df.empty:
-        print("[WARN] No listings_raw data found — skipping aggregation.")
-        return pd.DataFrame(
-            columns=[
-                "date",
-                "city",
-                "listings_count",
-                "new_listings",
-                "sales_to_listings_ratio",
-                "source",
-            ]
-        )
-
-    # Normalize to month start
+AGG_COLUMNS = [
+    "date",
+    "city",
+    "listings_count",
+    "new_listings",
+    "sales_to_listings_ratio",
+    "source",
+]
+
+
+def _monthly_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Additive per-(month, city) counts; partial results can be summed."""
+    df = df.copy()
     df["date"] = (
         pd.to_datetime(df["date_posted"], errors="coerce")
         .dt.to_period("M")
         .dt.to_timestamp()
     )
-    df = df.drop(columns=["date_posted"]).dropna(subset=["date", "city"])
-
-    # Group by city and month
-    agg = (
-        df.groupby(["date", "city"])
-        .agg(
-            listings_count=("city", "size"),
-            new_listings=("listing_type", lambda x: (x == "sale").sum()),
-        )
-        .reset_index()
+    df = df.dropna(subset=["date", "city"])
+    df["is_sale"] = (df["listing_type"] == "sale").astype("int64")
+
+    return df.groupby(["date", "city"]).agg(
+        listings_count=("city", "size"),
+        new_listings=("is_sale", "sum"),
     )
 
+
+def _finalize(counts: pd.DataFrame) -> pd.DataFrame:
+    agg = counts.reset_index()
+
     # Compute ratio safely
     agg["sales_to_listings_ratio"] = (
         agg["new_listings"].astype(float) / agg["listings_count"].astype(float)
@@ -86,6 +95,48 @@ def transform(df: pd.DataFrame) -> pd.DataFrame:
     return agg
 
 
+def transform(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        print("[WARN] No listings_raw data found — skipping aggregation.")
+        return pd.DataFrame(columns=AGG_COLUMNS)
+
+    return _finalize(_monthly_counts(df))
+
+
+def aggregate_listings_streaming(
+    start=None, end=None, chunksize: int = 50_000
+) -> pd.DataFrame:
+    """
+    Stream listings_raw through a server-side cursor and fold each chunk into
+    running (month, city) counts. Memory is bounded by chunksize plus the
+    number of (month, city) cells, not by the size of listings_raw.
+    """
+    counts = None
+    n_rows = 0
+    for chunk in iter_sql_chunks(
+        engine,
+        "listings_raw",
+        RAW_COLUMNS,
+        date_col="date_posted",
+        start=start,
+        end=end,
+        where=RAW_FILTER,
+        chunksize=chunksize,
+    ):
+        if chunk.empty:
+            continue
+        n_rows += len(chunk)
+        part = _monthly_counts(chunk)
+        counts = part if counts is None else counts.add(part, fill_value=0)
+
+    print(f"[INFO] Streamed {n_rows:,} listings_raw rows from database")
+    if counts is None:
+        print("[WARN] No listings_raw data found — skipping aggregation.")
+        return pd.DataFrame(columns=AGG_COLUMNS)
+
+    return _finalize(counts.astype("int64"))
+
+
 # ---------------------------------------------------------------------
 # 4. Create target table if not exists
 # ---------------------------------------------------------------------
@@ -142,10 +193,19 @@ def upsert_listings(df: pd.DataFrame, batch_size: int = 500):
 # Entrypoint
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--start-date",
+        help="Optional date_posted lower bound, month start (YYYY-MM-01)",
+    )
+    p.add_argument(
+        "--end-date", help="Optional date_posted upper bound, month end (YYYY-MM-DD)"
+    )
+    args = p.parse_args()
+
     start = datetime.now()
     print("[DEBUG] Listings aggregation ETL started ...")
     create_target_table()
-    df_raw = load_raw_listings()
-    df_agg = transform(df_raw)
+    df_agg = aggregate_listings_streaming(start=args.start_date, end=args.end_date)
     upsert_listings(df_agg)
     print(f"[DONE] Listings aggregation ETL completed in {datetime.now() - start}")
@@ -8,9 +8,12 @@ fills NaN values with 0, and optimizes Neon DB write with warm-up + larger batch
 from dotenv import load_dotenv, find_dotenv
 from sqlalchemy import create_engine, text
 from datetime import datetime
+import argparse
 import pandas as pd
 import os
 
+from ml.src.etl.db import read_sql_chunked
+
 # ---------------------------------------------------------------------
 # 1. Environment setup
 # ---------------------------------------------------------------------
@@ -31,10 +34,39 @@ print("[DEBUG] Connected to Neon via .env")
 # ---------------------------------------------------------------------
 # 2. Helper to load tables
 # ---------------------------------------------------------------------
-def load_table(table_name: str, columns: str = "*") -> pd.DataFrame:
-    query = f"SELECT {columns} FROM public.{table_name};"
+def _compact_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a raw chunk before it is kept: NUMERIC arrives as Decimal objects."""
+    for col in chunk.columns:
+        if col == "date":
+            chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+        elif col not in ("city", "metric") and chunk[col].dtype == object:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+    return chunk
+
+
+def load_table(
+    table_name: str,
+    columns: str = "*",
+    start=None,
+    end=None,
+    date_col: str = "date",
+    chunksize: int = 50_000,
+) -> pd.DataFrame:
+    """
+    Stream a source table in chunks (server-side cursor), optionally limited
+    to the [start, end] window on `date_col`, which is pushed into SQL.
+    """
     try:
-        df = pd.read_sql_query(query, engine)
+        df = read_sql_chunked(
+            engine,
+            table_name,
+            columns,
+            transform=_compact_chunk,
+            date_col=date_col if (start is not None or end is not None) else None,
+            start=start,
+            end=end,
+            chunksize=chunksize,
+        )
         print(f"[INFO] Loaded {len(df):,} rows from {table_name}")
         return df
     except Exception as e:
@@ -45,15 +77,35 @@ def load_table(table_name: str, columns: str = "*") -> pd.DataFrame:
 # ---------------------------------------------------------------------
 # 3. Transform and merge
 # ---------------------------------------------------------------------
-def build_features():
-    # Load source tables
-    hpi = load_table("house_price_index", "date, city, benchmark_price")
-    rent = load_table("rent_index", "date, city, rent_value")
-    metrics = load_table("metrics", "date, city, metric, value")
+GRID_START = "2005-01-01"
+GRID_END = "2025-08-01"
+
+CITIES = [
+    "Victoria",
+    "Vancouver",
+    "Calgary",
+    "Edmonton",
+    "Winnipeg",
+    "Ottawa",
+    "Toronto",
+    "Montreal",
+]
+
+
+def build_features(start: str = GRID_START, end: str = GRID_END, cities=None):
+    # Load source tables (only the grid window leaves the database)
+    window = {"start": start, "end": end}
+    hpi = load_table("house_price_index", "date, city, benchmark_price", **window)
+    rent = load_table("rent_index", "date, city, rent_value", **window)
+    metrics = load_table("metrics", "date, city, metric, value", **window)
     demo = load_table(
-        "demographics", "date, city, population, migration_rate, median_income"
+        "demographics",
+        "date, city, population, migration_rate, median_income",
+        **window,
+    )
+    macro = load_table(
+        "macro_economic_data", "date, city, gdp_growth, cpi_yoy", **window
     )
-    macro = load_table("macro_economic_data", "date, city, gdp_growth, cpi_yoy")
 
     # Rename columns
     if not hpi.empty:
@@ -61,17 +113,11 @@ def build_features():
     if not rent.empty:
         rent.rename(columns={"rent_value": "rent_avg_city"}, inplace=True)
 
-    # City reference list
-    cities = [
-        "Victoria",
-        "Vancouver",
-        "Calgary",
-        "Edmonton",
-        "Winnipeg",
-        "Ottawa",
-        "Toronto",
-        "Montreal",
-    ]
+    # City reference list (optionally restricted for incremental runs)
+    if cities is None:
+        cities = list(CITIES)
+    else:
+        cities = [c for c in CITIES if c in set(cities)]
 
     # -----------------------------------------------------------------
     # Broadcast national ("Canada") rows to all cities
@@ -113,7 +159,7 @@ def build_features():
             df["city"] = df["city"].astype(str)
 
     # Build monthly date-city grid
-    all_months = pd.date_range("2005-01-01", "2025-08-01", freq="MS")
+    all_months = pd.date_range(start, end, freq="MS")
     base = pd.MultiIndex.from_product(
         [all_months, cities], names=["date", "city"]
     ).to_frame(index=False)
@@ -248,12 +294,194 @@ def upsert_features(df: pd.DataFrame, batch_size: int = 500):
     print(f"[OK] Upserted {total:,} rows into public.features")
 
 
+# ---------------------------------------------------------------------
+# 5. Incremental mode (per-source watermarks)
+# ---------------------------------------------------------------------
+WATERMARK_JOB = "features_build_etl"
+
+# source table -> ingestion timestamp column
+WATERMARK_SOURCES = {
+    "house_price_index": "created_at",
+    "rent_index": "last_seen",
+    "metrics": "created_at",
+    "demographics": "created_at",
+    "macro_economic_data": "created_at",
+}
+
+# Sources whose values feed a 12-month YoY column: a change at month m
+# also changes the YoY of months m+1 .. m+12.
+YOY_SOURCES = {"house_price_index", "rent_index"}
+YOY_LOOKBACK_MONTHS = 12
+
+
+def read_watermarks() -> dict:
+    """Return {source: (max_ts, max_date)} recorded by the last successful run."""
+    q = text("""
+        SELECT source, watermark_ts, watermark_date
+        FROM public.etl_watermarks
+        WHERE job = :job
+    """)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(q, {"job": WATERMARK_JOB}).all()
+    except Exception as e:
+        print(f"[WARN] Could not read etl_watermarks: {e}")
+        return {}
+    return {r.source: (r.watermark_ts, r.watermark_date) for r in rows}
+
+
+def current_watermarks() -> dict:
+    """Snapshot of {source: (max_ts, max_date)} as of now."""
+    marks = {}
+    with engine.connect() as conn:
+        for table, ts_col in WATERMARK_SOURCES.items():
+            row = conn.execute(
+                text(f"SELECT MAX({ts_col}) AS ts, MAX(date) AS d FROM public.{table}")
+            ).one()
+            marks[table] = (row.ts, row.d)
+    return marks
+
+
+def save_watermarks(marks: dict):
+    sql = text("""
+        INSERT INTO public.etl_watermarks (job, source, watermark_ts, watermark_date, updated_at)
+        VALUES (:job, :source, :ts, :d, NOW())
+        ON CONFLICT (job, source)
+        DO UPDATE SET
+            watermark_ts = EXCLUDED.watermark_ts,
+            watermark_date = EXCLUDED.watermark_date,
+            updated_at = NOW();
+    """)
+    rows = [
+        {"job": WATERMARK_JOB, "source": src, "ts": ts, "d": d}
+        for src, (ts, d) in marks.items()
+    ]
+    with engine.begin() as conn:
+        conn.execute(sql, rows)
+    print(f"[DEBUG] Saved {len(rows)} watermarks for {WATERMARK_JOB}")
+
+
+def changed_cells(old: dict, new: dict) -> pd.DataFrame:
+    """
+    (city, date) cells touched since the previous run.
+
+    A source row counts as changed when its ingestion timestamp or its date
+    is past the stored watermark. Upserts that overwrite a row without
+    bumping its timestamp are not visible here — run with --full to catch
+    restatements.
+    """
+    frames = []
+    with engine.connect() as conn:
+        for table, ts_col in WATERMARK_SOURCES.items():
+            old_ts, old_date = old.get(table, (None, None))
+            new_ts, _ = new[table]
+
+            # A source that was empty last run has no marks: all its rows are new
+            since = []
+            if old_ts is not None:
+                since.append(f"{ts_col} > :old_ts")
+            if old_date is not None:
+                since.append("date > :old_date")
+            where = f"({' OR '.join(since) or 'TRUE'})"
+            if new_ts is not None:
+                where += f" AND ({ts_col} IS NULL OR {ts_col} <= :new_ts)"
+
+            q = text(f"SELECT DISTINCT city, date FROM public.{table} WHERE {where}")
+            df = pd.read_sql(
+                q,
+                conn,
+                params={"old_ts": old_ts, "old_date": old_date, "new_ts": new_ts},
+            )
+            if df.empty:
+                continue
+            df["date"] = pd.to_datetime(df["date"]).dt.to_period("M").dt.to_timestamp()
+            df["source"] = table
+            frames.append(df)
+            print(f"[INFO] {table}: {len(df)} changed (city, month) cells")
+
+    if not frames:
+        return pd.DataFrame(columns=["city", "date"])
+
+    cells = pd.concat(frames, ignore_index=True)
+
+    # National rows are broadcast to every city
+    national = cells["city"].str.lower() == "canada"
+    if national.any():
+        expanded = pd.concat(
+            [cells[national].assign(city=c) for c in CITIES], ignore_index=True
+        )
+        cells = pd.concat([cells[~national], expanded], ignore_index=True)
+
+    # HPI / rent changes ripple into the following 12 months of YoY
+    yoy = cells[cells["source"].isin(YOY_SOURCES)]
+    if not yoy.empty:
+        ripples = [
+            yoy.assign(date=yoy["date"] + pd.DateOffset(months=k))
+            for k in range(1, YOY_LOOKBACK_MONTHS + 1)
+        ]
+        cells = pd.concat([cells] + ripples, ignore_index=True)
+
+    cells = cells[cells["city"].isin(CITIES)]
+    cells = cells[cells["date"] <= pd.Timestamp(GRID_END)]
+    return cells[["city", "date"]].drop_duplicates().reset_index(drop=True)
+
+
+def build_features_incremental():
+    """
+    Recompute only the (city, month) cells changed since the last run, using a
+    12-month lookback so YoY columns stay exact. Returns (df, new_watermarks);
+    df is None when a full rebuild is required (no watermarks yet).
+    """
+    old = read_watermarks()
+    new = current_watermarks()
+
+    if not old:
+        print("[INFO] No watermarks recorded yet — falling back to full rebuild.")
+        return None, new
+
+    cells = changed_cells(old, new)
+    if cells.empty:
+        print("[INFO] No source changes since last run.")
+        return cells, new
+
+    window_start = cells["date"].min() - pd.DateOffset(months=YOY_LOOKBACK_MONTHS)
+    window_start = max(window_start, pd.Timestamp(GRID_START))
+    cities = sorted(cells["city"].unique())
+    print(
+        f"[INFO] Incremental window {window_start:%Y-%m} → {GRID_END[:7]} "
+        f"for {len(cities)} cities ({len(cells)} cells)"
+    )
+
+    df = build_features(
+        start=window_start.strftime("%Y-%m-%d"), end=GRID_END, cities=cities
+    )
+
+    # Keep only the changed cells; lookback rows were context for YoY
+    df = df.merge(cells, on=["city", "date"], how="inner")
+    print(f"[INFO] Incremental rows to upsert: {len(df):,}")
+    return df, new
+
+
 # ---------------------------------------------------------------------
 # Entrypoint
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild the whole grid instead of only cells changed since last run",
+    )
+    args = p.parse_args()
+
     start = datetime.now()
     print("[DEBUG] Features build ETL started ...")
-    df_features = build_features()
+
+    df_features, marks = (None, None) if args.full else build_features_incremental()
+    if df_features is None:
+        marks = current_watermarks()
+        df_features = build_features()
+
     upsert_features(df_features)
+    save_watermarks(marks)
     print(f"[DONE] Features build ETL completed in {datetime.now() - start}")
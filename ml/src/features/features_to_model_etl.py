@@ -22,6 +22,7 @@ No property_type logic. No ratios. No complex weights.
 Simple, stable, reliable.
 """
 
+import argparse
 import os
 from datetime import datetime, timezone
 import pandas as pd
@@ -29,6 +30,14 @@ import numpy as np
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv, find_dotenv
 
+from ml.src.features.segment_ops import (
+    Segments,
+    segment_pct_change,
+    segment_rolling_mean,
+    segment_shift,
+    segment_stats,
+    warmup_mask,
+)
 
 # ---------------------------------------------------------
 # ENVIRONMENT + DB CONNECTION
@@ -42,8 +51,22 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
 # ---------------------------------------------------------
 # 1. LOAD RAW FEATURES
 # ---------------------------------------------------------
-def load_features():
-    q = """
+def load_features(cities=None, since=None):
+    """
+    Load public.features, optionally restricted to `cities` and to dates on
+    or after `since` (both pushed into SQL).
+    """
+    where = []
+    params = {}
+    if cities is not None:
+        where.append("city = ANY(:cities)")
+        params["cities"] = list(cities)
+    if since is not None:
+        where.append("date >= :since")
+        params["since"] = pd.Timestamp(since).date()
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+
+    q = text(f"""
         SELECT 
             date,
             city,
@@ -58,9 +81,10 @@ def load_features():
             gdp_growth,
             cpi_yoy
         FROM public.features
+        {where_sql}
         ORDER BY city, date;
-    """
-    df = pd.read_sql(q, engine)
+    """)
+    df = pd.read_sql(q, engine, params=params)
     df["date"] = pd.to_datetime(df["date"])
     print(f"[INFO] Loaded {len(df)} rows from features")
     return df
@@ -102,29 +126,23 @@ def aggregate_city_level(df):
 # 3. ADD FEATURE ENGINEERING: YoY, lag, rolling
 # ---------------------------------------------------------
 def add_feature_engineering(df):
-    df = df.sort_values(["city", "date"]).copy()
+    """
+    One sort, then segment-wise NumPy ops over the contiguous city blocks
+    (see segment_ops) instead of a groupby pass per lag/window.
+    """
+    df = df.sort_values(["city", "date"], kind="stable").reset_index(drop=True)
+    seg = Segments(df["city"].to_numpy())
 
     # year-over-year
     for col in ["hpi_benchmark", "rent_avg_city"]:
-        df[f"{col}_yoy"] = df.groupby("city")[col].pct_change(12)
+        df[f"{col}_yoy"] = segment_pct_change(df[col].to_numpy(), seg, 12)
 
     # lag and rolling for core targets
-    df["lag_1"] = df.groupby("city")["hpi_benchmark"].shift(1)
-    df["lag_3"] = df.groupby("city")["hpi_benchmark"].shift(3)
-    df["lag_6"] = df.groupby("city")["hpi_benchmark"].shift(6)
-
-    df["roll_3"] = (
-        df.groupby("city")["hpi_benchmark"]
-        .rolling(3)
-        .mean()
-        .reset_index(level=0, drop=True)
-    )
-    df["roll_6"] = (
-        df.groupby("city")["hpi_benchmark"]
-        .rolling(6)
-        .mean()
-        .reset_index(level=0, drop=True)
-    )
+    hpi = df["hpi_benchmark"].to_numpy(dtype=float)
+    for k in (1, 3, 6):
+        df[f"lag_{k}"] = segment_shift(hpi, seg, k)
+    for w in (3, 6):
+        df[f"roll_{w}"] = segment_rolling_mean(hpi, seg, w)
 
     return df
 
@@ -132,51 +150,101 @@ def add_feature_engineering(df):
 # ---------------------------------------------------------
 # 4. Z-SCORE NORMALIZATION PER CITY
 # ---------------------------------------------------------
-def zscore_group(df, cols):
-    for col in cols:
-        df[f"{col}_z"] = df.groupby("city")[col].transform(
-            lambda x: (x - x.mean()) / (x.std() + 1e-6)
-        )
+ZSCORE_COLS = [
+    "hpi_benchmark",
+    "rent_avg_city",
+    "mortgage_rate",
+    "unemployment_rate",
+    "overnight_rate",
+    "population",
+    "median_income",
+    "migration_rate",
+    "gdp_growth",
+    "cpi_yoy",
+    "hpi_benchmark_yoy",
+    "rent_avg_city_yoy",
+    "lag_1",
+    "lag_3",
+    "lag_6",
+    "roll_3",
+    "roll_6",
+]
+
+ZSCORE_EPS = 1e-6
+
+
+def column_stats(df, cols):
+    """
+    Per-city running statistics (n, mean, m2) for each column, NaNs skipped.
+    m2 is the sum of squared deviations, so states can be merged (Chan et al.)
+    without revisiting history. Returns a frame indexed by (city, feature).
+    """
+    df = df.sort_values(["city", "date"], kind="stable")
+    seg = Segments(df["city"].to_numpy())
+    n, mean, m2 = segment_stats(df[cols].to_numpy(dtype=float), seg)
+
+    index = pd.MultiIndex.from_product([seg.keys, cols], names=["city", "feature"])
+    return pd.DataFrame(
+        {"n": n.ravel(), "mean": mean.ravel(), "m2": m2.ravel()}, index=index
+    )
+
+
+def merge_stats(a, b):
+    """Combine two (n, mean, m2) states covering disjoint rows."""
+    a, b = a.align(b, join="outer", fill_value=0)
+    n = a["n"] + b["n"]
+    safe_n = n.where(n > 0, 1)
+    delta = b["mean"] - a["mean"]
+
+    return pd.DataFrame(
+        {
+            "n": n,
+            "mean": a["mean"] + delta * b["n"] / safe_n,
+            "m2": a["m2"] + b["m2"] + delta**2 * a["n"] * b["n"] / safe_n,
+        }
+    )
+
+
+def apply_zscores(df, stats, cols):
+    """(x - mean) / (std + eps) with the sample std (ddof=1), as pandas would."""
+    std = np.sqrt(stats["m2"] / (stats["n"] - 1).where(stats["n"] > 1))
+    mean_w = stats["mean"].unstack("feature").reindex(columns=cols)
+    std_w = std.unstack("feature").reindex(columns=cols)
+
+    # One city lookup for all columns; cities without state get NaN
+    rows = mean_w.index.get_indexer(df["city"])
+    known = (rows >= 0)[:, None]
+    mu = np.where(known, mean_w.to_numpy(dtype=float)[rows], np.nan)
+    sd = np.where(known, std_w.to_numpy(dtype=float)[rows], np.nan)
+
+    z = (df[cols].to_numpy(dtype=float) - mu) / (sd + ZSCORE_EPS)
+    for i, col in enumerate(cols):
+        df[f"{col}_z"] = z[:, i]
     return df
 
 
+def zscore_group(df, cols):
+    return apply_zscores(df, column_stats(df, cols), cols)
+
+
 def zscore_cols(df):
-    zcols = [
-        "hpi_benchmark",
-        "rent_avg_city",
-        "mortgage_rate",
-        "unemployment_rate",
-        "overnight_rate",
-        "population",
-        "median_income",
-        "migration_rate",
-        "gdp_growth",
-        "cpi_yoy",
-        "hpi_benchmark_yoy",
-        "rent_avg_city_yoy",
-        "lag_1",
-        "lag_3",
-        "lag_6",
-        "roll_3",
-        "roll_6",
-    ]
-    df = zscore_group(df, [c for c in zcols if c in df.columns])
+    df = zscore_group(df, [c for c in ZSCORE_COLS if c in df.columns])
     return df
 
 
 # ---------------------------------------------------------
 # 5. CLEANUP & METADATA
 # ---------------------------------------------------------
+ETL_VERSION = "model_features_city_simple_v1"
+
+
 def finalize(df):
     # drop first 12 months to remove NaNs from lag/yoy
-    df = (
-        df.sort_values(["city", "date"])
-        .groupby("city")
-        .apply(lambda g: g.iloc[12:])
-        .reset_index(drop=True)
-    )
+    df = df.sort_values(["city", "date"], kind="stable").reset_index(drop=True)
+    seg = Segments(df["city"].to_numpy())
+    df = df[warmup_mask(seg, 12)].reset_index(drop=True)
 
-    df["etl_version"] = "model_features_city_simple_v1"
+    df["etl_version"] = ETL_VERSION
     df["processed_at"] = datetime.now(timezone.utc)
 
     print(f"[INFO] Final model_features rows: {len(df)}")
@@ -184,47 +252,266 @@ def finalize(df):
 
 
 # ---------------------------------------------------------
-# 6. WRITE TABLE
+# 6. WRITE TABLE (session-private staging + in-place swap)
 # ---------------------------------------------------------
-def write_model_features(df):
-    print("[INFO] Writing model_features...")
+WRITE_BATCH = 3000
 
-    with engine.begin() as conn:
-        conn.execute(text("TRUNCATE public.model_features;"))
 
+def _insert_batched(conn, table, df):
     cols = df.columns.tolist()
     placeholders = ", ".join(":" + c for c in cols)
-
     sql = text(f"""
-        INSERT INTO public.model_features ({", ".join(cols)})
+        INSERT INTO {table} ({", ".join(cols)})
         VALUES ({placeholders});
     """)
+    df = df.astype(object).where(pd.notnull(df), None)
+    for i in range(0, len(df), WRITE_BATCH):
+        chunk = df.iloc[i : i + WRITE_BATCH]
+        conn.execute(sql, chunk.to_dict(orient="records"))
+
+
+def _stage(conn, df):
+    """
+    Load `df` into a temp table private to this transaction, so overlapping
+    runs never share a staging table. Returns the table name.
+    """
+    conn.execute(
+        text(
+            "CREATE TEMP TABLE model_features_stage "
+            "(LIKE public.model_features INCLUDING DEFAULTS) ON COMMIT DROP;"
+        )
+    )
+    _insert_batched(conn, "model_features_stage", df)
+    return "model_features_stage"
+
+
+def write_model_features(df, stats=None):
+    """
+    Full rebuild: stage everything, then DELETE + INSERT ... SELECT into
+    public.model_features in the same transaction. The table itself (indexes,
+    constraints, grants, dependent views) is kept. DELETE rather than TRUNCATE
+    (which holds an ACCESS EXCLUSIVE lock until commit) lets readers keep
+    reading the old rows until the commit; autovacuum reclaims them later.
+    """
+    print("[INFO] Writing model_features (full swap)...")
 
-    batch = 3000
     with engine.begin() as conn:
-        for i in range(0, len(df), batch):
-            chunk = df.iloc[i : i + batch]
-            conn.execute(sql, chunk.to_dict(orient="records"))
+        stage = _stage(conn, df)
+        conn.execute(text("DELETE FROM public.model_features;"))
+        conn.execute(text(f"INSERT INTO public.model_features SELECT * FROM {stage};"))
+        if stats is not None:
+            conn.execute(text("DELETE FROM public.model_features_zstate;"))
+            _write_stats(conn, stats)
 
     print("[OK] model_features updated.")
 
 
+def merge_model_features(df, stats):
+    """
+    Incremental write: stage the recomputed cities, then replace exactly
+    those cities (rows + z-score state) in the same transaction.
+    """
+    cities = sorted(df["city"].unique())
+    print(f"[INFO] Merging model_features for {len(cities)} cities...")
+
+    with engine.begin() as conn:
+        stage = _stage(conn, df)
+        conn.execute(
+            text("DELETE FROM public.model_features WHERE city = ANY(:cities);"),
+            {"cities": cities},
+        )
+        conn.execute(text(f"INSERT INTO public.model_features SELECT * FROM {stage};"))
+        conn.execute(
+            text("DELETE FROM public.model_features_zstate WHERE city = ANY(:cities);"),
+            {"cities": cities},
+        )
+        _write_stats(conn, stats)
+
+    print(f"[OK] model_features merged ({len(df)} rows).")
+
+
+# ---------------------------------------------------------
+# 7. INCREMENTAL ENGINE
+# ---------------------------------------------------------
+# Rows needed before the first new month to recompute lag_6 / roll_6 / YoY
+LOOKBACK_MONTHS = 12
+
+
+def _write_stats(conn, stats):
+    rows = stats.reset_index()
+    rows["n"] = rows["n"].astype(int)
+    rows["last_date"] = rows["last_date"].dt.date
+    conn.execute(
+        text("""
+            INSERT INTO public.model_features_zstate
+                (city, feature, n, mean, m2, last_date, updated_at)
+            VALUES (:city, :feature, :n, :mean, :m2, :last_date, NOW());
+        """),
+        rows.to_dict(orient="records"),
+    )
+
+
+def load_zstate(cities):
+    q = text("""
+        SELECT city, feature, n, mean, m2, last_date
+        FROM public.model_features_zstate
+        WHERE city = ANY(:cities)
+    """)
+    df = pd.read_sql(q, engine, params={"cities": list(cities)})
+    df["last_date"] = pd.to_datetime(df["last_date"])
+    return df.set_index(["city", "feature"])
+
+
+def detect_changed_cities():
+    """
+    Cities whose features rows were (re)written after the city was last
+    processed, with the earliest changed date. Cities never processed count
+    as changed from their first row.
+    """
+    q = text("""
+        SELECT f.city, MIN(f.date) AS first_changed
+        FROM public.features f
+        LEFT JOIN (
+            SELECT city, MAX(processed_at) AS processed_at
+            FROM public.model_features
+            GROUP BY city
+        ) m ON m.city = f.city
+        WHERE m.processed_at IS NULL OR f.created_at > m.processed_at
+        GROUP BY f.city
+    """)
+    df = pd.read_sql(q, engine)
+    df["first_changed"] = pd.to_datetime(df["first_changed"])
+    return df.set_index("city")["first_changed"]
+
+
+def _with_stats_dates(stats, df):
+    last = df.groupby("city")["date"].max()
+    stats = stats.copy()
+    stats["last_date"] = stats.index.get_level_values("city").map(last)
+    return stats
+
+
+def rebuild_cities(cities):
+    """Full recompute of the given cities. Returns (rows, stats)."""
+    raw = load_features(cities=cities)
+    if raw.empty:
+        return pd.DataFrame(), None
+
+    feat = add_feature_engineering(aggregate_city_level(raw))
+    cols = [c for c in ZSCORE_COLS if c in feat.columns]
+    stats = column_stats(feat, cols)
+    feat = apply_zscores(feat, stats, cols)
+    return finalize(feat), _with_stats_dates(stats, feat)
+
+
+def append_cities(cities, state):
+    """
+    Append-only update: engineer features for months after each city's
+    last_date (with a lookback), fold their statistics into the stored state
+    and re-apply z-scores to the city's existing rows from the merged state.
+    """
+    last_dates = state.groupby(level="city")["last_date"].max()
+    since = last_dates.min() - pd.DateOffset(months=LOOKBACK_MONTHS)
+
+    raw = load_features(cities=cities, since=since)
+    feat = add_feature_engineering(aggregate_city_level(raw))
+
+    q = text("SELECT * FROM public.model_features WHERE city = ANY(:cities)")
+    existing = pd.read_sql(q, engine, params={"cities": list(cities)})
+    existing["date"] = pd.to_datetime(existing["date"])
+    return append_rows(feat, existing, state)
+
+
+def append_rows(feat, existing, state):
+    """
+    Core of append_cities: `feat` holds engineered rows from the lookback on,
+    `existing` the cities' current model_features rows. Returns (rows, stats).
+    """
+    last_dates = state.groupby(level="city")["last_date"].max()
+    feat = feat[feat["date"] > feat["city"].map(last_dates)]
+    if feat.empty:
+        return pd.DataFrame(), None
+
+    cols = [c for c in ZSCORE_COLS if c in feat.columns]
+    stats = merge_stats(state[["n", "mean", "m2"]], column_stats(feat, cols))
+
+    rows = pd.concat([existing[feat.columns.intersection(existing.columns)], feat])
+    rows = apply_zscores(rows.sort_values(["city", "date"]), stats, cols)
+    rows["etl_version"] = ETL_VERSION
+    rows["processed_at"] = datetime.now(timezone.utc)
+    return rows.reset_index(drop=True), _with_stats_dates(stats, rows)
+
+
+def run_incremental():
+    changed = detect_changed_cities()
+    if changed.empty:
+        print("[INFO] No changed cities — model_features is up to date.")
+        return
+
+    state = load_zstate(changed.index)
+    state_last = (
+        state.groupby(level="city")["last_date"].max()
+        if not state.empty
+        else pd.Series(dtype="datetime64[ns]")
+    )
+
+    # Only new months after the stored state → append; anything else → rebuild
+    appendable = [
+        c for c in changed.index if c in state_last and changed[c] > state_last[c]
+    ]
+    rebuild = [c for c in changed.index if c not in appendable]
+    print(f"[INFO] Cities to append: {appendable}; to rebuild: {rebuild}")
+
+    parts, stats = [], []
+    if rebuild:
+        rows, st = rebuild_cities(rebuild)
+        parts.append(rows)
+        stats.append(st)
+    if appendable:
+        rows, st = append_cities(appendable, state.loc[appendable])
+        parts.append(rows)
+        stats.append(st)
+
+    parts = [p for p in parts if not p.empty]
+    stats = [st for st in stats if st is not None]
+    if not parts:
+        print("[INFO] Nothing to write.")
+        return
+
+    merge_model_features(pd.concat(parts, ignore_index=True), pd.concat(stats))
+
+
 # ---------------------------------------------------------
 # MAIN ENTRY POINT
 # ---------------------------------------------------------
-def main():
+def main(full: bool = False):
+    if not full:
+        print("[DEBUG] Starting incremental model_features ETL...")
+        run_incremental()
+        print("[DONE] ETL completed successfully.")
+        return
+
     print("[DEBUG] Starting simplified city-level model_features ETL...")
 
     raw = load_features()
     agg = aggregate_city_level(raw)
     feat = add_feature_engineering(agg)
-    feat = zscore_cols(feat)
+
+    cols = [c for c in ZSCORE_COLS if c in feat.columns]
+    stats = column_stats(feat, cols)
+    feat = apply_zscores(feat, stats, cols)
     final = finalize(feat)
 
-    write_model_features(final)
+    write_model_features(final, _with_stats_dates(stats, feat))
 
     print("[DONE] ETL completed successfully.")
 
 
 if __name__ == "__main__":
-    main()
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute every city and swap in a fresh table",
+    )
+    main(full=p.parse_args().full)
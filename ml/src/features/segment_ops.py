@@ -0,0 +1,109 @@
+"""
+segment_ops.py
+------------------------------------------------------------------
+NumPy segment-wise operations over a panel sorted by (city, date).
+
+Every city occupies one contiguous block ("segment") of rows, so lags,
+rolling means, YoY changes and per-city statistics become plain array
+arithmetic on the whole panel instead of one groupby pass per column.
+
+Semantics match the pandas calls they replace:
+    shift(k)            -> segment_shift
+    pct_change(k)       -> segment_pct_change   (no forward fill)
+    rolling(w).mean()   -> segment_rolling_mean (min_periods = w)
+    mean() / std()      -> segment_stats        (NaNs skipped)
+"""
+
+import numpy as np
+
+
+class Segments:
+    """Segment layout of a sorted key array (e.g. the city column)."""
+
+    def __init__(self, keys):
+        keys = np.asarray(keys)
+        n = len(keys)
+        if n == 0:
+            self.starts = np.zeros(0, dtype=np.int64)
+        else:
+            boundary = np.empty(n, dtype=bool)
+            boundary[0] = True
+            boundary[1:] = keys[1:] != keys[:-1]
+            self.starts = np.flatnonzero(boundary)
+
+        self.n_rows = n
+        self.keys = keys[self.starts]
+        self.lengths = np.diff(np.append(self.starts, n))
+        # segment id and position inside the segment, per row
+        self.ids = np.repeat(np.arange(len(self.starts)), self.lengths)
+        self.pos = np.arange(n) - np.repeat(self.starts, self.lengths)
+
+
+def segment_shift(values, seg: Segments, k: int):
+    """Lag by k rows within each segment; the first k rows of a segment are NaN."""
+    x = np.asarray(values, dtype=float)
+    out = np.full_like(x, np.nan)
+    if k < len(x):
+        out[k:] = x[:-k] if k > 0 else x
+    out[seg.pos < k] = np.nan
+    return out
+
+
+def segment_pct_change(values, seg: Segments, k: int):
+    """x[t] / x[t-k] - 1 within each segment."""
+    x = np.asarray(values, dtype=float)
+    prev = segment_shift(x, seg, k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return x / prev - 1.0
+
+
+def segment_rolling_mean(values, seg: Segments, window: int):
+    """
+    Trailing mean over `window` rows within each segment via cumulative sums.
+    A window containing any NaN (or reaching past the segment start) is NaN.
+    """
+    x = np.asarray(values, dtype=float)
+    isnan = np.isnan(x)
+
+    csum = np.concatenate(([0.0], np.cumsum(np.where(isnan, 0.0, x))))
+    cnan = np.concatenate(([0], np.cumsum(isnan)))
+
+    hi = np.arange(1, len(x) + 1)
+    lo = np.maximum(hi - window, 0)
+
+    out = (csum[hi] - csum[lo]) / window
+    bad = (seg.pos < window - 1) | ((cnan[hi] - cnan[lo]) > 0)
+    out[bad] = np.nan
+    return out
+
+
+def segment_stats(matrix, seg: Segments):
+    """
+    Per-segment (n, mean, m2) for each column of `matrix` (rows x cols),
+    skipping NaNs; m2 is the sum of squared deviations from the mean.
+    Two-pass (mean first, then deviations) for numerical stability.
+    Returns three (segments x cols) arrays.
+    """
+    x = np.asarray(matrix, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+    if len(seg.starts) == 0:
+        empty = np.zeros((0, x.shape[1]))
+        return empty, empty, empty
+
+    valid = ~np.isnan(x)
+    x0 = np.where(valid, x, 0.0)
+
+    n = np.add.reduceat(valid.astype(np.int64), seg.starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.add.reduceat(x0, seg.starts, axis=0) / n
+    mean = np.where(n > 0, mean, 0.0)
+
+    dev = np.where(valid, x - mean[seg.ids], 0.0)
+    m2 = np.add.reduceat(dev * dev, seg.starts, axis=0)
+    return n, mean, m2
+
+
+def warmup_mask(seg: Segments, n_rows: int):
+    """True for rows past the first `n_rows` of their segment."""
+    return seg.pos >= n_rows
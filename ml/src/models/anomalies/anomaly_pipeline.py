@@ -1,7 +1,11 @@
 # ml/src/models/anomalies/anomaly_pipeline.py
 
 import pandas as pd
-from ml.src.utils.data_loader import load_timeseries
+from ml.src.utils.data_loader import (
+    load_timeseries,
+    load_timeseries_many,
+    series_cache,
+)
 from ml.src.utils.db_writer import write_anomalies
 from .isolation_forest import detect_iforest
 
@@ -65,13 +69,23 @@ def run_all_anomalies(conn):
 
     print("\n========== Running anomaly pipeline for ALL CITIES ==========\n")
 
-    for city in TARGET_CITIES:
+    with series_cache():
+        # One query per target; run_anomaly_pipeline then reads from the cache
         for target in TARGETS:
-            print(f"\n=== Start: {city} — {target} ===")
             try:
-                run_anomaly_pipeline(conn, city, target)
-                print(f"✓ Completed: {city}, {target}")
+                load_timeseries_many(conn, target, TARGET_CITIES)
             except Exception as e:
-                print(f"✗ FAILED: {city}, {target} — {e}")
+                print(
+                    f"[WARN] Bulk load failed for {target}, falling back per city: {e}"
+                )
+
+        for city in TARGET_CITIES:
+            for target in TARGETS:
+                print(f"\n=== Start: {city} — {target} ===")
+                try:
+                    run_anomaly_pipeline(conn, city, target)
+                    print(f"✓ Completed: {city}, {target}")
+                except Exception as e:
+                    print(f"✗ FAILED: {city}, {target} — {e}")
 
     print("\n========== ALL ANOMALIES PROCESSED ==========\n")
@@ -0,0 +1,232 @@
+"""
+artifact_store.py
+-----------------------------------------
+Content-addressed store for fitted models in the MinIO/S3 artifacts bucket.
+
+A fitted model is saved under a key derived from everything that determines
+it: the training inputs, the hyperparameters and the code version (trainer
+source + library versions). When a key already exists the model is loaded
+instead of trained, so unchanged (city, target) series are never refit.
+
+    s3://<S3_BUCKET_ARTIFACTS>/<S3_MODELS_PREFIX>/<model>/<city>/<target>/<sha256>.pkl
+
+The returned URI is what the trainers record in model_artifact_uri. A small
+JSON pointer per series (<prefix>/latest/<model>/<city>/<target>.json) names
+the most recent model, which incremental refreshes start from. A model
+fitted from such a parent records the parent's URI in its key params, so it
+never shares a key with a cold fit on the same data.
+
+Configuration:
+    HIRD_ARTIFACT_STORE=0     train everything, save nothing (no S3 access)
+    HIRD_MODEL_CODE_VERSION   extra string mixed into every key (e.g. a git sha)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import re
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from botocore.exceptions import BotoCoreError, ClientError
+
+ENABLED = os.getenv("HIRD_ARTIFACT_STORE", "1") != "0"
+
+_STORE = None
+_STORE_READY = False
+
+
+# ---------------------------------------------------------
+# KEYS
+# ---------------------------------------------------------
+def code_version(*parts) -> str:
+    """
+    Short hash of the code a model depends on. Each part is a source file
+    path (hashed by content) or an imported module (name + __version__).
+    """
+    h = hashlib.sha256(os.getenv("HIRD_MODEL_CODE_VERSION", "").encode())
+    for part in parts:
+        if isinstance(part, (str, Path)):
+            h.update(Path(part).read_bytes())
+        else:
+            h.update(f"{part.__name__}=={getattr(part, '__version__', '')}".encode())
+    return h.hexdigest()[:16]
+
+
+def _hash_data(h, data):
+    if isinstance(data, pd.DataFrame):
+        h.update(",".join(map(str, data.columns)).encode())
+        h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    elif isinstance(data, pd.Series):
+        h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    else:
+        h.update(np.ascontiguousarray(data, dtype=float).tobytes())
+
+
+def _slug(value) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(value))
+
+
+def artifact_key(model_name, city, target, data, params, code="", prefix="models"):
+    """Object key for a model fitted on `data` with `params` under `code`."""
+    h = hashlib.sha256()
+    _hash_data(h, data)
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(code.encode())
+    folder = "/".join(_slug(p) for p in (model_name, city, target))
+    return f"{prefix}/{folder}/{h.hexdigest()}.pkl"
+
+
+# ---------------------------------------------------------
+# STORE
+# ---------------------------------------------------------
+class ArtifactStore:
+    def __init__(self, client, bucket: str, prefix: str = "models"):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    @classmethod
+    def from_context(cls, ctx=None):
+        if ctx is None:
+            from ml.src.etl.base import Context
+
+            ctx = Context(run_date=date.today())
+        return cls(ctx.s3, ctx.s3_bucket_artifacts, ctx.s3_models_prefix)
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def load(self, key: str):
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        return pickle.loads(body.read())
+
+    def save(self, key: str, model) -> str:
+        """Upload `model` unless the key is already there; returns its URI."""
+        if not self.exists(key):
+            blob = pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=blob,
+                ContentType="application/octet-stream",
+            )
+        return self.uri(key)
+
+    def _latest_key(self, model_name, city, target) -> str:
+        folder = "/".join(_slug(p) for p in (model_name, city, target))
+        return f"{self.prefix}/latest/{folder}.json"
+
+    def read_latest(self, model_name, city, target):
+        """The latest pointer ({"uri", "last_date", ...}) or None."""
+        key = self._latest_key(model_name, city, target)
+        if not self.exists(key):
+            return None
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        return json.loads(body.read())
+
+    def write_latest(self, model_name, city, target, uri, last_date):
+        pointer = {
+            "uri": uri,
+            "last_date": str(pd.Timestamp(last_date).date()),
+            "updated_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        }
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._latest_key(model_name, city, target),
+            Body=json.dumps(pointer).encode(),
+            ContentType="application/json",
+        )
+
+    def ensure_bucket(self):
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except ClientError:
+            self.client.create_bucket(Bucket=self.bucket)
+
+
+def get_store():
+    """Process-wide store (one S3 client per worker), or None if unavailable."""
+    global _STORE, _STORE_READY
+    if _STORE_READY:
+        return _STORE
+    _STORE_READY = True
+    if not ENABLED:
+        return None
+    try:
+        store = ArtifactStore.from_context()
+        store.ensure_bucket()
+        _STORE = store
+    except (BotoCoreError, ClientError) as e:
+        print(f"[WARN] Artifact store unavailable, training without it: {e}")
+    return _STORE
+
+
+def fetch_or_fit(model_name, city, target, data, params, fit_fn, code="", store=None):
+    """
+    Load the model for (data, params, code) from the store, or call fit_fn()
+    and save its result. Returns (model, uri); uri is None without a store.
+    """
+    store = store if store is not None else get_store()
+    if store is None:
+        return fit_fn(), None
+
+    key = artifact_key(model_name, city, target, data, params, code, store.prefix)
+    try:
+        if store.exists(key):
+            model = store.load(key)
+            print(f"[DEBUG] {model_name} {city}/{target}: inputs unchanged, reused")
+            return model, store.uri(key)
+    except Exception as e:
+        print(f"[WARN] Could not load {store.uri(key)}: {e}")
+
+    model = fit_fn()
+    try:
+        return model, store.save(key, model)
+    except Exception as e:
+        print(f"[WARN] Could not save {store.uri(key)}: {e}")
+        return model, None
+
+
+def mark_latest(model_name, city, target, uri, last_date):
+    """Point the series' latest pointer at `uri` (no-op without a store)."""
+    store = get_store()
+    if store is None or uri is None:
+        return
+    try:
+        store.write_latest(model_name, city, target, uri, last_date)
+    except Exception as e:
+        print(f"[WARN] Could not update latest pointer for {city}/{target}: {e}")
+
+
+def latest(model_name, city, target):
+    """(model, uri) of the most recent stored model for a series, or (None, None)."""
+    store = get_store()
+    if store is None:
+        return None, None
+    try:
+        pointer = store.read_latest(model_name, city, target)
+        if pointer is None:
+            return None, None
+        key = pointer["uri"].split(f"s3://{store.bucket}/", 1)[1]
+        return store.load(key), pointer["uri"]
+    except Exception as e:
+        print(f"[WARN] Could not load latest {model_name} for {city}/{target}: {e}")
+        return None, None
+
+
+def load_latest(model_name, city, target):
+    """The most recent stored model for a series, or None."""
+    return latest(model_name, city, target)[0]
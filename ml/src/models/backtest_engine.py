@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+backtest_engine.py
+
+Rolling-origin cross-validation shared by the ARIMA, Prophet and LSTM
+backtests (plus a naive last-value baseline).
+
+For every (model, city, target, origin) task the series is split at the
+origin, the model is fit on the training window and forecasts the next
+`horizon` months with no look-ahead:
+
+    expanding  train on every month <= origin
+    sliding    train on the last `window_months` months <= origin
+
+Tasks run on the shared training executor's process pool. Each task's
+result is cached on disk under a key of (task, train + test data, config,
+code version), so adding an origin or a model only fits the new tasks.
+Results go to public.backtest_results (horizon_months = steps ahead of the
+origin) and the whole table is then re-scored by compare_models. The fixed-cutoff
+origin (FIXED_CUTOFF) is reserved for train_model_prophet_backtest.
+
+Configuration (CLI flags override):
+    HIRD_BACKTEST_ORIGINS        comma-separated origins (month starts)
+    HIRD_BACKTEST_HORIZON        months forecast from each origin (default 12)
+    HIRD_BACKTEST_WINDOW         expanding | sliding (default expanding)
+    HIRD_BACKTEST_WINDOW_MONTHS  sliding window length (default 120)
+    HIRD_BACKTEST_CACHE_DIR      task cache (default .cache/backtests)
+"""
+
+import argparse
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv, find_dotenv
+from sqlalchemy import create_engine
+
+from ml.src.models.artifact_store import artifact_key, code_version
+from ml.src.models.training_executor import gather_frames, run_jobs
+from ml.src.utils.db_writer import replace_backtest_results
+from ml.src.utils.feature_cache import load_model_features
+from ml.src.utils.prediction_frame import months_between, prediction_frame
+
+load_dotenv(find_dotenv(usecwd=True))
+
+CACHE_DIR = Path(os.getenv("HIRD_BACKTEST_CACHE_DIR", ".cache/backtests"))
+
+DEFAULT_ORIGINS = "2019-12-01,2021-12-01,2022-12-01"
+
+# The fixed-cutoff Prophet backtest writes prophet_backtest at this origin;
+# the engine leaves it to it so neither overwrites the other.
+FIXED_CUTOFF = pd.Timestamp("2020-12-01")
+
+TARGETS = [
+    ("hpi_benchmark", "price"),
+    ("rent_avg_city", "rent"),
+]
+
+REGRESSORS = [
+    "mortgage_rate_z",
+    "unemployment_rate_z",
+    "cpi_yoy_z",
+    "roll_3_z",
+    "roll_6_z",
+]
+
+_HERE = Path(__file__).resolve().parent
+
+
+# ---------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------
+@dataclass(frozen=True)
+class BacktestConfig:
+    origins: tuple = field(default_factory=tuple)
+    horizon: int = 12
+    window: str = "expanding"
+    window_months: int = 120
+    min_train: int = 36
+
+    def params(self) -> dict:
+        """Settings that change a task's result (part of its cache key)."""
+        return {
+            "horizon": self.horizon,
+            "window": self.window,
+            "window_months": self.window_months if self.window == "sliding" else None,
+        }
+
+
+def parse_origins(raw: str) -> tuple:
+    return tuple(pd.Timestamp(s.strip()) for s in raw.split(",") if s.strip())
+
+
+def config_from_env(**overrides) -> BacktestConfig:
+    cfg = {
+        "origins": parse_origins(os.getenv("HIRD_BACKTEST_ORIGINS", DEFAULT_ORIGINS)),
+        "horizon": int(os.getenv("HIRD_BACKTEST_HORIZON", "12")),
+        "window": os.getenv("HIRD_BACKTEST_WINDOW", "expanding"),
+        "window_months": int(os.getenv("HIRD_BACKTEST_WINDOW_MONTHS", "120")),
+    }
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    if cfg["window"] not in ("expanding", "sliding"):
+        raise ValueError(f"unknown backtest window: {cfg['window']}")
+    if FIXED_CUTOFF in cfg["origins"]:
+        raise ValueError(
+            f"origin {FIXED_CUTOFF:%Y-%m-%d} is reserved for the Prophet backtest"
+        )
+    return BacktestConfig(**cfg)
+
+
+def split_origin(g: pd.DataFrame, origin, cfg: BacktestConfig):
+    """(train, test) for one origin; test = the `horizon` months after it."""
+    origin = pd.Timestamp(origin)
+    train = g[g["date"] <= origin]
+    if cfg.window == "sliding":
+        start = origin - pd.DateOffset(months=cfg.window_months - 1)
+        train = train[train["date"] >= start]
+    end = origin + pd.DateOffset(months=cfg.horizon)
+    test = g[(g["date"] > origin) & (g["date"] <= end)]
+    return train, test
+
+
+# ---------------------------------------------------------
+# MODEL ADAPTERS
+# history: [date, y, regressors...] up to the origin
+# future:  [date, regressors...] for the months to forecast, regressors held
+#          at their last value <= origin (roll_*_z derive from the target)
+# return:  (yhat, lower, upper) arrays of len(future); bounds may be None
+# ---------------------------------------------------------
+def forecast_naive(history, future):
+    yhat = np.full(len(future), float(history["y"].iloc[-1]))
+    return yhat, None, None
+
+
+def forecast_arima(history, future):
+    from ml.src.models.train_model_arima_backtest import fit_arima
+
+    model = fit_arima(history["y"].to_numpy(dtype=float))
+    fc, conf = model.predict(n_periods=len(future), return_conf_int=True)
+    conf = np.asarray(conf)
+    return np.asarray(fc, dtype=float), conf[:, 0], conf[:, 1]
+
+
+def forecast_prophet(history, future):
+    from ml.src.models.forecasting import prophet_runner
+
+    train = history.rename(columns={"date": "ds"})
+    _, fc = prophet_runner.fit_predict(
+        train, future.rename(columns={"date": "ds"}), REGRESSORS
+    )
+    return (
+        fc["yhat"].to_numpy(),
+        fc["yhat_lower"].to_numpy(),
+        fc["yhat_upper"].to_numpy(),
+    )
+
+
+def forecast_lstm(history, future):
+    from ml.src.models.forecasting.lstm_common import recursive_forecast
+    from ml.src.models.train_model_lstm_backtest import SEQ_LEN, fit_lstm
+
+    values = history["y"].to_numpy(dtype=float)
+    model, scaler = fit_lstm(values)
+
+    # recursive: each prediction becomes the next input (no actuals)
+    last = scaler.transform(values[-SEQ_LEN:].reshape(-1, 1)).reshape(1, SEQ_LEN, 1)
+    preds = recursive_forecast(
+        model, last, len(future), lambda step, p: np.asarray(p).reshape(-1, 1)
+    )[0]
+    return scaler.inverse_transform(preds.reshape(-1, 1)).flatten(), None, None
+
+
+# model_name -> (adapter, extra source files that affect its results)
+FORECASTERS = {
+    "naive_backtest": (forecast_naive, []),
+    "arima_backtest": (forecast_arima, ["train_model_arima_backtest.py"]),
+    "prophet_backtest": (
+        forecast_prophet,
+        ["forecasting/prophet_runner.py"],
+    ),
+    "lstm_backtest": (
+        forecast_lstm,
+        ["train_model_lstm_backtest.py", "forecasting/lstm_common.py"],
+    ),
+}
+
+# CLI name -> model_name
+MODELS = {
+    "naive": "naive_backtest",
+    "arima": "arima_backtest",
+    "prophet": "prophet_backtest",
+    "lstm": "lstm_backtest",
+}
+
+
+# ---------------------------------------------------------
+# ONE TASK
+# ---------------------------------------------------------
+def _task_code(model_name: str) -> str:
+    files = [__file__] + [_HERE / f for f in FORECASTERS[model_name][1]]
+    return code_version(*[f for f in files if Path(f).exists()])
+
+
+def run_task(model_name, city, target_name, g, origin, cfg: BacktestConfig):
+    """
+    Backtest one (model, city, target, origin); cached on disk.
+    Returns prediction rows (with y_true) plus an `origin` column, or None.
+    """
+    train, test = split_origin(g, origin, cfg)
+    if len(train) < cfg.min_train or test.empty:
+        print(f"[WARN] {model_name}: skip {city}/{target_name} @ {origin:%Y-%m}")
+        return None
+
+    data = pd.concat([train, test])
+    key = artifact_key(
+        model_name,
+        city,
+        target_name,
+        data,
+        {**cfg.params(), "origin": str(origin.date())},
+        _task_code(model_name),
+        prefix="tasks",
+    )
+    path = CACHE_DIR / key
+    if path.exists():
+        return pd.read_pickle(path)
+
+    # Forecast every month up to the last test date, then keep the months
+    # that have an actual: months with a missing y leave gaps in `test`, so
+    # the step (and horizon_months) comes from the date, not the row index.
+    # No look-ahead in the regressors either: hold them at the origin, as
+    # train_model_prophet.forecast_city_target does for live forecasts.
+    horizon = months_between(test["date"], origin)
+    future = pd.DataFrame(
+        {"date": pd.date_range(origin, periods=horizon.max() + 1, freq="MS")[1:]}
+    ).assign(**train.iloc[-1][REGRESSORS].to_dict())
+    forecaster = FORECASTERS[model_name][0]
+    yhat, lower, upper = forecaster(train.reset_index(drop=True), future)
+    step = horizon - 1
+
+    frame = prediction_frame(
+        model_name=model_name,
+        target=target_name,
+        city=city,
+        predict_date=test["date"],
+        horizon_months=horizon,
+        yhat=np.asarray(yhat)[step],
+        yhat_lower=None if lower is None else np.asarray(lower)[step],
+        yhat_upper=None if upper is None else np.asarray(upper)[step],
+        y_true=test["y"],
+        features_version=f"backtest_{cfg.window}_v2",
+    )
+    frame["origin"] = origin
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    frame.to_pickle(tmp)
+    os.replace(tmp, path)
+    return frame
+
+
+# ---------------------------------------------------------
+# ALL TASKS
+# ---------------------------------------------------------
+def build_jobs(features: pd.DataFrame, model_names, cfg: BacktestConfig):
+    """One job per (model, city, target, origin) on the city's slice."""
+    jobs = []
+    for city, g in features.groupby("city", sort=True):
+        g = g.sort_values("date")
+        for target_col, target_name in TARGETS:
+            series = g[["date", target_col] + REGRESSORS].rename(
+                columns={target_col: "y"}
+            )
+            series = series.dropna(subset=["y"]).reset_index(drop=True)
+            for model_name in model_names:
+                for origin in cfg.origins:
+                    jobs.append(
+                        (
+                            (model_name, city, target_name, f"{origin:%Y-%m}"),
+                            (model_name, city, target_name, series, origin, cfg),
+                        )
+                    )
+    return jobs
+
+
+def run_backtests(features, model_names, cfg: BacktestConfig, max_workers=None):
+    """Run every task on the process pool; returns one frame of all results."""
+    jobs = build_jobs(features, model_names, cfg)
+    print(f"[INFO] {len(jobs)} backtest tasks ({len(cfg.origins)} origins)")
+
+    initializer = None
+    if "prophet_backtest" in model_names:
+        from ml.src.models.forecasting import prophet_runner
+
+        initializer = prophet_runner.warmup
+
+    results = run_jobs(run_task, jobs, max_workers=max_workers, initializer=initializer)
+    return gather_frames(results)
+
+
+def write_backtests(engine, results: pd.DataFrame):
+    """Replace the backtest_results rows of the (model, city, target, origin) run."""
+    replace_backtest_results(engine, results)
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def main(models=None, write=True, max_workers=None, **overrides):
+    cfg = config_from_env(**overrides)
+    model_names = [MODELS[m] for m in (models or ["arima", "prophet", "lstm"])]
+    print(
+        f"[DEBUG] Rolling-origin backtest: {', '.join(model_names)} | "
+        f"{cfg.window} window, horizon {cfg.horizon}"
+    )
+
+    engine = create_engine(
+        os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL"),
+        pool_pre_ping=True,
+        future=True,
+    )
+    features = load_model_features(
+        engine, ["date", "city"] + [c for c, _ in TARGETS] + REGRESSORS
+    )
+
+    results = run_backtests(features, model_names, cfg, max_workers=max_workers)
+    if results.empty:
+        print("[WARN] No backtest results.")
+        return results
+
+    if write:
+        write_backtests(engine, results)
+
+        # re-score all of backtest_results, not just this run: model_comparison
+        # rows are upserted per group, so a partial run must not stand alone
+        from ml.src.models import compare_models
+
+        compare_models.main()
+
+    print(f"[DONE] Backtest complete: {len(results)} rows.")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=None)
+    parser.add_argument("--origins", default=None, help="e.g. 2019-12-01,2021-12-01")
+    parser.add_argument("--horizon", type=int, default=None)
+    parser.add_argument("--window", choices=["expanding", "sliding"], default=None)
+    parser.add_argument("--window-months", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-write", action="store_true")
+    opts = parser.parse_args()
+
+    main(
+        models=opts.models,
+        write=not opts.no_write,
+        max_workers=opts.workers,
+        origins=parse_origins(opts.origins) if opts.origins else None,
+        horizon=opts.horizon,
+        window=opts.window,
+        window_months=opts.window_months,
+    )
@@ -3,10 +3,10 @@
 compare_models.py
 
 Evaluates Prophet, ARIMA, and LSTM using BACKTEST predictions.
-Reads rows from model_predictions where:
-
-    model_name IN ('prophet_backtest', 'arima_backtest', 'lstm_backtest')
-    AND y_true IS NOT NULL
+Reads rows from public.backtest_results (written by the backtest scripts
+and backtest_engine). horizon_months is always steps ahead of the row's
+origin; the one-step ARIMA/LSTM scripts write their own *_1step_backtest
+models, so each metric pools a single kind of forecast.
 
 Computes:
     - MAE
@@ -26,6 +26,8 @@ from pathlib import Path
 from dotenv import load_dotenv, find_dotenv
 from sqlalchemy import create_engine, text
 
+from ml.src.utils import profiling
+
 # ---------------------------------------------------------
 # ENVIRONMENT
 # ---------------------------------------------------------
@@ -33,7 +35,14 @@ load_dotenv(find_dotenv(usecwd=True))
 DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
 
-BACKTEST_MODELS = ["prophet_backtest", "arima_backtest", "lstm_backtest"]
+BACKTEST_MODELS = [
+    "prophet_backtest",
+    "arima_backtest",
+    "lstm_backtest",
+    "naive_backtest",
+    "arima_1step_backtest",
+    "lstm_1step_backtest",
+]
 
 
 # ---------------------------------------------------------
@@ -62,22 +71,20 @@ def r2_score(y_true, y_pred):
 
 
 # ---------------------------------------------------------
-# LOAD PREDICTIONS WITH y_true (BACKTEST ROWS)
+# LOAD BACKTEST RESULTS
 # ---------------------------------------------------------
 def load_backtest_predictions():
     q = text("""
         SELECT
+            model_name,
             city,
             target,
-            model_name,
             horizon_months,
             predict_date,
             yhat AS y_pred,
             y_true
-        FROM public.model_predictions
+        FROM public.backtest_results
         WHERE model_name = ANY(:models)
-          AND y_true IS NOT NULL
-        ORDER BY city, target, model_name, predict_date;
     """)
 
     with engine.connect() as conn:
@@ -85,18 +92,72 @@ def load_backtest_predictions():
 
 
 # ---------------------------------------------------------
-# UPSERT INTO model_comparison
+# VECTORIZED METRICS
+# ---------------------------------------------------------
+GROUP_KEYS = ["model_name", "city", "target", "horizon_months"]
+METRIC_COLS = ["mae", "mape", "rmse", "mse", "r2"]
+
+
+def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    MAE / MAPE / RMSE / MSE / R² for every (model, city, target, horizon)
+    group in one pass: per-row error columns, then a single groupby-agg.
+    Same definitions as the scalar helpers above.
+    """
+    y_true = df["y_true"].astype(float)
+    y_pred = df["y_pred"].astype(float)
+    err = y_true - y_pred
+
+    # squared deviation from the group mean of y_true, for R²
+    group_mean = y_true.groupby([df[k] for k in GROUP_KEYS]).transform("mean")
+
+    work = df[GROUP_KEYS].assign(
+        abs_err=err.abs(),
+        ape=(err / y_true).abs() * 100,
+        sq_err=err**2,
+        sq_dev=(y_true - group_mean) ** 2,
+    )
+
+    out = work.groupby(GROUP_KEYS, sort=True).agg(
+        mae=("abs_err", "mean"),
+        mape=("ape", "mean"),
+        mse=("sq_err", "mean"),
+        ss_res=("sq_err", "sum"),
+        ss_tot=("sq_dev", "sum"),
+    )
+    out["rmse"] = np.sqrt(out["mse"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["r2"] = 1 - out["ss_res"] / out["ss_tot"]
+
+    out = out.reset_index()
+    out["horizon_months"] = out["horizon_months"].astype(int)
+    out[METRIC_COLS] = out[METRIC_COLS].round(4)
+    return out[GROUP_KEYS + METRIC_COLS]
+
+
+# ---------------------------------------------------------
+# BULK UPSERT INTO model_comparison
 # ---------------------------------------------------------
-def upsert_comparison_row(row):
+def upsert_comparison(metrics: pd.DataFrame):
+    """All groups in one INSERT ... SELECT FROM unnest(...) ON CONFLICT."""
     sql = text("""
         INSERT INTO public.model_comparison (
             city, target, horizon_months, model_name,
             mae, mape, rmse, mse, r2, evaluated_at
         )
-        VALUES (
-            :city, :target, :horizon_months, :model_name,
-            :mae, :mape, :rmse, :mse, :r2, NOW()
-        )
+        SELECT city, target, horizon_months, model_name,
+               mae, mape, rmse, mse, r2, NOW()
+        FROM unnest(
+            CAST(:city AS text[]),
+            CAST(:target AS text[]),
+            CAST(:horizon_months AS int[]),
+            CAST(:model_name AS text[]),
+            CAST(:mae AS double precision[]),
+            CAST(:mape AS double precision[]),
+            CAST(:rmse AS double precision[]),
+            CAST(:mse AS double precision[]),
+            CAST(:r2 AS double precision[])
+        ) AS m(city, target, horizon_months, model_name, mae, mape, rmse, mse, r2)
         ON CONFLICT (city, target, horizon_months, model_name)
         DO UPDATE SET
             mae = EXCLUDED.mae,
@@ -107,8 +168,35 @@ def upsert_comparison_row(row):
             evaluated_at = NOW();
     """)
 
+    params = {col: metrics[col].tolist() for col in GROUP_KEYS + METRIC_COLS}
     with engine.begin() as conn:
-        conn.execute(sql, row)
+        conn.execute(sql, params)
+
+
+# ---------------------------------------------------------
+# EVALUATE + PUBLISH
+# ---------------------------------------------------------
+def evaluate(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score backtest rows (model_name, city, target, horizon_months, y_pred,
+    y_true), upsert model_comparison and export the JSON for the dashboard.
+    """
+    with profiling.stage("metrics"):
+        metrics = compute_metrics(df)
+    with profiling.stage("upsert"):
+        upsert_comparison(metrics)
+
+    summary = metrics.groupby(["model_name", "target"])["mape"].mean().round(4)
+    for (model, target), value in summary.items():
+        print(f"[OK] {model} — {target}: mean MAPE={value} across cities/horizons")
+    print(f"[OK] Upserted {len(metrics)} model_comparison rows.")
+
+    # Export JSON for dashboard
+    Path("./.debug").mkdir(exist_ok=True)
+    with open("./.debug/model_comparison.json", "w") as f:
+        json.dump(metrics.to_dict("records"), f, indent=2)
+
+    return metrics
 
 
 # ---------------------------------------------------------
@@ -116,43 +204,19 @@ def upsert_comparison_row(row):
 # ---------------------------------------------------------
 def main():
     print("[DEBUG] Loading backtest predictions...")
+    prof = profiling.RunProfile("compare_models")
 
-    df = load_backtest_predictions()
+    with prof.stage("load"):
+        df = load_backtest_predictions()
 
     if df.empty:
         print("[WARN] No backtest data found! Did you run the backtest scripts?")
         return
 
-    results = []
-
-    # Group by model, city, target, horizon
-    grouped = df.groupby(["model_name", "city", "target", "horizon_months"])
-
-    for (model, city, target, horizon), g in grouped:
-        y_true = g["y_true"].astype(float).values
-        y_pred = g["y_pred"].astype(float).values
-
-        res = {
-            "model_name": model,
-            "city": city,
-            "target": target,
-            "horizon_months": int(horizon),
-            "mae": round(mae(y_true, y_pred), 4),
-            "mape": round(mape(y_true, y_pred), 4),
-            "rmse": round(rmse(y_true, y_pred), 4),
-            "mse": round(mse(y_true, y_pred), 4),
-            "r2": round(r2_score(y_true, y_pred), 4),
-        }
-
-        upsert_comparison_row(res)
-        results.append(res)
-
-        print(f"[OK] {model} — {city}/{target}, h={horizon}: MAPE={res['mape']}")
-
-    # Export JSON for dashboard
-    Path("./.debug").mkdir(exist_ok=True)
-    with open("./.debug/model_comparison.json", "w") as f:
-        json.dump(results, f, indent=2)
+    # metrics / upsert stages are recorded inside evaluate()
+    with prof.stage("evaluate"):
+        evaluate(df)
+    prof.finish(engine)
 
     print("[DONE] Model comparison updated.")
 
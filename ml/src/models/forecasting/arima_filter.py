@@ -0,0 +1,71 @@
+"""
+arima_filter.py
+-----------------------------------------
+Rolling-origin ARIMA predictions from a single state-space pass.
+
+A fitted pmdarima model wraps a statsmodels SARIMAX result. Instead of
+predict(n_periods=1) + update(y) per month (each update re-runs the MLE and
+the Kalman smoother over the whole history), the validation observations
+are appended to the result with the fitted params held fixed and the
+Kalman filter runs once:
+
+    one_step_ahead  -> prediction for t given y[:t], for every validation t
+    h_step_ahead    -> 1..h step forecasts from every origin in the window
+"""
+
+import numpy as np
+
+
+def _extended(model, new_values):
+    """SARIMAX results over train + new values, params fixed (no refit)."""
+    new_values = np.asarray(new_values, dtype=float)
+    return model.arima_res_.append(new_values, refit=False)
+
+
+def one_step_ahead(model, new_values, alpha: float = 0.05):
+    """
+    One-step-ahead mean / lower / upper for each of `new_values`, each
+    conditioned on all observations before it (training data included).
+    Returns three arrays of len(new_values).
+    """
+    n_new = len(new_values)
+    res = _extended(model, new_values)
+    n_train = res.nobs - n_new
+
+    pred = res.get_prediction(start=n_train, end=res.nobs - 1, dynamic=False)
+    mean = np.asarray(pred.predicted_mean, dtype=float)
+    conf = np.asarray(pred.conf_int(alpha=alpha), dtype=float)
+    return mean, conf[:, 0], conf[:, 1]
+
+
+def h_step_ahead(model, new_values, horizon: int, alpha: float = 0.05):
+    """
+    1..horizon step forecasts from every origin in the new-values window.
+    Origin i forecasts positions i .. i+horizon-1 of `new_values` using the
+    observations before position i; steps past the window are omitted.
+
+    Returns a dict of equal-length arrays:
+        origin, step, index (into new_values), yhat, lower, upper
+    """
+    n_new = len(new_values)
+    res = _extended(model, new_values)
+    n_train = res.nobs - n_new
+
+    out = {k: [] for k in ("origin", "step", "index", "yhat", "lower", "upper")}
+    for origin in range(n_new):
+        end = min(origin + horizon, n_new) - 1
+        pred = res.get_prediction(
+            start=n_train + origin, end=n_train + end, dynamic=True
+        )
+        mean = np.asarray(pred.predicted_mean, dtype=float)
+        conf = np.asarray(pred.conf_int(alpha=alpha), dtype=float)
+
+        steps = np.arange(1, len(mean) + 1)
+        out["origin"].append(np.full(len(mean), origin))
+        out["step"].append(steps)
+        out["index"].append(origin + steps - 1)
+        out["yhat"].append(mean)
+        out["lower"].append(conf[:, 0])
+        out["upper"].append(conf[:, 1])
+
+    return {k: np.concatenate(v) if v else np.zeros(0) for k, v in out.items()}
@@ -0,0 +1,158 @@
+"""
+arima_registry.py
+-----------------------------------------
+Local registry of fitted ARIMA models per (city, target).
+
+A stepwise auto_arima search is by far the most expensive part of ARIMA
+training, yet the selected order rarely changes between monthly runs.
+The registry pickles the chosen order + fitted model per series and on the
+next run picks the cheapest valid path:
+
+    same series           -> reuse the stored model as is
+    appended observations -> model.update(new_obs)       (warm start)
+    revised history       -> refit the stored order, start_params = old params
+    no entry / stale / drift -> full order search (search_fn)
+
+A new search is forced when the stored search is older than
+HIRD_ARIMA_RESEARCH_DAYS (default 30) or when the new observations fall
+outside the stored model's 99% forecast interval (drift).
+
+Configuration:
+    HIRD_ARIMA_REGISTRY_DIR   registry directory (default: .cache/arima_registry)
+    HIRD_ARIMA_RESEARCH_DAYS  days between forced order searches
+    HIRD_ARIMA_FORCE_SEARCH=1 ignore the registry and search every series
+"""
+
+import hashlib
+import os
+import pickle
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pmdarima as pm
+
+REGISTRY_DIR = Path(os.getenv("HIRD_ARIMA_REGISTRY_DIR", ".cache/arima_registry"))
+RESEARCH_DAYS = int(os.getenv("HIRD_ARIMA_RESEARCH_DAYS", "30"))
+DRIFT_ALPHA = 0.01
+
+
+def _fingerprint(values: np.ndarray) -> str:
+    data = np.ascontiguousarray(values, dtype=float).tobytes()
+    return hashlib.sha256(data).hexdigest()
+
+
+def _entry_path(city: str, target: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{city}__{target}")
+    return REGISTRY_DIR / f"{slug}.pkl"
+
+
+def load_entry(city: str, target: str):
+    path = _entry_path(city, target)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"[WARN] Unreadable ARIMA registry entry {path.name}: {e}")
+        return None
+
+
+def save_entry(city: str, target: str, model, values: np.ndarray, searched_at):
+    path = _entry_path(city, target)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "order": model.order,
+        "seasonal_order": model.seasonal_order,
+        "with_intercept": model.with_intercept,
+        "model": model,
+        "n_obs": len(values),
+        "fingerprint": _fingerprint(values),
+        "searched_at": searched_at,
+        "updated_at": datetime.now(timezone.utc),
+    }
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _search_due(entry) -> bool:
+    if os.getenv("HIRD_ARIMA_FORCE_SEARCH") == "1":
+        return True
+    age = datetime.now(timezone.utc) - entry["searched_at"]
+    return age > timedelta(days=RESEARCH_DAYS)
+
+
+def _drifted(model, new_obs: np.ndarray) -> bool:
+    """True if any new observation is outside the model's 99% interval."""
+    _, conf = model.predict(
+        n_periods=len(new_obs), return_conf_int=True, alpha=DRIFT_ALPHA
+    )
+    conf = np.asarray(conf)
+    return bool(np.any((new_obs < conf[:, 0]) | (new_obs > conf[:, 1])))
+
+
+def refit_order(entry, values: np.ndarray):
+    """Refit the stored order on `values`, warm-started from the stored params."""
+    model = pm.ARIMA(
+        order=entry["order"],
+        seasonal_order=entry["seasonal_order"],
+        with_intercept=entry["with_intercept"],
+        start_params=entry["model"].params(),
+        suppress_warnings=True,
+    )
+    return model.fit(values)
+
+
+def fit_or_update(city: str, target: str, series, search_fn):
+    """
+    Return a fitted pmdarima model for `series`, reusing the registry where
+    possible; search_fn(series) runs the full order search when needed.
+    """
+    values = np.asarray(series, dtype=float)
+    entry = load_entry(city, target)
+    now = datetime.now(timezone.utc)
+
+    if entry is None or _search_due(entry):
+        reason = "no registry entry" if entry is None else "scheduled re-search"
+        return _search(city, target, values, search_fn, reason, now)
+
+    n_old = entry["n_obs"]
+    model = entry["model"]
+
+    # unchanged series: nothing to fit
+    if len(values) == n_old and _fingerprint(values) == entry["fingerprint"]:
+        print(f"[DEBUG] ARIMA{entry['order']} reused for {city}/{target}")
+        return model
+
+    # appended months: warm-start update unless they look like drift
+    if len(values) > n_old and _fingerprint(values[:n_old]) == entry["fingerprint"]:
+        new_obs = values[n_old:]
+        if _drifted(model, new_obs):
+            return _search(city, target, values, search_fn, "drift", now)
+        model.update(new_obs)
+        save_entry(city, target, model, values, entry["searched_at"])
+        print(
+            f"[DEBUG] ARIMA{entry['order']} updated with {len(new_obs)} obs "
+            f"for {city}/{target}"
+        )
+        return model
+
+    # history revised (or shortened): keep the order, refit the params
+    try:
+        model = refit_order(entry, values)
+    except Exception as e:
+        return _search(city, target, values, search_fn, f"refit failed: {e}", now)
+    save_entry(city, target, model, values, entry["searched_at"])
+    print(f"[DEBUG] ARIMA{entry['order']} refit for {city}/{target}")
+    return model
+
+
+def _search(city, target, values, search_fn, reason, now):
+    print(f"[DEBUG] ARIMA order search for {city}/{target} ({reason})")
+    model = search_fn(values)
+    save_entry(city, target, model, values, now)
+    return model
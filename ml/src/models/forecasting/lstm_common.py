@@ -0,0 +1,222 @@
+"""
+lstm_common.py
+-----------------------------------------
+Shared LSTM inference helpers for the forecasting and backtest scripts.
+
+Keras `model.predict` builds a data pipeline and callbacks on every call,
+which dominates the cost of tiny (1, SEQ_LEN, F) inputs in a recursive loop.
+Here inference goes through one traced `tf.function` per model that calls
+`model(x, training=False)` directly, and every recursive step predicts all
+series that share a model in a single batch.
+
+Supervised windows are built with `sliding_window_view`, so X for a single
+series is a zero-copy view of the feature matrix.
+
+Training helpers: `reusable_model` keeps one compiled network per input shape
+and process and resets it between series (initial weights + optimizer state)
+instead of rebuilding it, so Keras traces its train function once. With
+HIRD_LSTM_DETERMINISTIC=1, `seed_training` makes fits reproducible: fixed
+seeds (HIRD_LSTM_SEED, default 42), deterministic TF ops and fixed
+intra/inter-op threads (HIRD_LSTM_THREADS, else HIRD_TRAIN_THREADS, else 1).
+"""
+
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
+
+SEED = int(os.getenv("HIRD_LSTM_SEED", "42"))
+
+_DETERMINISM_READY = False
+# key -> (compiled model, initial weights, initial optimizer variables)
+_MODELS = {}
+
+
+# -------------------------------------------
+# WINDOW BUILDING
+# -------------------------------------------
+def make_windows(values, seq_len: int):
+    """
+    Every full trailing window that has a next step to predict.
+    values: (n,) or (n, F) -> (n - seq_len, seq_len) or (n - seq_len, seq_len, F).
+    Window i covers rows i .. i+seq_len-1 and is a read-only view of `values`.
+    """
+    values = np.asarray(values)
+    n_windows = max(len(values) - seq_len, 0)
+    if n_windows == 0:
+        return np.zeros((0, seq_len) + values.shape[1:], dtype=values.dtype)
+
+    view = sliding_window_view(values, seq_len, axis=0)[:n_windows]
+    if values.ndim == 2:
+        # (windows, F, seq_len) -> (windows, seq_len, F), still a view
+        view = view.transpose(0, 2, 1)
+    return view
+
+
+def next_values(target, seq_len: int):
+    """Target right after each window: target[seq_len:]."""
+    return np.asarray(target)[seq_len:]
+
+
+def next_pct_change(target, seq_len: int):
+    """(next - last) / last for each window, last = final value in the window."""
+    target = np.asarray(target, dtype=float)
+    last = target[seq_len - 1 : -1]
+    nxt = target[seq_len:]
+    return (nxt - last) / last
+
+
+def stack_windows(series, seq_len: int, target_fn=next_values):
+    """
+    Pool several series into one training tensor.
+
+    series: iterable of (values, target) per city.
+    Returns (X, y, owner) where owner[i] is the index of the series window i
+    came from. X is one contiguous copy (the only copy made).
+    """
+    Xs, ys, owners = [], [], []
+    for idx, (values, target) in enumerate(series):
+        X = make_windows(values, seq_len)
+        if len(X) == 0:
+            continue
+        Xs.append(X)
+        ys.append(target_fn(target, seq_len))
+        owners.append(np.full(len(X), idx, dtype=np.int32))
+
+    if not Xs:
+        return np.zeros((0, seq_len)), np.zeros(0), np.zeros(0, dtype=np.int32)
+    return np.concatenate(Xs), np.concatenate(ys), np.concatenate(owners)
+
+
+# -------------------------------------------
+# TRAINING RUNTIME
+# -------------------------------------------
+def deterministic() -> bool:
+    return os.getenv("HIRD_LSTM_DETERMINISTIC", "0") == "1"
+
+
+def _lstm_threads() -> int:
+    raw = os.getenv("HIRD_LSTM_THREADS") or os.getenv("HIRD_TRAIN_THREADS")
+    return int(raw) if raw else 1
+
+
+def seed_training(seed: int = SEED):
+    """
+    Deterministic mode only: enable op determinism and thread limits (once per
+    process), then reset every RNG so a fit does not depend on which series
+    ran before it in the same worker.
+    """
+    global _DETERMINISM_READY
+    if not deterministic():
+        return
+    if not _DETERMINISM_READY:
+        _DETERMINISM_READY = True
+        tf.config.experimental.enable_op_determinism()
+        threads = _lstm_threads()
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(threads)
+        except RuntimeError:
+            print("[WARN] TF runtime already started; LSTM thread limits not set")
+    tf.keras.utils.set_random_seed(seed)
+
+
+def reusable_model(key, build):
+    """
+    Compiled model for `key` (e.g. the input shape), built once per process.
+    Later calls restore the initial weights and optimizer state instead of
+    building and compiling a new network. The model is only valid until the
+    next call with the same key.
+    """
+    entry = _MODELS.get(key)
+    if entry is None:
+        model = build()
+        model.optimizer.build(model.trainable_variables)
+        opt_state = [v.numpy() for v in model.optimizer.variables]
+        _MODELS[key] = (model, model.get_weights(), opt_state)
+        return model
+
+    model, weights, opt_state = entry
+    model.set_weights(weights)
+    for var, value in zip(model.optimizer.variables, opt_state):
+        var.assign(value)
+    model.stop_training = False
+    return model
+
+
+class EpochThroughput(tf.keras.callbacks.Callback):
+    """Per-epoch wall time of a fit; prints samples/s when training ends."""
+
+    def __init__(self, n_samples: int, label: str = ""):
+        super().__init__()
+        self.n_samples = n_samples
+        self.label = label
+        self.epoch_secs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._t0 = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_secs.append(time.perf_counter() - self._t0)
+
+    def samples_per_sec(self) -> np.ndarray:
+        return self.n_samples / np.maximum(np.asarray(self.epoch_secs), 1e-9)
+
+    def on_train_end(self, logs=None):
+        if not self.epoch_secs:
+            return
+        # the first epoch includes tracing the train function
+        steady = self.samples_per_sec()[1:] if len(self.epoch_secs) > 1 else None
+        rate = np.median(steady) if steady is not None else self.samples_per_sec()[0]
+        print(
+            f"[DEBUG] LSTM fit {self.label}: {len(self.epoch_secs)} epochs, "
+            f"{rate:.0f} samples/s, first epoch {self.epoch_secs[0]:.2f}s"
+        )
+
+
+# -------------------------------------------
+# INFERENCE
+# -------------------------------------------
+def compiled_predictor(model):
+    """Traced `model(x, training=False)` for `model`, cached on the model."""
+    fn = getattr(model, "_hird_predict_fn", None)
+    if fn is None:
+
+        @tf.function(reduce_retracing=True)
+        def fn(x):
+            return model(x, training=False)
+
+        model._hird_predict_fn = fn
+    return fn
+
+
+def predict_batch(model, X) -> np.ndarray:
+    """Predict a (batch, SEQ_LEN, F) array in one call; returns shape (batch,)."""
+    X = np.asarray(X, dtype=np.float32)
+    if len(X) == 0:
+        return np.zeros(0, dtype=np.float32)
+    out = compiled_predictor(model)(tf.convert_to_tensor(X))
+    return np.asarray(out).reshape(len(X), -1)[:, 0]
+
+
+def recursive_forecast(model, windows, steps: int, next_row):
+    """
+    Roll `windows` (batch, SEQ_LEN, F) forward `steps` times in lockstep.
+
+    At every step all windows are predicted in one batch; next_row(step, preds)
+    must return the (batch, F) feature rows to append for the next step
+    (e.g. the last macro values with the target replaced by the forecast).
+    Returns the raw predictions as a (batch, steps) array.
+    """
+    windows = np.array(windows, dtype=np.float32, copy=True)
+    preds = np.empty((len(windows), steps), dtype=np.float64)
+
+    for step in range(steps):
+        p = predict_batch(model, windows)
+        preds[:, step] = p
+        new_rows = np.asarray(next_row(step, p), dtype=np.float32)
+        windows = np.concatenate([windows[:, 1:, :], new_rows[:, None, :]], axis=1)
+
+    return preds
@@ -0,0 +1,221 @@
+"""
+refresh_forecasts.py
+-----------------------------------------
+Incremental forecast refresh for when a new month of CREA HPI / CMHC rent lands.
+
+Instead of rerunning every trainer from scratch, each (model, city, target)
+series is compared with the origin of its current forecast in
+model_predictions. Only series with newer observations are refit, each one
+starting from its previous model:
+
+    ARIMA   -> registry warm start, model.update(new months) (arima_registry)
+    Prophet -> Stan initialised at the previous fit's params
+    LSTM    -> previous network fine-tuned for HIRD_LSTM_FINETUNE_EPOCHS
+
+Previous Prophet/LSTM models come from the artifact store's latest
+pointers; without a store they are trained from scratch. Only the refreshed
+series' forecast rows are replaced (one transaction per model). Pooled
+global-LSTM forecasts are left to a full `train_model_lstm --mode global` run.
+
+Usage:
+    python -m ml.src.models.forecasting.refresh_forecasts --models arima lstm
+    python -m ml.src.models.forecasting.refresh_forecasts --dry-run
+"""
+
+import argparse
+import os
+
+import pandas as pd
+from dotenv import load_dotenv, find_dotenv
+from sqlalchemy import create_engine, text
+
+from ml.src.models.training_executor import run_jobs, gather_frames
+from ml.src.utils.db_writer import copy_predictions
+
+load_dotenv(find_dotenv(usecwd=True))
+
+TARGETS = [
+    ("hpi_benchmark", "price"),
+    ("rent_avg_city", "rent"),
+]
+
+# CLI name -> model_name in model_predictions
+MODELS = {"arima": "arima1", "prophet": "prophet", "lstm": "lstm"}
+
+# Pooled global-LSTM rows share model_name "lstm" but are one model across all
+# cities (train_model_lstm.GLOBAL_FEATURES_VERSION); the per-city refresh
+# neither reads nor replaces them, a full global run does.
+GLOBAL_FEATURES_VERSION = "model_features_city_global_v1"
+
+_ORIGIN_SQL = text("""
+    SELECT city, target,
+           MAX(predict_date - horizon_months * INTERVAL '1 month')::date AS origin
+    FROM public.model_predictions
+    WHERE model_name = :model_name
+      AND NOT is_micro
+      AND y_true IS NULL
+      AND features_version IS DISTINCT FROM :global_version
+    GROUP BY city, target
+""")
+
+_DELETE_SQL = text("""
+    DELETE FROM public.model_predictions
+    WHERE model_name = :model_name
+      AND target = :target
+      AND city = ANY(:cities)
+      AND NOT is_micro
+      AND y_true IS NULL
+      AND features_version IS DISTINCT FROM :global_version
+""")
+
+
+def _get_engine():
+    url = os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
+    return create_engine(url, pool_pre_ping=True, future=True)
+
+
+# ---------------------------------------------------------
+# DETECT NEW OBSERVATIONS
+# ---------------------------------------------------------
+def forecast_origins(engine, model_name: str) -> pd.DataFrame:
+    """Last observed month behind each series' current forecast."""
+    with engine.connect() as conn:
+        df = pd.read_sql_query(
+            _ORIGIN_SQL,
+            conn,
+            params={
+                "model_name": model_name,
+                "global_version": GLOBAL_FEATURES_VERSION,
+            },
+        )
+    df["origin"] = pd.to_datetime(df["origin"])
+    return df
+
+
+def stale_series(features: pd.DataFrame, origins: pd.DataFrame, targets=TARGETS):
+    """
+    Series whose last observation is newer than their forecast origin
+    (or that have no forecast yet).
+
+    Returns city, target, target_col, last_date, origin, new_months
+    (new_months is NaN for series without a forecast).
+    """
+    frames = []
+    for target_col, target_name in targets:
+        last = (
+            features.dropna(subset=[target_col])
+            .groupby("city", sort=True)["date"]
+            .max()
+            .rename("last_date")
+            .reset_index()
+        )
+        last["target"] = target_name
+        last["target_col"] = target_col
+        frames.append(last)
+
+    out = pd.concat(frames, ignore_index=True).merge(
+        origins[["city", "target", "origin"]], on=["city", "target"], how="left"
+    )
+    last, origin = out["last_date"].dt, out["origin"].dt
+    out["new_months"] = (last.year - origin.year) * 12 + (last.month - origin.month)
+
+    stale = out["origin"].isna() | (out["new_months"] > 0)
+    cols = ["city", "target", "target_col", "last_date", "origin", "new_months"]
+    return out.loc[stale, cols].reset_index(drop=True)
+
+
+# ---------------------------------------------------------
+# REFIT AFFECTED SERIES
+# ---------------------------------------------------------
+def _trainer(model: str):
+    """(features, job function, job args builder) for one model."""
+    if model == "arima":
+        from ml.src.models.forecasting import train_model_arima as m
+
+        # the registry already applies model.update() to appended months
+        def args(g, row):
+            return (g, row.city, row.target_col, row.target)
+
+        return m.load_features(), m.forecast_city_target, args
+
+    if model == "prophet":
+        from ml.src.models.forecasting import train_model_prophet as m
+
+        def args(g, row):
+            return (g, row.city, row.target_col, row.target, True)
+
+        return m.load_features(), m.forecast_city_target, args
+
+    from ml.src.models.forecasting import train_model_lstm as m
+
+    def args(g, row):
+        return (g, row.target_col, row.target, [row.target_col] + m.MACRO_COLS, True)
+
+    return m.load_model_features(), m.forecast_city, args
+
+
+def replace_forecasts(engine, model_name: str, frame: pd.DataFrame):
+    """Swap the refreshed series' forecast rows in one transaction."""
+    with engine.begin() as conn:
+        for target, g in frame.groupby("target"):
+            conn.execute(
+                _DELETE_SQL,
+                {
+                    "model_name": model_name,
+                    "target": target,
+                    "cities": sorted(g["city"].unique()),
+                    "global_version": GLOBAL_FEATURES_VERSION,
+                },
+            )
+        copy_predictions(conn, frame)
+
+
+def refresh_model(engine, model: str, dry_run: bool = False) -> int:
+    model_name = MODELS[model]
+    features, fn, args = _trainer(model)
+    stale = stale_series(features, forecast_origins(engine, model_name))
+
+    if stale.empty:
+        print(f"[INFO] {model_name}: forecasts are up to date")
+        return 0
+
+    for row in stale.itertuples(index=False):
+        added = "new series" if pd.isna(row.origin) else f"+{row.new_months:.0f} mo"
+        print(f"[INFO] {model_name}: refresh {row.city}/{row.target} ({added})")
+    if dry_run:
+        return len(stale)
+
+    by_city = dict(tuple(features.groupby("city", sort=False)))
+    jobs = [
+        ((row.city, row.target), args(by_city[row.city], row))
+        for row in stale.itertuples(index=False)
+    ]
+    frame = gather_frames(run_jobs(fn, jobs))
+    if frame.empty:
+        print(f"[WARN] {model_name}: no forecasts produced")
+        return 0
+
+    replace_forecasts(engine, model_name, frame)
+    print(f"[OK] {model_name}: replaced {len(frame)} rows for {len(jobs)} series")
+    return len(jobs)
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def main(models=None, dry_run=False):
+    print("[DEBUG] Starting incremental forecast refresh...")
+    engine = _get_engine()
+    for model in models or list(MODELS):
+        refresh_model(engine, model, dry_run=dry_run)
+    print("[DONE] Forecast refresh complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=None)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only list the series to refresh"
+    )
+    opts = parser.parse_args()
+    main(opts.models, opts.dry_run)
@@ -11,14 +11,20 @@ Forecasting horizon: 1–60 months
 
 import pandas as pd
 import numpy as np
-import uuid
 import os
 import warnings
-from datetime import datetime, timezone
-from sqlalchemy import text, create_engine
+from sqlalchemy import create_engine
 from dotenv import load_dotenv, find_dotenv
 import pmdarima as pm
 
+from ml.src.models import artifact_store
+from ml.src.models.forecasting import arima_registry
+from ml.src.models.training_executor import run_jobs, gather_frames
+from ml.src.utils import profiling
+from ml.src.utils.db_writer import copy_predictions
+from ml.src.utils.feature_cache import load_model_features
+from ml.src.utils.prediction_frame import month_offsets, prediction_frame
+
 warnings.filterwarnings("ignore")
 
 # ---------------------------------------------------------
@@ -28,23 +34,18 @@ load_dotenv(find_dotenv(usecwd=True))
 DATABASE_URL = os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
 engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
 
+ARIMA_PARAMS = {"seasonal": False, "max_p": 5, "max_q": 5, "max_d": 2}
+CODE_VERSION = artifact_store.code_version(__file__, pm)
+
 
 # ---------------------------------------------------------
 # LOAD FEATURES
 # ---------------------------------------------------------
 def load_features():
-    q = """
-        SELECT
-            date,
-            city,
-            hpi_benchmark,
-            rent_avg_city
-        FROM public.model_features
-        ORDER BY city, date;
-    """
-    df = pd.read_sql(q, engine)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    return load_model_features(
+        engine,
+        ["date", "city", "hpi_benchmark", "rent_avg_city"],
+    )
 
 
 # ---------------------------------------------------------
@@ -53,13 +54,10 @@ def load_features():
 def fit_arima(series):
     return pm.auto_arima(
         series,
-        seasonal=False,
         error_action="ignore",
         suppress_warnings=True,
         stepwise=True,
-        max_p=5,
-        max_q=5,
-        max_d=2,
+        **ARIMA_PARAMS,
     )
 
 
@@ -71,86 +69,57 @@ def forecast_city_target(df, city, target_col, target_name):
 
     if len(g) < 36:
         print(f"[WARN] Not enough data for {city}/{target_name}")
-        return []
-
-    model = fit_arima(g[target_col])
+        return None
+
+    # Same inputs as a stored model: load it. Otherwise warm start from the
+    # registry; full auto_arima only when needed
+    series = g[target_col]
+    with profiling.stage("fit", "arima1", city, target_name):
+        model, uri = artifact_store.fetch_or_fit(
+            "arima1",
+            city,
+            target_name,
+            series,
+            ARIMA_PARAMS,
+            lambda: arima_registry.fit_or_update(city, target_name, series, fit_arima),
+            code=CODE_VERSION,
+        )
 
     # Forecast 60 months
-    fc, conf = model.predict(n_periods=60, return_conf_int=True)
+    with profiling.stage("predict", "arima1", city, target_name):
+        fc, conf = model.predict(n_periods=60, return_conf_int=True)
     fc = np.asarray(fc).reshape(-1)
     conf = np.asarray(conf)
 
     start_date = g["date"].max()
-
-    rows = []
-    for h in range(60):
-        forecast_date = start_date + pd.DateOffset(months=h + 1)
-
-        y_raw = max(0.0, float(fc[h]))
-        lo_raw = max(0.0, float(conf[h, 0]))
-        hi_raw = max(0.0, float(conf[h, 1]))
-
-        rows.append(
-            {
-                "run_id": str(uuid.uuid4()),
-                "model_name": "arima1",
-                "target": target_name,
-                "horizon_months": h + 1,
-                "city": city,
-                "property_type": None,
-                "beds": None,
-                "baths": None,
-                "sqft_min": None,
-                "sqft_max": None,
-                "year_built_min": None,
-                "year_built_max": None,
-                "predict_date": forecast_date,
-                "yhat": float(y_raw),
-                "yhat_lower": float(lo_raw),
-                "yhat_upper": float(hi_raw),
-                "features_version": "features_to_model_v1",
-                "model_artifact_uri": None,
-                "created_at": datetime.now(timezone.utc),
-                "is_micro": False,
-            }
-        )
+    artifact_store.mark_latest("arima1", city, target_name, uri, start_date)
+
+    frame = prediction_frame(
+        model_name="arima1",
+        target=target_name,
+        city=city,
+        predict_date=month_offsets(start_date, 60),
+        horizon_months=np.arange(1, 61),
+        yhat=fc,
+        yhat_lower=conf[:, 0],
+        yhat_upper=conf[:, 1],
+        features_version="features_to_model_v1",
+        model_artifact_uri=uri,
+    )
 
     print(f"[OK] ARIMA v2 forecast: {city}/{target_name}")
-    return rows
+    return frame
 
 
 # ---------------------------------------------------------
 # INSERT PREDICTIONS
 # ---------------------------------------------------------
-def write_predictions(rows):
-    if not rows:
+def write_predictions(df):
+    if df.empty:
         return
 
-    sql = text("""
-        INSERT INTO public.model_predictions (
-            run_id, model_name, target, horizon_months,
-            city, property_type,
-            beds, baths, sqft_min, sqft_max,
-            year_built_min, year_built_max,
-            predict_date, yhat, yhat_lower, yhat_upper,
-            features_version, model_artifact_uri,
-            created_at, is_micro
-        )
-        VALUES (
-            :run_id, :model_name, :target, :horizon_months,
-            :city, :property_type,
-            :beds, :baths, :sqft_min, :sqft_max,
-            :year_built_min, :year_built_max,
-            :predict_date, :yhat, :yhat_lower, :yhat_upper,
-            :features_version, :model_artifact_uri,
-            :created_at, :is_micro
-        );
-    """)
-
-    with engine.begin() as conn:
-        conn.execute(sql, rows)
-
-    print(f"[OK] Inserted {len(rows)} ARIMA predictions.")
+    copy_predictions(engine, df)
+    print(f"[OK] Inserted {len(df)} ARIMA predictions.")
 
 
 # ---------------------------------------------------------
@@ -158,15 +127,24 @@ def write_predictions(rows):
 # ---------------------------------------------------------
 def main():
     print("[DEBUG] Starting ARIMA ...")
+    prof = profiling.RunProfile("arima")
+
+    with prof.stage("load"):
+        df = load_features()
 
-    df = load_features()
-    all_rows = []
+    # One job per (city, target); each worker only receives its city slice
+    jobs = []
+    for city, g in df.groupby("city", sort=False):
+        jobs.append(((city, "price"), (g, city, "hpi_benchmark", "price")))
+        jobs.append(((city, "rent"), (g, city, "rent_avg_city", "rent")))
 
-    for city in df.city.unique():
-        all_rows.extend(forecast_city_target(df, city, "hpi_benchmark", "price"))
-        all_rows.extend(forecast_city_target(df, city, "rent_avg_city", "rent"))
+    results = run_jobs(forecast_city_target, jobs)
+    prof.add_jobs(results, model="arima1")
+    predictions = gather_frames(results)
 
-    write_predictions(all_rows)
+    with prof.stage("write"):
+        write_predictions(predictions)
+    prof.finish(engine)
     print("[DONE] ARIMA complete.")
 
 
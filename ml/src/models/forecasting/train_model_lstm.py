@@ -3,17 +3,37 @@ LSTM v1 — multivariate forecasting
 Option B (macro features)
 """
 
+import argparse
 import os
-import uuid
-from datetime import datetime, timezone
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+import tensorflow as tf
+from sqlalchemy import create_engine
 from dotenv import load_dotenv, find_dotenv
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
 
+from ml.src.models import artifact_store
+from ml.src.models.forecasting import lstm_common
+from ml.src.models.forecasting.lstm_common import (
+    EpochThroughput,
+    make_windows,
+    next_pct_change,
+    recursive_forecast,
+    reusable_model,
+    seed_training,
+    stack_windows,
+)
+from ml.src.models.training_executor import run_jobs, gather_frames
+from ml.src.utils import feature_cache, profiling
+from ml.src.utils.db_writer import copy_predictions
+from ml.src.utils.prediction_frame import (
+    concat_predictions,
+    month_offsets,
+    prediction_frame,
+)
+
 # -------------------------------------------
 # ENV
 # -------------------------------------------
@@ -24,21 +44,41 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
 SEQ_LEN = 12
 FORECAST_HORIZON = 60
 
+TARGETS = [
+    ("hpi_benchmark", "price"),
+    ("rent_avg_city", "rent"),
+]
+MACRO_COLS = ["mortgage_rate", "unemployment_rate", "cpi_yoy"]
+
+# "per_city": one network per (city, target); "global": one pooled network
+# per target trained on every city's windows
+LSTM_MODE = os.getenv("HIRD_LSTM_MODE", "per_city")
+GLOBAL_BATCH_SIZE = 64
+# features_version of forecast_global() rows (model_name "lstm" as well)
+GLOBAL_FEATURES_VERSION = "model_features_city_global_v1"
+
+# epochs when an incremental refresh fine-tunes the previous network
+FINETUNE_EPOCHS = int(os.getenv("HIRD_LSTM_FINETUNE_EPOCHS", "3"))
+
+CODE_VERSION = artifact_store.code_version(__file__, lstm_common.__file__, tf)
+
 
 # -------------------------------------------
 # LOAD DATA
 # -------------------------------------------
 def load_model_features():
-    q = """
-        SELECT city, date,
-               hpi_benchmark, rent_avg_city,
-               mortgage_rate, unemployment_rate, cpi_yoy
-        FROM public.model_features
-        ORDER BY city, date;
-    """
-    df = pd.read_sql(q, engine)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    return feature_cache.load_model_features(
+        engine,
+        [
+            "city",
+            "date",
+            "hpi_benchmark",
+            "rent_avg_city",
+            "mortgage_rate",
+            "unemployment_rate",
+            "cpi_yoy",
+        ],
+    )
 
 
 # -------------------------------------------
@@ -59,174 +99,308 @@ def build_lstm(n_features):
     return model
 
 
+def new_model(n_features):
+    """Untrained build_lstm network; one compiled instance reused per process."""
+    return reusable_model(("lstm", n_features), lambda: build_lstm(n_features))
+
+
 # -------------------------------------------
-# FORECAST ONE CITY/TARGET
+# SHARED HELPERS
 # -------------------------------------------
-def forecast_city(df_city, target_col, target_name, feature_cols):
+def prepare_city(df_city, feature_cols):
     df_city = df_city.sort_values("date").copy()
 
     # fill missing
     for c in feature_cols:
         df_city[c] = df_city[c].ffill().bfill()
+    return df_city
+
+
+def forecast_rows(
+    city, target_name, last_date, base, pcts, features_version, artifact_uri=None
+):
+    """Prediction frame from the per-step base price and predicted % change."""
+    pcts = np.clip(pcts, -0.30, 0.30)
+
+    return prediction_frame(
+        model_name="lstm",
+        target=target_name,
+        city=city,
+        predict_date=month_offsets(last_date, len(pcts)),
+        horizon_months=np.arange(1, len(pcts) + 1),
+        yhat=base * (1 + pcts),
+        yhat_lower=base * (1 + pcts - 0.05),
+        yhat_upper=base * (1 + pcts + 0.05),
+        features_version=features_version,
+        model_artifact_uri=artifact_uri,
+    )
 
-    values = df_city[feature_cols].values
-    target_vals = df_city[target_col].values
-
-    X, y = [], []
 
-    # build supervised pairs
-    for i in range(len(values) - SEQ_LEN):
-        window = values[i : i + SEQ_LEN]
-        last_target = target_vals[i + SEQ_LEN - 1]
-        next_target = target_vals[i + SEQ_LEN]
-        pct_change = (next_target - last_target) / last_target
+# -------------------------------------------
+# FORECAST ONE CITY/TARGET
+# -------------------------------------------
+def forecast_city(df_city, target_col, target_name, feature_cols, warm_start=False):
+    df_city = prepare_city(df_city, feature_cols)
 
-        X.append(window)
-        y.append(pct_change)
+    values = df_city[feature_cols].values
+    target_vals = df_city[target_col].values
 
-    X = np.array(X)
-    y = np.array(y)
+    # build supervised pairs: 12-month windows -> next-month % change
+    X = make_windows(values, SEQ_LEN)
+    y = next_pct_change(target_vals, SEQ_LEN)
 
     if len(X) < 50:
-        return []
+        return None
+
+    city = df_city.city.iloc[0]
+    label = f"{city}/{target_name}"
+
+    # warm start: fine-tune the previous network for a few epochs on the
+    # extended history instead of training from scratch; the parent and the
+    # fine-tune epochs are part of the key so it never passes as a cold fit
+    params = {"features": feature_cols, "seq_len": SEQ_LEN, "epochs": 35, "batch": 16}
+    parent = None
+    if warm_start:
+        parent, parent_uri = artifact_store.latest("lstm", city, target_name)
+        if parent is not None:
+            params.update(warm_start=True, epochs=FINETUNE_EPOCHS, parent=parent_uri)
+
+    def fit():
+        seed_training()
+        model = parent if parent is not None else new_model(len(feature_cols))
+        model.fit(
+            X,
+            y,
+            epochs=params["epochs"],
+            batch_size=16,
+            verbose=0,
+            callbacks=[EpochThroughput(len(X), label)],
+        )
+        return model
+
+    with profiling.stage("fit", "lstm", city, target_name):
+        model, uri = artifact_store.fetch_or_fit(
+            "lstm",
+            city,
+            target_name,
+            values,
+            params,
+            fit,
+            code=CODE_VERSION,
+        )
 
-    model = build_lstm(n_features=len(feature_cols))
-    model.fit(X, y, epochs=35, batch_size=16, verbose=0)
+    artifact_store.mark_latest("lstm", city, target_name, uri, df_city["date"].max())
 
     # last window (multivariate)
     last_window = values[-SEQ_LEN:].reshape(1, SEQ_LEN, len(feature_cols))
+    target_idx = feature_cols.index(target_col)
+
+    # recursive forecast: feed each forecast back as the next target value,
+    # macro features held at their last observed values
+    step_price = []
     last_real_price = float(target_vals[-1])
-    last_date = df_city["date"].max()
 
-    rows = []
+    def next_row(step, preds):
+        nonlocal last_real_price
+        step_price.append(last_real_price)
+        last_real_price *= 1 + np.clip(float(preds[0]), -0.30, 0.30)
+        new_row = values[-1].copy()
+        new_row[target_idx] = last_real_price  # replace only target
+        return new_row[None, :]
+
+    with profiling.stage("predict", "lstm", city, target_name):
+        pcts = recursive_forecast(model, last_window, FORECAST_HORIZON, next_row)[0]
+
+    frame = forecast_rows(
+        city,
+        target_name,
+        df_city["date"].max(),
+        np.asarray(step_price),
+        pcts,
+        "model_features_city_simple_v1",
+        uri,
+    )
 
-    for horizon in range(1, FORECAST_HORIZON + 1):
-        pct = float(model.predict(last_window, verbose=0)[0][0])
-        pct = np.clip(pct, -0.30, 0.30)
+    print(f"[OK] LSTM: {city} / {target_name}")
+    return frame
 
-        yhat = last_real_price * (1 + pct)
-        yhat_lower = last_real_price * (1 + pct - 0.05)
-        yhat_upper = last_real_price * (1 + pct + 0.05)
 
-        predict_date = last_date + pd.DateOffset(months=horizon)
+# -------------------------------------------
+# GLOBAL MODEL: ALL CITIES, ONE TARGET
+# -------------------------------------------
+def forecast_global(df, target_col, target_name, feature_cols):
+    """
+    Train one pooled LSTM on every city's windows and forecast all cities
+    together. Each timestep carries a one-hot city code, and the target
+    feature is divided by the city's mean level so cities share a scale
+    (the % change target is already scale-free).
+    """
+    cities, series = [], []
+    for city, g in df.groupby("city", sort=True):
+        g = prepare_city(g, feature_cols)
+        values = g[feature_cols].to_numpy(dtype=float)
+        target_vals = g[target_col].to_numpy(dtype=float)
+        if len(values) - SEQ_LEN < 50 or not np.isfinite(target_vals).all():
+            print(f"[WARN] LSTM global: skipping {city}/{target_name}")
+            continue
+        cities.append((city, g["date"].max(), target_vals))
+        series.append(values)
+
+    if not cities:
+        return None
+
+    n_cities = len(cities)
+    target_idx = feature_cols.index(target_col)
+    scales = np.array([t.mean() for _, _, t in cities])
+    eye = np.eye(n_cities)
+
+    def with_city(values, idx):
+        scaled = values.copy()
+        scaled[:, target_idx] /= scales[idx]
+        onehot = np.broadcast_to(eye[idx], (len(values), n_cities))
+        return np.hstack([scaled, onehot])
+
+    inputs = [with_city(v, i) for i, v in enumerate(series)]
+    X, y, _ = stack_windows(
+        [(x, t) for x, (_, _, t) in zip(inputs, cities)],
+        SEQ_LEN,
+        target_fn=next_pct_change,
+    )
 
-        rows.append(
+    def fit():
+        seed_training()
+        model = new_model(X.shape[2])
+        model.fit(
+            X,
+            y,
+            epochs=35,
+            batch_size=GLOBAL_BATCH_SIZE,
+            verbose=0,
+            callbacks=[EpochThroughput(len(X), f"global/{target_name}")],
+        )
+        return model
+
+    with profiling.stage("fit", "lstm_global", "all", target_name):
+        model, uri = artifact_store.fetch_or_fit(
+            "lstm_global",
+            "all",
+            target_name,
+            np.concatenate(inputs),
             {
-                "run_id": str(uuid.uuid4()),
-                "model_name": "lstm",
-                "target": target_name,
-                "horizon_months": horizon,
-                "city": df_city.city.iloc[0],
-                "property_type": None,
-                "beds": None,
-                "baths": None,
-                "sqft_min": None,
-                "sqft_max": None,
-                "year_built_min": None,
-                "year_built_max": None,
-                "predict_date": predict_date,
-                "yhat": float(yhat),
-                "yhat_lower": float(max(0, yhat_lower)),
-                "yhat_upper": float(max(0, yhat_upper)),
-                "features_version": "model_features_city_simple_v1",
-                "model_artifact_uri": None,
-                "created_at": datetime.now(timezone.utc),
-                "is_micro": False,
-            }
+                "cities": [c for c, _, _ in cities],
+                "features": feature_cols,
+                "seq_len": SEQ_LEN,
+                "epochs": 35,
+                "batch": GLOBAL_BATCH_SIZE,
+            },
+            fit,
+            code=CODE_VERSION,
         )
 
-        last_real_price = yhat
-
-        # recursive forecast
-        new_row = values[-1].copy()
-        new_row[feature_cols.index(target_col)] = yhat  # replace only target
-
-        new_val = new_row.reshape(1, 1, len(feature_cols))
-        last_window = np.concatenate([last_window[:, 1:, :], new_val], axis=1)
+    # all cities roll forward in lockstep: one model call per step
+    windows = np.stack([x[-SEQ_LEN:] for x in inputs])
+    last_rows = np.stack([x[-1] for x in inputs])
+    prices = np.array([t[-1] for _, _, t in cities])
+    step_price = np.empty((n_cities, FORECAST_HORIZON))
+
+    def next_row(step, preds):
+        step_price[:, step] = prices
+        prices[:] = prices * (1 + np.clip(preds, -0.30, 0.30))
+        rows = last_rows.copy()
+        rows[:, target_idx] = prices / scales  # replace only target
+        return rows
+
+    with profiling.stage("predict", "lstm_global", "all", target_name):
+        pcts = recursive_forecast(model, windows, FORECAST_HORIZON, next_row)
+
+    frame = concat_predictions(
+        forecast_rows(
+            city,
+            target_name,
+            last_date,
+            step_price[i],
+            pcts[i],
+            GLOBAL_FEATURES_VERSION,
+            uri,
+        )
+        for i, (city, last_date, _) in enumerate(cities)
+    )
 
-    print(f"[OK] LSTM: {df_city.city.iloc[0]} / {target_name}")
-    return rows
+    print(f"[OK] LSTM global: {n_cities} cities / {target_name}")
+    return frame
 
 
 # -------------------------------------------
 # WRITE PREDICTIONS
 # -------------------------------------------
-def write_predictions(rows):
-    if not rows:
+def write_predictions(df):
+    if df.empty:
         return
 
-    sql = text("""
-        INSERT INTO public.model_predictions (
-            run_id, model_name, target, horizon_months,
-            city, property_type, beds, baths,
-            sqft_min, sqft_max,
-            year_built_min, year_built_max,
-            predict_date, yhat, yhat_lower, yhat_upper,
-            features_version, model_artifact_uri,
-            created_at, is_micro
-        )
-        VALUES (
-            :run_id, :model_name, :target, :horizon_months,
-            :city, :property_type, :beds, :baths,
-            :sqft_min, :sqft_max,
-            :year_built_min, :year_built_max,
-            :predict_date, :yhat, :yhat_lower, :yhat_upper,
-            :features_version, :model_artifact_uri,
-            :created_at, :is_micro
-        );
-    """)
-
-    with engine.begin() as conn:
-        conn.execute(sql, rows)
-
-    print(f"[OK] Inserted {len(rows)} LSTM rows")
+    copy_predictions(engine, df)
+    print(f"[OK] Inserted {len(df)} LSTM rows")
 
 
 # -------------------------------------------
 # MAIN
 # -------------------------------------------
-def main():
-    print("[DEBUG] LSTM starting...")
-
-    df = load_model_features()
-    all_rows = []
-
-    for city in df.city.unique():
-        df_city = df[df.city == city].copy()
-
-        # PRICE MODEL
-        all_rows.extend(
-            forecast_city(
-                df_city,
-                target_col="hpi_benchmark",
-                target_name="price",
-                feature_cols=[
-                    "hpi_benchmark",
-                    "mortgage_rate",
-                    "unemployment_rate",
-                    "cpi_yoy",
-                ],
+def main(mode=None):
+    mode = mode or LSTM_MODE
+    if lstm_common.deterministic():
+        print(f"[DEBUG] LSTM deterministic mode (seed {lstm_common.SEED})")
+    print(f"[DEBUG] LSTM starting ({mode})...")
+    prof = profiling.RunProfile(f"lstm_{mode}")
+
+    with prof.stage("load"):
+        df = load_model_features()
+
+    if mode == "global":
+        # One pooled network per target; cities add data, not jobs
+        jobs = [
+            (
+                ("global", target_name),
+                (df, target_col, target_name, [target_col] + MACRO_COLS),
             )
-        )
-
-        # RENT MODEL
-        all_rows.extend(
-            forecast_city(
-                df_city,
-                target_col="rent_avg_city",
-                target_name="rent",
-                feature_cols=[
-                    "rent_avg_city",
-                    "mortgage_rate",
-                    "unemployment_rate",
-                    "cpi_yoy",
-                ],
-            )
-        )
-
-    write_predictions(all_rows)
+            for target_col, target_name in TARGETS
+        ]
+        results = run_jobs(forecast_global, jobs)
+        prof.add_jobs(results, model="lstm_global")
+    else:
+        # One Keras fit per (city, target), fanned out over worker processes
+        jobs = []
+        for city, df_city in df.groupby("city", sort=False):
+            for target_col, target_name in TARGETS:
+                jobs.append(
+                    (
+                        (city, target_name),
+                        (df_city, target_col, target_name, [target_col] + MACRO_COLS),
+                    )
+                )
+        results = run_jobs(forecast_city, jobs)
+        prof.add_jobs(results, model="lstm")
+    predictions = gather_frames(results)
+
+    with prof.stage("write"):
+        write_predictions(predictions)
+    prof.finish(engine)
     print("[DONE] LSTM v1 complete.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mode",
+        choices=["per_city", "global"],
+        default=None,
+        help="per_city (default) or one pooled model per target",
+    )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="fixed seeds, deterministic ops and thread limits (reproducible runs)",
+    )
+    opts = parser.parse_args()
+    if opts.deterministic:
+        # read by every worker process as well
+        os.environ["HIRD_LSTM_DETERMINISTIC"] = "1"
+    main(opts.mode)
@@ -8,13 +8,20 @@ Targets:
 Forecast horizon: 1–60 months
 """
 
+import numpy as np
 import pandas as pd
-import uuid
 import os
-from datetime import datetime, timezone
+import prophet
 from dotenv import load_dotenv, find_dotenv
-from sqlalchemy import create_engine, text
-from prophet import Prophet
+from sqlalchemy import create_engine
+
+from ml.src.models import artifact_store
+from ml.src.models.forecasting import prophet_runner
+from ml.src.models.training_executor import run_jobs, gather_frames
+from ml.src.utils import profiling
+from ml.src.utils.db_writer import copy_predictions
+from ml.src.utils.feature_cache import load_model_features
+from ml.src.utils.prediction_frame import month_offsets, prediction_frame
 
 load_dotenv(find_dotenv(usecwd=True))
 DATABASE_URL = os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
@@ -28,121 +35,112 @@ REGRESSORS = [
     "roll_6_z",
 ]
 
+CODE_VERSION = artifact_store.code_version(__file__, prophet_runner.__file__, prophet)
+
 
 # ---------------------------------------------------------
 # LOAD FEATURES
 # ---------------------------------------------------------
 def load_features():
-    q = """
-        SELECT
-            date, city,
-            hpi_benchmark, rent_avg_city,
-            mortgage_rate_z, unemployment_rate_z, cpi_yoy_z,
-            roll_3_z, roll_6_z
-        FROM public.model_features
-        ORDER BY city, date;
-    """
-
-    df = pd.read_sql(q, engine)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    return load_model_features(
+        engine,
+        [
+            "date",
+            "city",
+            "hpi_benchmark",
+            "rent_avg_city",
+            "mortgage_rate_z",
+            "unemployment_rate_z",
+            "cpi_yoy_z",
+            "roll_3_z",
+            "roll_6_z",
+        ],
+    )
 
 
 # ---------------------------------------------------------
 # TRAIN PROPHET
 # ---------------------------------------------------------
-def forecast_city_target(df, city, target_col, target_name):
+def fit(train, city, target_name, init=None):
+    # init: Stan begins at a previous model's optimum (warm start)
+    label = f"{city}/{target_name}"
+    return prophet_runner.fit(train, REGRESSORS, label=label, init=init)
+
+
+def forecast_city_target(df, city, target_col, target_name, warm_start=False):
     g = df[df.city == city].sort_values("date").copy()
     if len(g) < 24:
         print(f"[WARN] Prophet: not enough history for {city}/{target_name}")
-        return []
+        return None
 
     dfp = g.rename(columns={"date": "ds", target_col: "y"})
     dfp["y"] = dfp["y"].astype(float)
 
-    model = Prophet()
-    for r in REGRESSORS:
-        model.add_regressor(r)
-
-    model.fit(dfp[["ds", "y"] + REGRESSORS])
-
-    # Create future dataframe for 60 months
-    future = model.make_future_dataframe(periods=60, freq="MS")
+    # Future frame: the 60 months after history only (predicting the history
+    # rows as well would just spend uncertainty samples on discarded output)
+    hist_end = g["date"].max()
+    future = pd.DataFrame({"ds": month_offsets(hist_end, 60)})
     # Attach regressors for forecasting period → use last known values
     last_vals = g.iloc[-1][REGRESSORS]
     for r in REGRESSORS:
-        future[r] = g[r].tolist() + [last_vals[r]] * 60
-
-    fc = model.predict(future)
-
-    rows = []
-    hist_end = g["date"].max()
-
-    forecast_df = fc[fc["ds"] > hist_end].copy().reset_index(drop=True)
-
-    for i, row in forecast_df.iterrows():
-        horizon = i + 1
-        rows.append(
-            {
-                "run_id": str(uuid.uuid4()),
-                "model_name": "prophet",
-                "target": target_name,
-                "horizon_months": horizon,
-                "city": city,
-                "property_type": None,
-                "beds": None,
-                "baths": None,
-                "sqft_min": None,
-                "sqft_max": None,
-                "year_built_min": None,
-                "year_built_max": None,
-                "predict_date": row["ds"],
-                "yhat": float(max(0.0, row["yhat"])),
-                "yhat_lower": float(max(0.0, row["yhat_lower"])),
-                "yhat_upper": float(max(0.0, row["yhat_upper"])),
-                "features_version": "features_to_model_v1",
-                "model_artifact_uri": None,
-                "created_at": datetime.now(timezone.utc),
-                "is_micro": False,
-            }
+        future[r] = last_vals[r]
+
+    # warm start: Stan begins at the previous model's optimum; the parent is
+    # part of the key so a warm fit never stands in for a cold one
+    init, params = None, {
+        "regressors": REGRESSORS,
+        "uncertainty_samples": prophet_runner.UNCERTAINTY_SAMPLES,
+    }
+    if warm_start:
+        prev, parent_uri = artifact_store.latest("prophet", city, target_name)
+        if prev is not None:
+            init = prophet_runner.warm_start_params(prev)
+            params.update(warm_start=True, parent=parent_uri)
+
+    # Refit only when the training frame, settings or code changed
+    train = dfp[["ds", "y"] + REGRESSORS]
+    with profiling.stage("fit", "prophet", city, target_name):
+        model, uri = artifact_store.fetch_or_fit(
+            "prophet",
+            city,
+            target_name,
+            train,
+            params,
+            lambda: fit(train, city, target_name, init),
+            code=CODE_VERSION,
         )
+    artifact_store.mark_latest("prophet", city, target_name, uri, hist_end)
+    with profiling.stage("predict", "prophet", city, target_name):
+        fc = prophet_runner.predict(model, future)
+
+    forecast_df = fc[fc["ds"] > hist_end].reset_index(drop=True)
+
+    frame = prediction_frame(
+        model_name="prophet",
+        target=target_name,
+        city=city,
+        predict_date=forecast_df["ds"],
+        horizon_months=np.arange(1, len(forecast_df) + 1),
+        yhat=forecast_df["yhat"],
+        yhat_lower=forecast_df["yhat_lower"],
+        yhat_upper=forecast_df["yhat_upper"],
+        features_version="features_to_model_v1",
+        model_artifact_uri=uri,
+    )
 
     print(f"[OK] Prophet v2 forecast: {city}/{target_name}")
-    return rows
+    return frame
 
 
 # ---------------------------------------------------------
 # WRITE PREDICTIONS
 # ---------------------------------------------------------
-def write_predictions(rows):
-    if not rows:
+def write_predictions(df):
+    if df.empty:
         return
 
-    sql = text("""
-        INSERT INTO public.model_predictions(
-            run_id, model_name, target, horizon_months,
-            city, property_type,
-            beds, baths, sqft_min, sqft_max,
-            year_built_min, year_built_max,
-            predict_date, yhat, yhat_lower, yhat_upper,
-            features_version, model_artifact_uri,
-            created_at, is_micro
-        )
-        VALUES (
-            :run_id, :model_name, :target, :horizon_months,
-            :city, :property_type,
-            :beds, :baths, :sqft_min, :sqft_max,
-            :year_built_min, :year_built_max,
-            :predict_date, :yhat, :yhat_lower, :yhat_upper,
-            :features_version, :model_artifact_uri,
-            :created_at, :is_micro
-        );
-    """)
-
-    with engine.begin() as conn:
-        conn.execute(sql, rows)
-
-    print(f"[OK] Inserted {len(rows)} Prophet v2 predictions.")
+    copy_predictions(engine, df)
+    print(f"[OK] Inserted {len(df)} Prophet v2 predictions.")
 
 
 # ---------------------------------------------------------
@@ -150,15 +148,25 @@ def write_predictions(rows):
 # ---------------------------------------------------------
 def main():
     print("[DEBUG] Starting Prophet...")
+    prof = profiling.RunProfile("prophet")
+
+    with prof.stage("load"):
+        df = load_features()
 
-    df = load_features()
-    all_rows = []
+    # One job per (city, target); each worker only receives its city slice
+    jobs = []
+    for city, g in df.groupby("city", sort=False):
+        jobs.append(((city, "price"), (g, city, "hpi_benchmark", "price")))
+        jobs.append(((city, "rent"), (g, city, "rent_avg_city", "rent")))
 
-    for city in df.city.unique():
-        all_rows.extend(forecast_city_target(df, city, "hpi_benchmark", "price"))
-        all_rows.extend(forecast_city_target(df, city, "rent_avg_city", "rent"))
+    # Each worker loads the Stan backend once, before its first real fit
+    results = run_jobs(forecast_city_target, jobs, initializer=prophet_runner.warmup)
+    prof.add_jobs(results, model="prophet")
+    predictions = gather_frames(results)
 
-    write_predictions(all_rows)
+    with prof.stage("write"):
+        write_predictions(predictions)
+    prof.finish(engine)
     print("[DONE] Prophet complete.")
 
 
@@ -5,7 +5,11 @@
 import os
 import pandas as pd
 from sqlalchemy import create_engine, text
-from ml.src.utils.data_loader import load_timeseries
+from ml.src.utils.data_loader import (
+    load_timeseries,
+    load_timeseries_many,
+    series_cache,
+)
 from ml.src.utils.db_writer import write_forecasts
 from ml.src.models.run_models import run_forecasts
 from ml.src.models.run_models_micro_update import run_micro_forecast
@@ -81,9 +85,12 @@ def run_pipeline_micro():
     """Run micro forecast pipeline for test cities."""
     engine = _get_engine()
     run_list = ["Vancouver", "Kelowna"]
-    for city in run_list:
-        print(f"[INFO] Running forecasts for {city}")
-        _run_one(engine, metric="hpi_composite_sa", city=city)
+    # Prime the run-scoped series cache with a single query for all cities
+    with series_cache():
+        load_timeseries_many(engine, "hpi_composite_sa", run_list)
+        for city in run_list:
+            print(f"[INFO] Running forecasts for {city}")
+            _run_one(engine, metric="hpi_composite_sa", city=city)
     print("[DONE] Micro forecast pipeline completed.")
 
 
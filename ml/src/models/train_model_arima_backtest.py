@@ -9,19 +9,27 @@ TRAIN:
 VALIDATE:
     2021-01-01 → last available date
 
-Writes predictions with y_true to model_predictions.
+Writes one-step predictions with y_true to backtest_results as
+arima_1step_backtest: horizon_months = 1, origin = the month before each
+predicted month (the rolling-origin engine owns arima_backtest).
 """
 
 import pandas as pd
 import numpy as np
-import uuid
 import os
 import warnings
-from datetime import datetime, timezone
-from sqlalchemy import text, create_engine
+from sqlalchemy import create_engine
 from dotenv import load_dotenv, find_dotenv
 import pmdarima as pm
 
+from ml.src.models.forecasting.arima_filter import one_step_ahead
+from ml.src.utils.db_writer import replace_backtest_results
+from ml.src.utils.feature_cache import load_model_features
+from ml.src.utils.prediction_frame import (
+    concat_predictions,
+    prediction_frame,
+)
+
 warnings.filterwarnings("ignore")
 
 # ---------------------------------------------------------
@@ -33,23 +41,19 @@ engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
 
 CUTOFF = pd.Timestamp("2020-12-01")
 
+# "filter": one Kalman pass with fixed params (default, fast)
+# "update": legacy predict + update() loop, params re-estimated every month
+BACKTEST_MODE = os.getenv("HIRD_ARIMA_BACKTEST_MODE", "filter")
+
 
 # ---------------------------------------------------------
 # LOAD FEATURES
 # ---------------------------------------------------------
 def load_features():
-    q = """
-        SELECT
-            date,
-            city,
-            hpi_benchmark,
-            rent_avg_city
-        FROM public.model_features
-        ORDER BY city, date;
-    """
-    df = pd.read_sql(q, engine)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    return load_model_features(
+        engine,
+        ["date", "city", "hpi_benchmark", "rent_avg_city"],
+    )
 
 
 # ---------------------------------------------------------
@@ -68,6 +72,30 @@ def fit_arima(series):
     )
 
 
+# ---------------------------------------------------------
+# LEGACY ONE-STEP LOOP (predict + update per month)
+# ---------------------------------------------------------
+def one_step_by_update(model, actuals):
+    """
+    Original recursive loop: predict one step, then update() with the actual.
+    Each update re-estimates the params, so this is exact but slow; the
+    default fixed-params filter pass matches it to within ~0.2%.
+    """
+    preds, lowers, uppers = [], [], []
+    for value in actuals:
+        fc, conf = model.predict(n_periods=1, return_conf_int=True)
+        # Ensure consistent array shapes
+        fc = np.array(fc).reshape(-1)
+        conf = np.array(conf).reshape(-1, 2)
+        preds.append(float(fc[0]))
+        lowers.append(float(conf[0][0]))
+        uppers.append(float(conf[0][1]))
+
+        # Update ARIMA model with ACTUAL value so it stays realistic
+        model.update(value)
+    return preds, lowers, uppers
+
+
 # ---------------------------------------------------------
 # BACKTEST CITY + TARGET
 # ---------------------------------------------------------
@@ -80,98 +108,47 @@ def backtest_city_target(df, city, target_col, target_name):
 
     if len(train) < 36 or len(valid) < 6:
         print(f"[WARN] ARIMA backtest: not enough data for {city}/{target_name}")
-        return []
+        return None
 
     # Train ARIMA only on TRAIN data
     model = fit_arima(train[target_col])
 
-    rows = []
-
-    # Validation predictions: one-step ahead recursive forecasting
-    # ARIMA must be refit / updated as ground truth becomes available
-    history = train[target_col].tolist()
-
-    for _, row in valid.iterrows():
-        # Forecast next step
-        fc, conf = model.predict(n_periods=1, return_conf_int=True)
-        # Ensure consistent array shapes
-        fc = np.array(fc).reshape(-1)
-        conf = np.array(conf).reshape(-1, 2)
-        pred = float(fc[0])
-        lo = float(conf[0][0])
-        hi = float(conf[0][1])
-
-        # Append backtest prediction
-        rows.append(
-            {
-                "run_id": str(uuid.uuid4()),
-                "model_name": "arima_backtest",
-                "target": target_name,
-                "horizon_months": int(
-                    (row["date"].to_period("M") - CUTOFF.to_period("M")).n
-                ),
-                "city": city,
-                "property_type": None,
-                "beds": None,
-                "baths": None,
-                "sqft_min": None,
-                "sqft_max": None,
-                "year_built_min": None,
-                "year_built_max": None,
-                "predict_date": row["date"],
-                "yhat": max(0.0, pred),
-                "yhat_lower": max(0.0, lo),
-                "yhat_upper": max(0.0, hi),
-                "y_true": float(row[target_col]),  # <- TRUE VALUE
-                "features_version": "features_backtest_v1",
-                "model_artifact_uri": None,
-                "created_at": datetime.now(timezone.utc),
-                "is_micro": False,
-            }
-        )
+    # Validation predictions: one-step ahead, conditioned on all actuals so far
+    if BACKTEST_MODE == "update":
+        preds, lowers, uppers = one_step_by_update(model, valid[target_col])
+    else:
+        preds, lowers, uppers = one_step_ahead(model, valid[target_col].to_numpy())
+
+    frame = prediction_frame(
+        model_name="arima_1step_backtest",
+        target=target_name,
+        city=city,
+        predict_date=valid["date"],
+        horizon_months=1,
+        yhat=preds,
+        yhat_lower=lowers,
+        yhat_upper=uppers,
+        y_true=valid[target_col],
+        features_version="features_backtest_v1",
+    )
 
-        # Update ARIMA model with ACTUAL value so it stays realistic
-        history.append(row[target_col])
-        model.update(row[target_col])
+    # one-step rows: each forecast's origin is the month before it, so
+    # horizon_months means steps ahead of origin here as in backtest_engine
+    frame["origin"] = (frame["predict_date"].dt.to_period("M") - 1).dt.to_timestamp()
 
-    print(f"[OK] ARIMA backtest: {city}/{target_name} ({len(rows)} rows)")
-    return rows
+    print(f"[OK] ARIMA backtest: {city}/{target_name} ({len(frame)} rows)")
+    return frame
 
 
 # ---------------------------------------------------------
 # WRITE RESULTS
 # ---------------------------------------------------------
-def write_predictions(rows):
-    if not rows:
+def write_predictions(df):
+    if df.empty:
         return
 
-    sql = text("""
-        INSERT INTO public.model_predictions(
-            run_id, model_name, target, horizon_months,
-            city, property_type,
-            beds, baths, sqft_min, sqft_max,
-            year_built_min, year_built_max,
-            predict_date, yhat, yhat_lower, yhat_upper,
-            y_true,
-            features_version, model_artifact_uri,
-            created_at, is_micro
-        )
-        VALUES (
-            :run_id, :model_name, :target, :horizon_months,
-            :city, :property_type,
-            :beds, :baths, :sqft_min, :sqft_max,
-            :year_built_min, :year_built_max,
-            :predict_date, :yhat, :yhat_lower, :yhat_upper,
-            :y_true,
-            :features_version, :model_artifact_uri,
-            :created_at, :is_micro
-        );
-    """)
-
-    with engine.begin() as conn:
-        conn.execute(sql, rows)
-
-    print(f"[OK] Inserted {len(rows)} ARIMA BACKTEST predictions.")
+    replace_backtest_results(engine, df)
+    print(f"[OK] Inserted {len(df)} ARIMA BACKTEST results.")
 
 
 # ---------------------------------------------------------
@@ -181,13 +158,13 @@ def main():
     print("[DEBUG] Starting ARIMA BACKTEST...")
 
     df = load_features()
-    all_rows = []
+    frames = []
 
     for city in df.city.unique():
-        all_rows.extend(backtest_city_target(df, city, "hpi_benchmark", "price"))
-        all_rows.extend(backtest_city_target(df, city, "rent_avg_city", "rent"))
+        frames.append(backtest_city_target(df, city, "hpi_benchmark", "price"))
+        frames.append(backtest_city_target(df, city, "rent_avg_city", "rent"))
 
-    write_predictions(all_rows)
+    write_predictions(concat_predictions(frames))
 
     print("[DONE] ARIMA BACKTEST complete.")
 
@@ -9,21 +9,35 @@ TRAIN:
 VALIDATE:
     2021-01-01 → last available date in model_features
 
-Writes predictions with y_true into model_predictions.
+Writes one-step predictions with y_true into backtest_results as
+lstm_1step_backtest: horizon_months = 1, origin = the month before each
+predicted month (the rolling-origin engine owns lstm_backtest).
 """
 
 import os
-import uuid
 import numpy as np
 import pandas as pd
-from datetime import datetime, timezone
 from dotenv import load_dotenv, find_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
 from tensorflow.keras.callbacks import EarlyStopping
 from sklearn.preprocessing import MinMaxScaler
 
+from ml.src.models.forecasting.lstm_common import (
+    make_windows,
+    next_values,
+    predict_batch,
+    reusable_model,
+    seed_training,
+)
+from ml.src.utils.db_writer import replace_backtest_results
+from ml.src.utils.feature_cache import load_model_features
+from ml.src.utils.prediction_frame import (
+    concat_predictions,
+    prediction_frame,
+)
+
 # -------------------------------------------------------------------------
 # ENVIRONMENT
 # -------------------------------------------------------------------------
@@ -39,18 +53,10 @@ SEQ_LEN = 12  # 12-month input window
 # LOAD FEATURES
 # -------------------------------------------------------------------------
 def load_features():
-    q = """
-        SELECT
-            date,
-            city,
-            hpi_benchmark,
-            rent_avg_city
-        FROM public.model_features
-        ORDER BY city, date;
-    """
-    df = pd.read_sql(q, engine)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    return load_model_features(
+        engine,
+        ["date", "city", "hpi_benchmark", "rent_avg_city"],
+    )
 
 
 # -------------------------------------------------------------------------
@@ -73,36 +79,24 @@ def build_lstm(input_shape):
 # y: next value
 # -------------------------------------------------------------------------
 def create_sequences(series, seq_len=12):
-    X, y = [], []
-    for i in range(len(series) - seq_len):
-        X.append(series[i : i + seq_len])
-        y.append(series[i + seq_len])
-    return np.array(X), np.array(y)
+    return make_windows(series, seq_len), next_values(series, seq_len)
 
 
 # -------------------------------------------------------------------------
-# BACKTEST PER CITY AND TARGET
+# FIT ON A TRAINING SERIES (scaled 0–1)
 # -------------------------------------------------------------------------
-def backtest_city_target(df, city, target_col, target_name):
-    g = df[df.city == city].sort_values("date").copy()
-
-    train = g[g["date"] <= CUTOFF].copy()
-    valid = g[g["date"] > CUTOFF].copy()
-
-    if len(train) < SEQ_LEN + 24:
-        print(f"[WARN] LSTM backtest: not enough history for {city}/{target_name}")
-        return []
-
-    # Scale series 0–1
+def fit_lstm(values):
+    """Train the backtest LSTM on `values`; returns (model, fitted scaler)."""
     scaler = MinMaxScaler()
-    train_scaled = scaler.fit_transform(train[[target_col]]).flatten()
+    train_scaled = scaler.fit_transform(values.reshape(-1, 1)).flatten()
 
     # Training sequences
     X_train, y_train = create_sequences(train_scaled, SEQ_LEN)
     X_train = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
 
-    # Build and train LSTM
-    model = build_lstm((SEQ_LEN, 1))
+    # Reset (not rebuild) this process's network and train it
+    seed_training()
+    model = reusable_model(("backtest", SEQ_LEN), lambda: build_lstm((SEQ_LEN, 1)))
     model.fit(
         X_train,
         y_train,
@@ -114,96 +108,70 @@ def backtest_city_target(df, city, target_col, target_name):
         ],
         verbose=0,
     )
+    return model, scaler
+
+
+# -------------------------------------------------------------------------
+# BACKTEST PER CITY AND TARGET
+# -------------------------------------------------------------------------
+def backtest_city_target(df, city, target_col, target_name):
+    g = df[df.city == city].sort_values("date").copy()
+
+    train = g[g["date"] <= CUTOFF].copy()
+    valid = g[g["date"] > CUTOFF].copy()
+
+    if len(train) < SEQ_LEN + 24:
+        print(f"[WARN] LSTM backtest: not enough history for {city}/{target_name}")
+        return None
+
+    model, scaler = fit_lstm(train[target_col].to_numpy(dtype=float))
+
+    if valid.empty:
+        return None
 
     # Now backtest on validation period (2021–2024)
-    rows = []
-
-    # Start history with the last training window
-    history = train[target_col].values.tolist()
-
-    for _, row in valid.iterrows():
-        # Prepare last 12 months as input window
-        hist_scaled = scaler.transform(
-            np.array(history[-SEQ_LEN:]).reshape(-1, 1)
-        ).flatten()
-        X = np.array(hist_scaled).reshape(1, SEQ_LEN, 1)
-
-        # Predict next value
-        pred_scaled = model.predict(X, verbose=0)[0][0]
-        pred = scaler.inverse_transform([[pred_scaled]])[0][0]
-
-        # Actual value
-        y_true = float(row[target_col])
-        # Compute horizon versus cutoff
-        horizon = int((row["date"].to_period("M") - CUTOFF.to_period("M")).n)
-
-        rows.append(
-            {
-                "run_id": str(uuid.uuid4()),
-                "model_name": "lstm_backtest",
-                "target": target_name,
-                "horizon_months": horizon,
-                "city": city,
-                "property_type": None,
-                "beds": None,
-                "baths": None,
-                "sqft_min": None,
-                "sqft_max": None,
-                "year_built_min": None,
-                "year_built_max": None,
-                "predict_date": row["date"],
-                "yhat": float(max(0.0, pred)),
-                "yhat_lower": None,
-                "yhat_upper": None,
-                "y_true": y_true,
-                "features_version": "features_backtest_v1",
-                "model_artifact_uri": None,
-                "created_at": datetime.now(timezone.utc),
-                "is_micro": False,
-            }
-        )
-
-        # Update history with ACTUAL value (realistic recursive forecasting)
-        history.append(y_true)
-
-    print(f"[OK] LSTM backtest: {city}/{target_name} ({len(rows)} rows)")
-    return rows
+    # Every window ends on ACTUAL values (realistic one-step forecasting), so
+    # all validation windows are known up front and predicted in one batch.
+    series = np.concatenate([train[target_col].values, valid[target_col].values])
+    series_scaled = scaler.transform(series.reshape(-1, 1)).flatten()
+    n_train = len(train)
+
+    # windows ending right before each validation month
+    X_valid = make_windows(series_scaled[n_train - SEQ_LEN :], SEQ_LEN)
+    X_valid = X_valid.reshape(len(valid), SEQ_LEN, 1)
+
+    preds_scaled = predict_batch(model, X_valid)
+    preds = scaler.inverse_transform(preds_scaled.reshape(-1, 1)).flatten()
+
+    # no interval for the LSTM: bounds stay NULL
+    frame = prediction_frame(
+        model_name="lstm_1step_backtest",
+        target=target_name,
+        city=city,
+        predict_date=valid["date"],
+        horizon_months=1,
+        yhat=preds,
+        y_true=valid[target_col],
+        features_version="features_backtest_v1",
+    )
+
+    # one-step rows: each forecast's origin is the month before it, so
+    # horizon_months means steps ahead of origin here as in backtest_engine
+    frame["origin"] = (frame["predict_date"].dt.to_period("M") - 1).dt.to_timestamp()
+
+    print(f"[OK] LSTM backtest: {city}/{target_name} ({len(frame)} rows)")
+    return frame
 
 
 # -------------------------------------------------------------------------
 # WRITE PREDICTIONS TO DB
 # -------------------------------------------------------------------------
-def write_predictions(rows):
-    if not rows:
+def write_predictions(df):
+    if df.empty:
         return
 
-    sql = text("""
-        INSERT INTO public.model_predictions(
-            run_id, model_name, target, horizon_months,
-            city, property_type,
-            beds, baths, sqft_min, sqft_max,
-            year_built_min, year_built_max,
-            predict_date, yhat, yhat_lower, yhat_upper,
-            y_true,
-            features_version, model_artifact_uri,
-            created_at, is_micro
-        )
-        VALUES (
-            :run_id, :model_name, :target, :horizon_months,
-            :city, :property_type,
-            :beds, :baths, :sqft_min, :sqft_max,
-            :year_built_min, :year_built_max,
-            :predict_date, :yhat, :yhat_lower, :yhat_upper,
-            :y_true,
-            :features_version, :model_artifact_uri,
-            :created_at, :is_micro
-        );
-    """)
-
-    with engine.begin() as conn:
-        conn.execute(sql, rows)
-
-    print(f"[OK] Inserted {len(rows)} LSTM BACKTEST predictions.")
+    replace_backtest_results(engine, df)
+    print(f"[OK] Inserted {len(df)} LSTM BACKTEST results.")
 
 
 # -------------------------------------------------------------------------
@@ -213,13 +181,13 @@ def main():
     print("[DEBUG] Starting LSTM BACKTEST...")
 
     df = load_features()
-    all_rows = []
+    frames = []
 
     for city in df.city.unique():
-        all_rows.extend(backtest_city_target(df, city, "hpi_benchmark", "price"))
-        all_rows.extend(backtest_city_target(df, city, "rent_avg_city", "rent"))
+        frames.append(backtest_city_target(df, city, "hpi_benchmark", "price"))
+        frames.append(backtest_city_target(df, city, "rent_avg_city", "rent"))
 
-    write_predictions(all_rows)
+    write_predictions(concat_predictions(frames))
 
     print("[DONE] LSTM BACKTEST complete.")
 
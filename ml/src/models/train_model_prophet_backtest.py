@@ -6,16 +6,21 @@ Backtesting Prophet on historical data.
 Train:   2005-01-01 → 2020-12-01
 Validate:2021-01-01 → last available date
 
-Writes predictions with y_true into model_predictions.
+Writes predictions with y_true into backtest_results at origin 2020-12-01
+(horizon_months = months after it). Regressors are held at their last
+pre-cutoff value, so the rows score like backtest_engine's prophet_backtest.
 """
 
 import pandas as pd
-import uuid
 import os
-from datetime import datetime, timezone
 from dotenv import load_dotenv, find_dotenv
-from sqlalchemy import create_engine, text
-from prophet import Prophet
+from sqlalchemy import create_engine
+
+from ml.src.models.forecasting import prophet_runner
+from ml.src.models.training_executor import run_jobs, gather_frames
+from ml.src.utils.db_writer import replace_backtest_results
+from ml.src.utils.feature_cache import load_model_features
+from ml.src.utils.prediction_frame import months_between, prediction_frame
 
 # -------------------------------------------------------------------
 # ENVIRONMENT
@@ -39,20 +44,20 @@ REGRESSORS = [
 # LOAD FEATURES (processed dataset)
 # -------------------------------------------------------------------
 def load_features():
-    q = """
-        SELECT
-            date,
-            city,
-            hpi_benchmark,
-            rent_avg_city,
-            mortgage_rate_z, unemployment_rate_z, cpi_yoy_z,
-            roll_3_z, roll_6_z
-        FROM public.model_features
-        ORDER BY city, date;
-    """
-    df = pd.read_sql(q, engine)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+    return load_model_features(
+        engine,
+        [
+            "date",
+            "city",
+            "hpi_benchmark",
+            "rent_avg_city",
+            "mortgage_rate_z",
+            "unemployment_rate_z",
+            "cpi_yoy_z",
+            "roll_3_z",
+            "roll_6_z",
+        ],
+    )
 
 
 # -------------------------------------------------------------------
@@ -67,95 +72,49 @@ def backtest_city_target(df, city, target_col, target_name):
 
     if len(train) < 24 or len(valid) < 6:
         print(f"[WARN] Prophet backtest: not enough data for {city}/{target_name}")
-        return []
+        return None
 
     # Prepare Prophet frames
     dfp_train = train.rename(columns={"date": "ds", target_col: "y"})
     dfp_train["y"] = dfp_train["y"].astype(float)
 
-    model = Prophet()
-    for r in REGRESSORS:
-        model.add_regressor(r)
-
-    model.fit(dfp_train[["ds", "y"] + REGRESSORS])
-
-    # Predict only VALIDATION period
-    future = valid.rename(columns={"date": "ds"}).copy()
-    future["y"] = None  # unused but required for Prophet internal consistency
+    # Predict only VALIDATION period. roll_3_z / roll_6_z are built from the
+    # target, so every regressor is held at its last pre-cutoff value (as
+    # backtest_engine.run_task does) to keep the validation months unseen.
+    future = valid[["date"]].rename(columns={"date": "ds"})
+    future = future.assign(**train.iloc[-1][REGRESSORS].to_dict())
 
-    fc = model.predict(future)
-
-    rows = []
+    _, fc = prophet_runner.fit_predict(
+        dfp_train, future, REGRESSORS, label=f"{city}/{target_name} backtest"
+    )
 
     # fc rows correspond exactly to valid dates
-    for (_, pred_row), (_, val_row) in zip(fc.iterrows(), valid.iterrows()):
-        # Calculate horizon in months since cutoff date
-        horizon = int((pred_row["ds"].to_period("M") - CUTOFF.to_period("M")).n)
-
-        rows.append(
-            {
-                "run_id": str(uuid.uuid4()),
-                "model_name": "prophet_backtest",
-                "target": target_name,
-                "horizon_months": horizon,  # <-- FIXED HERE
-                "city": city,
-                "property_type": None,
-                "beds": None,
-                "baths": None,
-                "sqft_min": None,
-                "sqft_max": None,
-                "year_built_min": None,
-                "year_built_max": None,
-                "predict_date": pred_row["ds"],
-                "yhat": float(max(0.0, pred_row["yhat"])),
-                "yhat_lower": float(max(0.0, pred_row["yhat_lower"])),
-                "yhat_upper": float(max(0.0, pred_row["yhat_upper"])),
-                "y_true": float(val_row[target_col]),
-                "features_version": "features_backtest_v1",
-                "model_artifact_uri": None,
-                "created_at": datetime.now(timezone.utc),
-                "is_micro": False,
-            }
-        )
-
-    print(f"[OK] Prophet backtest: {city}/{target_name} ({len(rows)} rows)")
-    return rows
+    frame = prediction_frame(
+        model_name="prophet_backtest",
+        target=target_name,
+        city=city,
+        predict_date=fc["ds"],
+        horizon_months=months_between(fc["ds"], CUTOFF),
+        yhat=fc["yhat"],
+        yhat_lower=fc["yhat_lower"],
+        yhat_upper=fc["yhat_upper"],
+        y_true=valid[target_col],
+        features_version="features_backtest_v1",
+    )
+
+    print(f"[OK] Prophet backtest: {city}/{target_name} ({len(frame)} rows)")
+    return frame
 
 
 # -------------------------------------------------------------------
 # WRITE RESULTS
 # -------------------------------------------------------------------
-def write_predictions(rows):
-    if not rows:
+def write_predictions(df):
+    if df.empty:
         return
 
-    sql = text("""
-        INSERT INTO public.model_predictions(
-            run_id, model_name, target, horizon_months,
-            city, property_type,
-            beds, baths, sqft_min, sqft_max,
-            year_built_min, year_built_max,
-            predict_date, yhat, yhat_lower, yhat_upper,
-            y_true,                         -- <-- NEW!!
-            features_version, model_artifact_uri,
-            created_at, is_micro
-        )
-        VALUES (
-            :run_id, :model_name, :target, :horizon_months,
-            :city, :property_type,
-            :beds, :baths, :sqft_min, :sqft_max,
-            :year_built_min, :year_built_max,
-            :predict_date, :yhat, :yhat_lower, :yhat_upper,
-            :y_true,
-            :features_version, :model_artifact_uri,
-            :created_at, :is_micro
-        );
-    """)
-
-    with engine.begin() as conn:
-        conn.execute(sql, rows)
-
-    print(f"[OK] Inserted {len(rows)} Prophet BACKTEST predictions.")
+    replace_backtest_results(engine, df.assign(origin=CUTOFF))
+    print(f"[OK] Inserted {len(df)} Prophet BACKTEST results.")
 
 
 # -------------------------------------------------------------------
@@ -165,13 +124,18 @@ def main():
     print("[DEBUG] Starting Prophet BACKTEST...")
 
     df = load_features()
-    all_rows = []
 
-    for city in df.city.unique():
-        all_rows.extend(backtest_city_target(df, city, "hpi_benchmark", "price"))
-        all_rows.extend(backtest_city_target(df, city, "rent_avg_city", "rent"))
+    # One job per (city, target); workers warm the Stan backend once
+    jobs = []
+    for city, g in df.groupby("city", sort=False):
+        jobs.append(((city, "price"), (g, city, "hpi_benchmark", "price")))
+        jobs.append(((city, "rent"), (g, city, "rent_avg_city", "rent")))
+
+    predictions = gather_frames(
+        run_jobs(backtest_city_target, jobs, initializer=prophet_runner.warmup)
+    )
 
-    write_predictions(all_rows)
+    write_predictions(predictions)
 
     print("[DONE] Prophet BACKTEST complete.")
 
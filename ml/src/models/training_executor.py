@@ -0,0 +1,301 @@
+"""
+training_executor.py
+-----------------------------------------
+Shared executor for independent (city, target) training jobs.
+
+Each job (an auto_arima search, a Prophet fit, a Keras fit) is CPU-bound
+and independent, so jobs are fanned out over a ProcessPoolExecutor and the
+results are gathered in submission order for a single bulk write.
+
+Configuration (arguments override environment):
+    HIRD_TRAIN_WORKERS   worker processes (default: CPU count, 1 = run inline)
+    HIRD_TRAIN_TIMEOUT   per-job timeout in seconds (default: none)
+    HIRD_TRAIN_THREADS   BLAS/OpenMP/TF threads per worker (default: 1)
+
+Threads are pinned per worker (and for inline runs) so N workers do not
+each spawn N BLAS/TF threads and oversubscribe the machine.
+
+The per-job timeout is a SIGALRM inside the job, which only fires in the
+main thread and cannot interrupt native Stan/TF code. The parent therefore
+also stops waiting after every job could have hit its timeout (plus
+HIRD_TRAIN_RESULT_GRACE seconds, default 30), reports the jobs still
+outstanding as timed out and terminates the pool's workers.
+"""
+
+import math
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
+from ml.src.utils import profiling
+
+# extra seconds the parent waits past the job timeouts before giving up
+RESULT_GRACE = float(os.getenv("HIRD_TRAIN_RESULT_GRACE", "30"))
+
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS",
+    "TF_NUM_INTEROP_THREADS",
+]
+
+
+@dataclass
+class JobResult:
+    key: Hashable
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    process_peak_rss_mb: float = 0.0
+    stages: list = field(default_factory=list)
+    profile_path: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    raw = os.getenv(name)
+    return int(raw) if raw not in (None, "") else default
+
+
+def resolve_workers(max_workers: Optional[int] = None) -> int:
+    workers = max_workers or _env_int("HIRD_TRAIN_WORKERS", None) or os.cpu_count()
+    return max(1, int(workers or 1))
+
+
+# ---------------------------------------------------------
+# THREAD PINNING
+# ---------------------------------------------------------
+@contextmanager
+def pinned_thread_env(n_threads: int):
+    """Temporarily export thread limits so spawned workers inherit them."""
+    saved = {k: os.environ.get(k) for k in THREAD_ENV_VARS}
+    for k in THREAD_ENV_VARS:
+        os.environ[k] = str(n_threads)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def _blas_limits(n_threads: int):
+    """Limit BLAS/OpenMP pools already loaded in this process (inline runs)."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return nullcontext()
+    return threadpool_limits(limits=n_threads)
+
+
+def _pin_tensorflow(n_threads: int):
+    """Apply TF thread limits if TF is already loaded in this process."""
+    import sys
+
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(n_threads)
+    except RuntimeError:
+        # TF runtime already initialised; env vars still apply to new workers
+        pass
+
+
+def _worker_init(n_threads: int, initializer, initargs):
+    _pin_tensorflow(n_threads)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+# ---------------------------------------------------------
+# JOB EXECUTION
+# ---------------------------------------------------------
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def _run_job(fn: Callable, key, args: Tuple, timeout: Optional[float]) -> JobResult:
+    """
+    Run one job; SIGALRM enforces the timeout where available (POSIX).
+    CPU time, peak RSS and profiling.stage() records ride back on the result.
+    """
+    use_alarm = (
+        bool(timeout)
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, float(timeout))
+
+    start = time.perf_counter()
+    with profiling.job_profile(key) as prof:
+        try:
+            res = JobResult(key, value=fn(*args))
+        except JobTimeout:
+            res = JobResult(key, error=f"timed out after {timeout}s")
+        except Exception as e:
+            res = JobResult(
+                key, error=f"{e.__class__.__name__}: {e}\n{traceback.format_exc()}"
+            )
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous)
+
+    res.seconds = time.perf_counter() - start
+    res.cpu_seconds = prof["cpu_s"]
+    res.process_peak_rss_mb = prof["process_peak_rss_mb"]
+    res.stages = prof["stages"]
+    res.profile_path = prof["profile_path"]
+    return res
+
+
+def run_jobs(
+    fn: Callable,
+    jobs: Iterable[Tuple[Hashable, Tuple]],
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    threads_per_worker: Optional[int] = None,
+    initializer: Optional[Callable] = None,
+    initargs: Tuple = (),
+    on_result: Optional[Callable[[JobResult], None]] = None,
+) -> List[JobResult]:
+    """
+    Run fn(*args) for every (key, args) job and return JobResults in job order.
+
+    fn must be importable (module-level) so it can be pickled to workers.
+    With one worker, jobs run inline in this process (easier debugging).
+    Failed or timed-out jobs are reported and returned with .error set.
+    on_result, if given, is called in the parent as each job completes, so
+    downstream work (e.g. DB writes) can overlap with the remaining fits.
+    """
+    jobs = list(jobs)
+    workers = min(resolve_workers(max_workers), max(1, len(jobs)))
+    timeout = timeout if timeout is not None else _env_int("HIRD_TRAIN_TIMEOUT", None)
+    threads = threads_per_worker or _env_int("HIRD_TRAIN_THREADS", 1)
+
+    print(
+        f"[DEBUG] Training {len(jobs)} jobs on {workers} worker(s), "
+        f"{threads} thread(s) each, timeout={timeout or 'none'}"
+    )
+
+    results: List[Optional[JobResult]] = [None] * len(jobs)
+
+    def _done(i, res):
+        results[i] = res
+        _report(res)
+        if on_result is not None:
+            on_result(res)
+
+    if workers == 1:
+        with pinned_thread_env(threads), _blas_limits(threads):
+            _pin_tensorflow(threads)
+            if initializer is not None:
+                initializer(*initargs)
+            for i, (key, args) in enumerate(jobs):
+                _done(i, _run_job(fn, key, args, timeout))
+        return results
+
+    # every job could use its full timeout, one wave of `workers` at a time
+    deadline = None
+    if timeout:
+        deadline = math.ceil(len(jobs) / workers) * timeout + RESULT_GRACE
+
+    # spawn: workers never inherit a forked TF/BLAS runtime from the parent
+    ctx = mp.get_context("spawn")
+    with pinned_thread_env(threads):
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_worker_init,
+            initargs=(threads, initializer, initargs),
+        ) as pool:
+            futures = {
+                pool.submit(_run_job, fn, key, args, timeout): i
+                for i, (key, args) in enumerate(jobs)
+            }
+            started = time.monotonic()
+            try:
+                for fut in as_completed(futures, timeout=deadline):
+                    i = futures[fut]
+                    remaining = None
+                    if deadline is not None:
+                        remaining = max(deadline - (time.monotonic() - started), 0)
+                    try:
+                        res = fut.result(timeout=remaining)
+                    except Exception as e:
+                        # worker crashed (e.g. OOM kill) — keep the others going
+                        res = JobResult(jobs[i][0], error=f"worker failed: {e}")
+                    _done(i, res)
+            except TimeoutError:
+                # stuck in native code the alarm cannot interrupt
+                for fut, i in futures.items():
+                    if results[i] is None:
+                        fut.cancel()
+                        _done(
+                            i,
+                            JobResult(
+                                jobs[i][0],
+                                error=f"timed out (no result after {deadline:.0f}s)",
+                            ),
+                        )
+                _terminate_workers(pool)
+
+    return results
+
+
+def _terminate_workers(pool: ProcessPoolExecutor):
+    """Kill the pool's processes so shutdown does not wait on stuck jobs."""
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _report(res: JobResult):
+    if res.ok:
+        print(f"[DEBUG] Job {res.key} finished in {res.seconds:.1f}s")
+    else:
+        print(f"[ERROR] Job {res.key} failed: {res.error.splitlines()[0]}")
+
+
+def gather_rows(results: Iterable[JobResult]) -> list:
+    """Flatten successful list-valued results into one list for a bulk write."""
+    rows = []
+    for res in results:
+        if res.ok and res.value:
+            rows.extend(res.value)
+    return rows
+
+
+def gather_frames(results: Iterable[JobResult]):
+    """Concatenate successful DataFrame results into one frame for a bulk write."""
+    import pandas as pd
+
+    frames = [r.value for r in results if r.ok and r.value is not None]
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
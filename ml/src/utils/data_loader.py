@@ -1,7 +1,178 @@
 # ml/src/utils/data_loader.py
 
+from contextlib import contextmanager
+
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+
+# --------------------------------------------------
+# SERIES QUERIES (one per target, all cities at once)
+# --------------------------------------------------
+# Every query returns (target, city, date, value) for the cities bound to
+# :cities; load_timeseries_batch() combines several with UNION ALL.
+_SERIES_SQL = {
+    # 1. SPECIAL CASES FOR ANOMALIES: price / rent
+    "price": """
+        SELECT :target AS target, city, date, benchmark_price AS value
+        FROM public.house_price_index
+        WHERE city IN :cities AND property_type = 'All'
+    """,
+    "rent": """
+        SELECT :target AS target, city, date, rent_value AS value
+        FROM public.rent_index
+        WHERE city IN :cities
+    """,
+    # 2. RENT INDEX (CMHC ANNUAL/MONTHLY RENT SERIES)
+    "rent_index": """
+        SELECT :target AS target, city, date, index_value AS value
+        FROM public.rent_index
+        WHERE city IN :cities
+    """,
+    # 3. HOUSE PRICE INDEX (CREA HPI)
+    "house_price_index": """
+        SELECT :target AS target, city, date, index_value AS value
+        FROM public.house_price_index
+        WHERE city IN :cities
+    """,
+    # 4. GENERIC FEATURES TARGET (LEGACY)
+    "features": """
+        SELECT :target AS target, city, date, hpi_composite_sa AS value
+        FROM public.features
+        WHERE city IN :cities AND property_type = 'All'
+    """,
+}
+
+# 5. DEFAULT: METRICS TABLE (macro-economic)
+_METRICS_SQL = """
+    SELECT :target AS target, city, date, value
+    FROM public.metrics
+    WHERE metric = :metric AND city IN :cities
+"""
+
+# (database url, target, city) -> DataFrame['ds', 'y'];
+# only filled inside a series_cache() block (one pipeline run)
+_SERIES_CACHE = {}
+_CACHE_DEPTH = 0
+
+
+def _cache_scope(engine) -> str:
+    eng = getattr(engine, "engine", engine)
+    return str(getattr(eng, "url", id(eng)))
+
+
+def _empty_series() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ds": pd.Series(dtype="datetime64[ns]"),
+            "y": pd.Series(dtype="float64"),
+        }
+    )
+
+
+def clear_timeseries_cache():
+    """Drop every cached series (e.g. after an ETL refresh)."""
+    _SERIES_CACHE.clear()
+
+
+@contextmanager
+def series_cache():
+    """
+    Scope the series cache to one run. Inside the block, series loaded in
+    bulk are served to load_timeseries(); on exit the cache is dropped, so
+    long-lived processes never see series older than their current run.
+    """
+    global _CACHE_DEPTH
+    _CACHE_DEPTH += 1
+    try:
+        yield
+    finally:
+        _CACHE_DEPTH -= 1
+        if _CACHE_DEPTH == 0:
+            _SERIES_CACHE.clear()
+
+
+def _select(target: str, cities, n: int):
+    """One target's SELECT, with its bind names suffixed by `n`."""
+    sql = _SERIES_SQL.get(target, _METRICS_SQL)
+    for name in ("target", "metric", "cities"):
+        sql = sql.replace(f":{name}", f":{name}_{n}")
+    params = {f"target_{n}": target, f"cities_{n}": cities}
+    if target not in _SERIES_SQL:
+        params[f"metric_{n}"] = target
+    return sql, params
+
+
+def load_timeseries_batch(engine, targets) -> dict:
+    """
+    Load the series of every (target, city) pair in `targets` with a single
+    query (one SELECT per target, combined with UNION ALL).
+    Returns {(target, city): DataFrame['ds', 'y']} with datetime64 ds and
+    float64 y; pairs without data map to an empty frame.
+
+    Inside series_cache(), results also refresh the cache behind
+    load_timeseries().
+    """
+    by_target = {}
+    for target, city in targets:
+        cities = by_target.setdefault(target, [])
+        if city not in cities:
+            cities.append(city)
+    if not by_target:
+        return {}
+
+    parts, params = [], {}
+    for n, (target, cities) in enumerate(by_target.items()):
+        sql, p = _select(target, cities, n)
+        parts.append(sql)
+        params.update(p)
+    query = text(
+        f"SELECT * FROM ({' UNION ALL '.join(parts)}) AS s "
+        "ORDER BY target, city, date"
+    ).bindparams(*(bindparam(f"cities_{n}", expanding=True) for n in range(len(parts))))
+
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+
+    df = df.rename(columns={"date": "ds", "value": "y"})
+    df["ds"] = pd.to_datetime(df["ds"])
+    df["y"] = pd.to_numeric(df["y"], errors="coerce").astype("float64")
+    df = df.dropna(subset=["y"])
+
+    groups = {key: g for key, g in df.groupby(["target", "city"], sort=False)}
+    scope = _cache_scope(engine)
+
+    out = {}
+    for target, cities in by_target.items():
+        for city in cities:
+            g = groups.get((target, city))
+            series = (
+                g[["ds", "y"]].reset_index(drop=True)
+                if g is not None
+                else _empty_series()
+            )
+            if _CACHE_DEPTH:
+                _SERIES_CACHE[(scope, target, city)] = series
+            out[(target, city)] = series.copy()
+
+    print(
+        f"[DEBUG] Loaded {len(df)} rows for {len(by_target)} target(s) "
+        f"across {len(out)} series"
+    )
+    return out
+
+
+def load_timeseries_many(engine, target: str, cities) -> dict:
+    """
+    Load the series of every city in `cities` for one target with a single query.
+    Returns {city: DataFrame['ds', 'y']} with datetime64 ds and float64 y;
+    cities without data map to an empty frame.
+
+    Inside series_cache(), results also refresh the cache behind
+    load_timeseries(), so priming it once turns N per-city round trips into one.
+    """
+    cities = list(dict.fromkeys(cities))
+    loaded = load_timeseries_batch(engine, [(target, city) for city in cities])
+    return {city: loaded[(target, city)] for city in cities}
 
 
 def load_timeseries(engine, target: str, city: str) -> pd.DataFrame:
@@ -16,89 +187,19 @@ def load_timeseries(engine, target: str, city: str) -> pd.DataFrame:
         - house_price_index    (public.house_price_index)
         - features             (features.hpi_composite_sa)
         - any other metric name → public.metrics(metric, city)
-    """
 
-    with engine.connect() as conn:
-        # --------------------------------------------------
-        # 1. SPECIAL CASES FOR ANOMALIES: price / rent
-        # --------------------------------------------------
-        if target == "price":
-            query = text("""
-                SELECT date,  benchmark_price AS value
-                FROM public.house_price_index
-                WHERE city = :city AND property_type = 'All'
-                ORDER BY date
-            """)
-            df = pd.read_sql(query, conn, params={"city": city})
-
-        elif target == "rent":
-            query = text("""
-                SELECT date, rent_value  AS value
-                FROM public.rent_index
-                WHERE city = :city
-                ORDER BY date
-            """)
-            df = pd.read_sql(query, conn, params={"city": city})
-
-        # --------------------------------------------------
-        # 2. RENT INDEX (CMHC ANNUAL/MONTHLY RENT SERIES)
-        # --------------------------------------------------
-        elif target == "rent_index":
-            query = text("""
-                SELECT date, index_value AS value
-                FROM public.rent_index
-                WHERE city = :city
-                ORDER BY date
-            """)
-            df = pd.read_sql(query, conn, params={"city": city})
-
-        # --------------------------------------------------
-        # 3. HOUSE PRICE INDEX (CREA HPI)
-        # --------------------------------------------------
-        elif target == "house_price_index":
-            query = text("""
-                SELECT date, index_value AS value
-                FROM public.house_price_index
-                WHERE city = :city
-                ORDER BY date
-            """)
-            df = pd.read_sql(query, conn, params={"city": city})
-
-        # --------------------------------------------------
-        # 4. GENERIC FEATURES TARGET (LEGACY)
-        # --------------------------------------------------
-        elif target == "features":
-            query = text("""
-                SELECT date, hpi_composite_sa AS value
-                FROM public.features
-                WHERE city = :city AND property_type = 'All'
-                ORDER BY date
-            """)
-            df = pd.read_sql(query, conn, params={"city": city})
-
-        # --------------------------------------------------
-        # 5. DEFAULT: METRICS TABLE (macro-economic)
-        # --------------------------------------------------
-        else:
-            query = text("""
-                SELECT date, value
-                FROM public.metrics
-                WHERE metric = :metric AND city = :city
-                ORDER BY date
-            """)
-            df = pd.read_sql(query, conn, params={"metric": target, "city": city})
-
-    # --------------------------------------------------
-    # FINAL CLEANUP AND LOGGING
-    # --------------------------------------------------
+    Served from the cache primed by load_timeseries_many() within the current
+    series_cache() run when possible; otherwise loads just this city.
+    """
+    key = (_cache_scope(engine), target, city)
+    if key in _SERIES_CACHE:
+        df = _SERIES_CACHE[key].copy()
+    else:
+        df = load_timeseries_many(engine, target, [city])[city]
 
     if df.empty:
         print(f"[WARN] No data found for target='{target}' city='{city}'")
         return pd.DataFrame(columns=["ds", "y"])
 
-    # Prophet-compatible naming
-    df = df.rename(columns={"date": "ds", "value": "y"})
-    df = df.dropna(subset=["y"])
-
     print(f"[DEBUG] Loaded {len(df)} rows for target='{target}' city='{city}'")
     return df
@@ -1,5 +1,9 @@
 # ml/src/utils/db_writer.py
+import io
+
 import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
 
 
 def write_forecasts(conn_or_engine, results):
@@ -181,3 +185,129 @@ def write_anomalies(conn_or_engine, results):
     except Exception as e:
         print(f"[ERROR] write_anomalies() failed: {e}")
         return 0
+
+
+def copy_frame(conn_or_engine, df: pd.DataFrame, table: str, columns=None) -> int:
+    """
+    Bulk-load a DataFrame with COPY ... FROM STDIN (CSV) over psycopg2.
+    Omitted columns take their DB defaults. Given a Connection, the COPY runs
+    inside its transaction (the caller commits); given an Engine, it commits.
+    Falls back to to_sql for other drivers (e.g. SQLite in tests).
+    """
+    if df is None or df.empty:
+        print(f"[WARN] Nothing to copy into {table}.")
+        return 0
+
+    in_transaction = isinstance(conn_or_engine, Connection)
+    engine = conn_or_engine.engine
+    columns = list(columns or df.columns)
+
+    if engine.dialect.driver != "psycopg2":
+        schema, _, name = table.rpartition(".")
+        df[columns].to_sql(
+            name,
+            conn_or_engine,
+            schema=schema or None,
+            if_exists="append",
+            index=False,
+            method="multi",
+        )
+        print(f"[OK] Inserted {len(df)} rows → {table}")
+        return len(df)
+
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False, date_format="%Y-%m-%d")
+    buf.seek(0)
+
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    if in_transaction:
+        raw = conn_or_engine.connection.dbapi_connection
+        with raw.cursor() as cur:
+            cur.copy_expert(sql, buf)
+    else:
+        raw = engine.raw_connection()
+        try:
+            with raw.cursor() as cur:
+                cur.copy_expert(sql, buf)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    print(f"[OK] Copied {len(df)} rows → {table}")
+    return len(df)
+
+
+def copy_predictions(conn_or_engine, df: pd.DataFrame) -> int:
+    """COPY a prediction frame into public.model_predictions."""
+    return copy_frame(conn_or_engine, df, "public.model_predictions")
+
+
+BACKTEST_COLUMNS = [
+    "model_name",
+    "city",
+    "target",
+    "origin",
+    "horizon_months",
+    "predict_date",
+    "yhat",
+    "yhat_lower",
+    "yhat_upper",
+    "y_true",
+]
+
+
+BACKTEST_KEYS = ["model_name", "city", "target", "origin"]
+
+
+def backtest_keys(df: pd.DataFrame) -> dict:
+    """Distinct (model_name, city, target, origin) keys of `df`, as arrays."""
+    keys = df[BACKTEST_KEYS].drop_duplicates()
+    out = {col: keys[col].tolist() for col in BACKTEST_KEYS[:3]}
+    out["origin"] = pd.to_datetime(keys["origin"]).dt.date.tolist()
+    return out
+
+
+def scorable_backtest_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Rows with both yhat and y_true (NOT NULL in backtest_results)."""
+    keep = df["y_true"].notna() & df["yhat"].notna()
+    if not keep.all():
+        print(f"[WARN] Dropping {int((~keep).sum())} backtest rows without y_true/yhat")
+    return df.loc[keep]
+
+
+def replace_backtest_results(engine, df: pd.DataFrame) -> int:
+    """
+    Swap in backtest rows for the exact (model, city, target, origin) keys in
+    `df`: one DELETE plus a COPY into public.backtest_results, in a single
+    transaction. Other cities/targets of the same models and origins stay.
+    Rows missing an actual (e.g. a month not yet reported) are not written,
+    but their keys are still cleared.
+    """
+    if df is None or df.empty:
+        print("[WARN] No backtest results to write.")
+        return 0
+
+    sql = text("""
+        DELETE FROM public.backtest_results AS b
+        USING unnest(
+            CAST(:model_name AS text[]),
+            CAST(:city AS text[]),
+            CAST(:target AS text[]),
+            CAST(:origin AS date[])
+        ) AS k(model_name, city, target, origin)
+        WHERE b.model_name = k.model_name
+          AND b.city = k.city
+          AND b.target = k.target
+          AND b.origin = k.origin
+    """)
+    with engine.begin() as conn:
+        conn.execute(sql, backtest_keys(df))
+        return copy_frame(
+            conn,
+            scorable_backtest_rows(df),
+            "public.backtest_results",
+            BACKTEST_COLUMNS,
+        )
@@ -0,0 +1,129 @@
+# ml/src/utils/feature_cache.py
+"""
+Local Arrow cache of public.model_features shared by all trainers/backtests.
+
+Each requested column set is extracted once per data version into an
+uncompressed Arrow IPC file and read back via memory mapping instead of being
+re-queried from Neon by every script. Numeric columns without nulls (and the
+date column) come back as zero-copy views of the mapped file; strings and
+columns with nulls are converted, i.e. copied.
+
+The cache key hashes the data version (row count, city count, min/max date,
+max processed_at) together with the requested columns: the features ETL
+stamps processed_at on every write, so any rebuild or merge produces a new
+version and a fresh extract.
+
+Configuration:
+    HIRD_FEATURE_CACHE_DIR   cache directory (default: .cache/model_features)
+    HIRD_FEATURE_CACHE=0     bypass the cache and query the table directly
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from sqlalchemy import text
+
+CACHE_DIR = Path(os.getenv("HIRD_FEATURE_CACHE_DIR", ".cache/model_features"))
+
+_VERSION_SQL = """
+    SELECT COUNT(*) AS n_rows,
+           COUNT(DISTINCT city) AS n_cities,
+           MIN(date) AS min_date,
+           MAX(date) AS max_date,
+           MAX(processed_at) AS max_processed_at
+    FROM public.model_features
+"""
+
+
+def _enabled() -> bool:
+    return os.getenv("HIRD_FEATURE_CACHE", "1") != "0"
+
+
+def table_version(engine) -> str:
+    """Short content version of public.model_features (one aggregate query)."""
+    with engine.connect() as conn:
+        row = conn.execute(text(_VERSION_SQL)).one()
+    raw = "|".join(str(v) for v in row)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def columns_key(columns=None) -> str:
+    """Short key of a requested column set ("all" for every column)."""
+    if not columns:
+        return "all"
+    raw = "|".join(columns)
+    return hashlib.sha256(raw.encode()).hexdigest()[:8]
+
+
+def _cache_path(version: str, columns=None) -> Path:
+    return CACHE_DIR / f"model_features_{columns_key(columns)}_{version}.arrow"
+
+
+def _select_sql(columns=None):
+    cols = ", ".join(columns) if columns else "*"
+    return text(f"SELECT {cols} FROM public.model_features ORDER BY city, date")
+
+
+def _extract(engine, path: Path, columns=None):
+    """Dump `columns` (sorted by city, date) to an Arrow IPC file."""
+    q = _select_sql(columns)
+    with engine.connect() as conn:
+        df = pd.read_sql_query(q, conn)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"])
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # write-then-rename so concurrent trainers never see a partial file
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+    # older versions of this column set are dead weight now
+    for old in path.parent.glob(f"model_features_{columns_key(columns)}_*.arrow"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+    print(f"[INFO] Cached {len(df)} model_features rows → {path}")
+
+
+def _read(path: Path) -> pd.DataFrame:
+    source = pa.memory_map(str(path), "r")
+    table = ipc.open_file(source).read_all()
+    # one block per column, so eligible columns stay views of the mapping
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def load_model_features(engine, columns=None, refresh: bool = False) -> pd.DataFrame:
+    """
+    Return public.model_features (optionally only `columns`), ordered by
+    city, date with a datetime64 `date` column.
+    Extracts from the DB only when the table's data version has changed.
+    """
+    if not _enabled():
+        with engine.connect() as conn:
+            df = pd.read_sql_query(_select_sql(columns), conn)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    path = _cache_path(table_version(engine), columns)
+    if refresh or not path.exists():
+        _extract(engine, path, columns)
+    else:
+        print(f"[DEBUG] model_features cache hit → {path.name}")
+
+    return _read(path)
+
+
+def clear_feature_cache():
+    """Remove every cached extract."""
+    for f in CACHE_DIR.glob("model_features_*.arrow"):
+        f.unlink(missing_ok=True)
@@ -0,0 +1,138 @@
+# ml/src/utils/prediction_frame.py
+"""
+Columnar builder for public.model_predictions rows.
+
+Trainers used to append one dict per horizon (with a uuid4() and a
+datetime.now() each) and hand the list to executemany. Here a whole series
+becomes one DataFrame built from arrays: dates come from vectorized month
+offsets, and run_id / created_at are left to the column defaults
+(gen_random_uuid() / now()), so a bulk COPY writes them in the DB.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns written by the trainers, in table order (run_id/created_at omitted)
+PREDICTION_COLUMNS = [
+    "model_name",
+    "target",
+    "horizon_months",
+    "city",
+    "property_type",
+    "beds",
+    "baths",
+    "sqft_min",
+    "sqft_max",
+    "year_built_min",
+    "year_built_max",
+    "predict_date",
+    "yhat",
+    "yhat_lower",
+    "yhat_upper",
+    "y_true",
+    "features_version",
+    "model_artifact_uri",
+    "is_micro",
+]
+
+_NULL_COLUMNS = [
+    "property_type",
+    "beds",
+    "baths",
+    "sqft_min",
+    "sqft_max",
+    "year_built_min",
+    "year_built_max",
+]
+
+
+def month_offsets(start, n: int, first: int = 1) -> pd.DatetimeIndex:
+    """start + first, first+1, ... months (n dates), for month-start dates."""
+    start = pd.Timestamp(start)
+    if start.day != 1:
+        # DateOffset semantics (end-of-month clamping) for mid-month dates
+        return pd.DatetimeIndex(
+            [start + pd.DateOffset(months=int(k)) for k in range(first, first + n)]
+        )
+    periods = start.to_period("M") + np.arange(first, first + n)
+    return pd.PeriodIndex(periods).to_timestamp()
+
+
+def months_between(dates, origin) -> np.ndarray:
+    """Whole calendar months from `origin` to each date (vectorized)."""
+    d = pd.DatetimeIndex(pd.to_datetime(dates))
+    o = pd.Timestamp(origin)
+    return ((d.year - o.year) * 12 + (d.month - o.month)).to_numpy(dtype=np.int64)
+
+
+def _column(value, n, dtype=None):
+    if value is None:
+        return np.full(n, None, dtype=object)
+    arr = np.asarray(value, dtype=dtype)
+    if arr.ndim == 0:
+        return np.full(n, arr.item(), dtype=arr.dtype if dtype else object)
+    if len(arr) != n:
+        raise ValueError(f"column length {len(arr)} != {n}")
+    return arr
+
+
+def prediction_frame(
+    *,
+    model_name: str,
+    target: str,
+    city,
+    predict_date,
+    yhat,
+    horizon_months,
+    yhat_lower=None,
+    yhat_upper=None,
+    y_true=None,
+    features_version=None,
+    model_artifact_uri=None,
+    is_micro: bool = False,
+    clip_zero: bool = True,
+) -> pd.DataFrame:
+    """
+    Build model_predictions rows for one batch of forecasts.
+    Array arguments must share one length; scalars are broadcast.
+    With clip_zero, yhat and bounds are floored at 0 like the old row loops.
+    """
+    yhat = np.asarray(yhat, dtype=float).reshape(-1)
+    n = len(yhat)
+
+    def bound(v):
+        if v is None:
+            return np.full(n, np.nan)
+        v = np.asarray(v, dtype=float).reshape(-1)
+        return np.maximum(v, 0.0) if clip_zero else v
+
+    df = pd.DataFrame(
+        {
+            "model_name": _column(model_name, n),
+            "target": _column(target, n),
+            "horizon_months": _column(horizon_months, n, dtype=np.int64),
+            "city": _column(city, n),
+            "predict_date": pd.DatetimeIndex(pd.to_datetime(predict_date)),
+            "yhat": np.maximum(yhat, 0.0) if clip_zero else yhat,
+            "yhat_lower": bound(yhat_lower),
+            "yhat_upper": bound(yhat_upper),
+            "y_true": (
+                np.full(n, np.nan)
+                if y_true is None
+                else np.asarray(y_true, dtype=float).reshape(-1)
+            ),
+            "features_version": _column(features_version, n),
+            "model_artifact_uri": _column(model_artifact_uri, n),
+            "is_micro": np.full(n, bool(is_micro)),
+        }
+    )
+    for c in _NULL_COLUMNS:
+        df[c] = None
+    return df[PREDICTION_COLUMNS]
+
+
+def concat_predictions(frames) -> pd.DataFrame:
+    frames = [f for f in frames if f is not None and len(f)]
+    if not frames:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,245 @@
+# ml/src/utils/profiling.py
+"""
+Lightweight stage profiler for the training entry points.
+
+    with profiling.stage("fit", model="arima1", city=city, target="price"):
+        model = fit(...)
+
+records wall time and CPU time for the block, plus the process's lifetime
+peak RSS when it ends (ru_maxrss cannot be reset, so it is not per block).
+Stages run inside training-executor jobs are recorded in the worker process
+and shipped back on the JobResult, so a RunProfile in the parent sees every
+(model, city, target) stage of the run:
+
+    prof = RunProfile("arima")
+    with prof.stage("load"):
+        df = load_features()
+    results = run_jobs(...)
+    prof.add_jobs(results, model="arima1")
+    prof.finish(engine)
+
+finish() prints the slowest stages and writes the report to
+.debug/pipeline_runs/<run>-<timestamp>.json and/or public.pipeline_runs.
+
+Configuration:
+    HIRD_PROFILE_SINK       json (default) | db | both | none
+    HIRD_PROFILE_JOBS=N     cProfile every job, keep the N slowest .prof dumps
+                            under .debug/profiles/ (pstats format: snakeviz,
+                            gprof2dot, or speedscope via pyprof-to-speedscope)
+"""
+
+import cProfile
+import json
+import os
+import re
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+REPORT_DIR = Path(".debug/pipeline_runs")
+PROFILE_DIR = Path(".debug/profiles")
+SINK = os.getenv("HIRD_PROFILE_SINK", "json")
+PROFILE_JOBS = int(os.getenv("HIRD_PROFILE_JOBS", "0") or 0)
+
+# stages recorded in this process since the last drain()
+_LOCAL: List["StageRecord"] = []
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    model: Optional[str] = None
+    city: Optional[str] = None
+    target: Optional[str] = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    process_peak_rss_mb: float = 0.0
+    started_at: str = ""
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+@contextmanager
+def stage(name: str, model=None, city=None, target=None):
+    """Time a block and record it in this process."""
+    started = datetime.now(timezone.utc).isoformat()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        _LOCAL.append(
+            StageRecord(
+                stage=name,
+                model=model,
+                city=city,
+                target=target,
+                wall_s=time.perf_counter() - wall0,
+                cpu_s=time.process_time() - cpu0,
+                process_peak_rss_mb=peak_rss_mb(),
+                started_at=started,
+            )
+        )
+
+
+def drain() -> List[StageRecord]:
+    """Return and clear the stages recorded in this process."""
+    records = list(_LOCAL)
+    _LOCAL.clear()
+    return records
+
+
+# ---------------------------------------------------------
+# PER-JOB (runs inside the worker)
+# ---------------------------------------------------------
+def _slug(key) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(key)).strip("_")
+
+
+@contextmanager
+def job_profile(key):
+    """
+    Measure one executor job: yields a dict that receives cpu_s,
+    process_peak_rss_mb, the job's stage records and (with HIRD_PROFILE_JOBS)
+    the path of its cProfile dump.
+    """
+    drain()
+    out = {"cpu_s": 0.0, "process_peak_rss_mb": 0.0, "stages": [], "profile_path": None}
+    profiler = cProfile.Profile() if PROFILE_JOBS else None
+    cpu0 = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield out
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            path = PROFILE_DIR / f"{_slug(key)}-{os.getpid()}.prof"
+            profiler.dump_stats(path)
+            out["profile_path"] = str(path)
+        out["cpu_s"] = time.process_time() - cpu0
+        out["process_peak_rss_mb"] = peak_rss_mb()
+        out["stages"] = drain()
+
+
+def keep_slowest_profiles(results, keep: int = PROFILE_JOBS) -> list:
+    """Delete all job profiles except the `keep` slowest; returns kept paths."""
+    dumped = [r for r in results if getattr(r, "profile_path", None)]
+    dumped.sort(key=lambda r: r.seconds, reverse=True)
+    for r in dumped[keep:]:
+        Path(r.profile_path).unlink(missing_ok=True)
+    kept = [r.profile_path for r in dumped[:keep]]
+    for path in kept:
+        print(f"[INFO] Profile kept: {path}")
+    return kept
+
+
+# ---------------------------------------------------------
+# RUN REPORT (parent process)
+# ---------------------------------------------------------
+class RunProfile:
+    def __init__(self, run_name: str):
+        self.run_name = run_name
+        self.started_at = datetime.now(timezone.utc)
+        self.records: List[StageRecord] = []
+
+    @contextmanager
+    def stage(self, name: str, model=None, city=None, target=None):
+        with stage(name, model, city, target):
+            yield
+        self.records.extend(drain())
+
+    def record(self, name: str, wall_s: float, model=None, city=None, target=None):
+        """Add a stage timed elsewhere (wall time only)."""
+        self.records.append(
+            StageRecord(
+                name, model, city, target, wall_s, process_peak_rss_mb=peak_rss_mb()
+            )
+        )
+
+    def add_jobs(self, results, model=None, key_fields=("city", "target")):
+        """
+        Stages from executor jobs. A job without stage records becomes one
+        'job' row labelled from its key (fields named by key_fields).
+        """
+        for res in results:
+            if res.stages:
+                self.records.extend(res.stages)
+                continue
+            key = res.key if isinstance(res.key, tuple) else (res.key,)
+            labels = dict(zip(key_fields, key))
+            self.records.append(
+                StageRecord(
+                    stage="job" if res.ok else "job_failed",
+                    model=model,
+                    city=labels.get("city"),
+                    target=labels.get("target"),
+                    wall_s=res.seconds,
+                    cpu_s=res.cpu_seconds,
+                    process_peak_rss_mb=res.process_peak_rss_mb,
+                )
+            )
+        if PROFILE_JOBS:
+            keep_slowest_profiles(results)
+
+    def frame(self) -> pd.DataFrame:
+        df = pd.DataFrame([asdict(r) for r in self.records])
+        if df.empty:
+            return df
+        # job rows have no start time of their own
+        df["started_at"] = df["started_at"].replace("", None)
+        df.insert(0, "run_name", self.run_name)
+        df.insert(1, "run_started_at", self.started_at.isoformat())
+        return df
+
+    def summary(self, top: int = 5):
+        df = self.frame()
+        if df.empty:
+            return
+        totals = df.groupby("stage")[["wall_s", "cpu_s"]].sum().round(2)
+        for name, row in totals.sort_values("wall_s", ascending=False).iterrows():
+            print(f"[INFO] {self.run_name} {name}: wall={row.wall_s}s cpu={row.cpu_s}s")
+        slow = df.nlargest(top, "wall_s")
+        for r in slow.itertuples(index=False):
+            print(
+                f"[INFO]   slowest {r.stage} {r.model or ''} {r.city or ''}/"
+                f"{r.target or ''}: {r.wall_s:.2f}s, "
+                f"process peak {r.process_peak_rss_mb:.0f} MB"
+            )
+
+    def write_json(self) -> Path:
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        path = REPORT_DIR / f"{self.run_name}-{self.started_at:%Y%m%dT%H%M%S}.json"
+        with open(path, "w") as f:
+            json.dump(self.frame().to_dict("records"), f, indent=2)
+        return path
+
+    def write_table(self, engine) -> int:
+        from ml.src.utils.db_writer import copy_frame
+
+        return copy_frame(engine, self.frame(), "public.pipeline_runs")
+
+    def finish(self, engine=None, sink: str = SINK):
+        """Print the summary and persist the report to the configured sink."""
+        self.summary()
+        if not self.records or sink == "none":
+            return
+        if sink in ("json", "both"):
+            print(f"[INFO] Stage report → {self.write_json()}")
+        if sink in ("db", "both") and engine is not None:
+            try:
+                self.write_table(engine)
+            except Exception as e:
+                print(f"[WARN] Could not write pipeline_runs: {e}")
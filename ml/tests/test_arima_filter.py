@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the single-pass ARIMA filter used by the backtest.
+
+With the fitted params held fixed the filter is exact, so it is compared to
+model.predict() at 1e-8. Against the pmdarima update() loop, which refits
+the params every month, it is held to 1% relative error.
+"""
+
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+import pmdarima as pm
+
+# the backtest script builds its engine at import time
+os.environ.setdefault("NEON_DATABASE_URL", "sqlite://")
+
+from ml.src.models import train_model_arima_backtest as bt  # noqa: E402
+from ml.src.models.forecasting.arima_filter import (  # noqa: E402
+    h_step_ahead,
+    one_step_ahead,
+)
+
+N_TRAIN, N_VALID, HORIZON = 96, 12, 3
+
+
+def fitted_model():
+    """ARIMA(1,1,0) with drift on a trending AR(1)-differenced series."""
+    rng = np.random.default_rng(7)
+    diffs = np.zeros(N_TRAIN + N_VALID)
+    for t in range(1, len(diffs)):
+        diffs[t] = 0.5 + 0.6 * (diffs[t - 1] - 0.5) + rng.normal(0, 1)
+    y = 300 + np.cumsum(diffs)
+
+    model = pm.ARIMA(order=(1, 1, 0), trend="t", suppress_warnings=True)
+    model.fit(y[:N_TRAIN])
+    return model, y[N_TRAIN:]
+
+
+class TestArimaFilter(unittest.TestCase):
+    def setUp(self):
+        self.model, self.valid = fitted_model()
+
+    def test_one_step_matches_fixed_param_predict(self):
+        mean, lower, upper = one_step_ahead(self.model, self.valid)
+        self.assertEqual(len(mean), N_VALID)
+
+        yhat, conf = self.model.predict(n_periods=1, return_conf_int=True)
+        np.testing.assert_allclose(mean[0], yhat[0], rtol=1e-8)
+        np.testing.assert_allclose([lower[0], upper[0]], conf[0], rtol=1e-8)
+
+        # later points: same params, history extended by the validation values
+        res = self.model.arima_res_
+        for t in range(1, N_VALID):
+            expected = res.append(self.valid[:t], refit=False).forecast(1)
+            np.testing.assert_allclose(mean[t], np.asarray(expected)[0], rtol=1e-8)
+        self.assertTrue(np.all(lower < mean) and np.all(mean < upper))
+
+    def test_one_step_tracks_update_loop(self):
+        mean, _, _ = one_step_ahead(self.model, self.valid)
+
+        model = self.model
+        loop = []
+        for y in self.valid:
+            loop.append(model.predict(n_periods=1)[0])
+            model.update([y])
+        np.testing.assert_allclose(mean, loop, rtol=0.01)
+
+    def test_h_step_from_each_origin(self):
+        out = h_step_ahead(self.model, self.valid, HORIZON)
+
+        # full horizons, then the window truncates the last origins
+        expected_rows = sum(min(HORIZON, N_VALID - o) for o in range(N_VALID))
+        self.assertEqual(len(out["yhat"]), expected_rows)
+        np.testing.assert_array_equal(out["index"], out["origin"] + out["step"] - 1)
+        self.assertLess(out["index"].max(), N_VALID)
+
+        first = out["origin"] == 0
+        yhat = self.model.predict(n_periods=HORIZON)
+        np.testing.assert_allclose(out["yhat"][first], yhat, rtol=1e-8)
+
+        mean, _, _ = one_step_ahead(self.model, self.valid)
+        np.testing.assert_allclose(out["yhat"][out["step"] == 1], mean, rtol=1e-8)
+
+
+class TestOneStepBacktestRows(unittest.TestCase):
+    def test_rows_are_one_step_from_the_previous_month(self):
+        model, valid = fitted_model()
+        y = np.concatenate([model.arima_res_.data.endog, valid])
+        dates = pd.date_range(end=bt.CUTOFF, periods=N_TRAIN, freq="MS")
+        dates = dates.append(
+            pd.date_range(bt.CUTOFF, periods=N_VALID + 1, freq="MS")[1:]
+        )
+        df = pd.DataFrame({"date": dates, "city": "Calgary", "hpi_benchmark": y})
+
+        frame = bt.backtest_city_target(df, "Calgary", "hpi_benchmark", "price")
+
+        self.assertEqual(len(frame), N_VALID)
+        self.assertTrue((frame["model_name"] == "arima_1step_backtest").all())
+        self.assertTrue((frame["horizon_months"] == 1).all())
+        expected = frame["predict_date"] - pd.DateOffset(months=1)
+        self.assertTrue((frame["origin"] == expected).all())
+        self.assertEqual(frame["origin"].min(), bt.CUTOFF)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the ARIMA warm-start registry.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pmdarima as pm
+
+import ml.src.models.forecasting.arima_registry as registry
+
+
+class TestArimaRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._orig_dir = registry.REGISTRY_DIR
+        registry.REGISTRY_DIR = Path(self.tmp.name)
+
+        rng = np.random.default_rng(3)
+        self.y = 100 + np.cumsum(rng.normal(0.5, 1.0, 160))
+        self.searches = 0
+
+    def tearDown(self):
+        registry.REGISTRY_DIR = self._orig_dir
+        self.tmp.cleanup()
+
+    def search(self, values):
+        self.searches += 1
+        return pm.ARIMA(order=(1, 1, 0), suppress_warnings=True).fit(values)
+
+    def fit(self, values):
+        return registry.fit_or_update("Toronto", "price", values, self.search)
+
+    def test_search_once_then_reuse_and_update(self):
+        self.fit(self.y[:150])
+        self.fit(self.y[:150])
+        model = self.fit(self.y[:152])
+
+        self.assertEqual(self.searches, 1)
+        self.assertEqual(model.order, (1, 1, 0))
+        self.assertEqual(registry.load_entry("Toronto", "price")["n_obs"], 152)
+
+    def test_revised_history_refits_stored_order(self):
+        self.fit(self.y[:150])
+        revised = self.y[:150].copy()
+        revised[:5] += 1.0
+        model = self.fit(revised)
+
+        self.assertEqual(self.searches, 1)
+        self.assertEqual(model.order, (1, 1, 0))
+
+    def test_drift_triggers_new_search(self):
+        self.fit(self.y[:150])
+        self.fit(np.append(self.y[:150], self.y[149] + 500.0))
+        self.assertEqual(self.searches, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the content-addressed model artifact store.
+"""
+
+import io
+import unittest
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from ml.src.models import artifact_store
+from ml.src.models.artifact_store import ArtifactStore, artifact_key, fetch_or_fit
+
+
+class DictS3:
+    """Minimal in-memory stand-in for the boto3 S3 client calls used."""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = 0
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.puts += 1
+        self.objects[(Bucket, Key)] = Body
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.client = DictS3()
+        self.store = ArtifactStore(self.client, "hird-artifacts")
+        self.series = np.arange(48, dtype=float)
+        self.fits = 0
+
+    def fit(self):
+        self.fits += 1
+        return {"coef": self.series.mean()}
+
+    def fetch(self, series, params=None, code="v1"):
+        return fetch_or_fit(
+            "arima1",
+            "Calgary",
+            "price",
+            series,
+            params or {"max_p": 5},
+            self.fit,
+            code=code,
+            store=self.store,
+        )
+
+    def test_unchanged_inputs_skip_training(self):
+        model, uri = self.fetch(self.series)
+        again, uri_again = self.fetch(self.series.copy())
+
+        self.assertEqual(self.fits, 1)
+        self.assertEqual(self.client.puts, 1)
+        self.assertEqual(model, again)
+        self.assertEqual(uri, uri_again)
+        self.assertTrue(uri.startswith("s3://hird-artifacts/models/arima1/Calgary/"))
+
+    def test_key_covers_data_params_and_code(self):
+        base = artifact_key("arima1", "Calgary", "price", self.series, {"p": 1}, "v1")
+        changed = [
+            artifact_key("arima1", "Calgary", "price", self.series + 1, {"p": 1}, "v1"),
+            artifact_key("arima1", "Calgary", "price", self.series, {"p": 2}, "v1"),
+            artifact_key("arima1", "Calgary", "price", self.series, {"p": 1}, "v2"),
+        ]
+        self.assertTrue(all(k != base for k in changed))
+
+        self.fetch(self.series)
+        self.fetch(self.series, code="v2")
+        self.assertEqual(self.fits, 2)
+
+    def test_warm_fit_is_keyed_on_its_parent(self):
+        _, cold_uri = self.fetch(self.series, {"epochs": 35})
+
+        saved = artifact_store._STORE, artifact_store._STORE_READY
+        artifact_store._STORE, artifact_store._STORE_READY = self.store, True
+        try:
+            artifact_store.mark_latest(
+                "arima1", "Calgary", "price", cold_uri, "2025-01-01"
+            )
+            parent, parent_uri = artifact_store.latest("arima1", "Calgary", "price")
+        finally:
+            artifact_store._STORE, artifact_store._STORE_READY = saved
+
+        self.assertEqual(parent_uri, cold_uri)
+        self.assertEqual(parent, {"coef": self.series.mean()})
+
+        # same data, fine-tuned from the parent: a new artifact, not the cold one
+        warm = {"epochs": 3, "warm_start": True, "parent": parent_uri}
+        _, warm_uri = self.fetch(self.series, warm)
+        self.assertEqual(self.fits, 2)
+        self.assertNotEqual(warm_uri, cold_uri)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the rolling-origin backtest engine (splits and task cache).
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# compare_models builds its engine at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from ml.src.models import backtest_engine as be  # noqa: E402
+from ml.src.models import compare_models  # noqa: E402
+from ml.src.utils.prediction_frame import months_between  # noqa: E402
+
+
+def make_features():
+    dates = pd.date_range("2015-01-01", "2023-12-01", freq="MS")
+    frames = []
+    for i, city in enumerate(["Calgary", "Toronto"]):
+        df = pd.DataFrame({"date": dates, "city": city})
+        df["hpi_benchmark"] = 100.0 + i + np.arange(len(dates))
+        df["rent_avg_city"] = 1000.0 + np.arange(len(dates))
+        for col in be.REGRESSORS:
+            df[col] = 0.0
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestSplits(unittest.TestCase):
+    def setUp(self):
+        dates = pd.date_range("2015-01-01", periods=60, freq="MS")
+        self.g = pd.DataFrame({"date": dates})
+        self.origin = pd.Timestamp("2018-12-01")
+
+    def test_expanding(self):
+        cfg = be.BacktestConfig(horizon=6)
+        train, test = be.split_origin(self.g, self.origin, cfg)
+        self.assertEqual(train["date"].min(), pd.Timestamp("2015-01-01"))
+        self.assertEqual(train["date"].max(), self.origin)
+        self.assertEqual(len(test), 6)
+        self.assertEqual(test["date"].min(), pd.Timestamp("2019-01-01"))
+
+    def test_sliding(self):
+        cfg = be.BacktestConfig(horizon=6, window="sliding", window_months=24)
+        train, _ = be.split_origin(self.g, self.origin, cfg)
+        self.assertEqual(len(train), 24)
+        self.assertEqual(train["date"].min(), pd.Timestamp("2017-01-01"))
+
+
+class TestRunBacktests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(be, "CACHE_DIR", Path(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.calls = 0
+
+        def counting_naive(history, future):
+            self.calls += 1
+            return be.forecast_naive(history, future)
+
+        patcher = mock.patch.dict(
+            be.FORECASTERS, {"naive_backtest": (counting_naive, [])}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_new_origin_reuses_cached_tasks(self):
+        features = make_features()
+        first = be.config_from_env(origins=be.parse_origins("2019-12-01"), horizon=12)
+        res = be.run_backtests(features, ["naive_backtest"], first, max_workers=1)
+
+        self.assertEqual(self.calls, 4)  # 2 cities x 2 targets
+        self.assertEqual(len(res), 4 * 12)
+        self.assertEqual(res["horizon_months"].max(), 12)
+        self.assertFalse(res["y_true"].isna().any())
+
+        second = be.config_from_env(
+            origins=be.parse_origins("2019-12-01,2021-12-01"), horizon=12
+        )
+        res = be.run_backtests(features, ["naive_backtest"], second, max_workers=1)
+
+        self.assertEqual(self.calls, 8)  # only the new origin was fit
+        self.assertEqual(len(res), 8 * 12)
+        self.assertEqual(res["origin"].nunique(), 2)
+
+    def test_future_regressors_held_at_origin(self):
+        features = make_features()
+        features["roll_3_z"] = np.arange(len(features), dtype=float)
+        futures = []
+
+        def capture(history, future):
+            futures.append((history["roll_3_z"].iloc[-1], future))
+            return be.forecast_naive(history, future)
+
+        cfg = be.config_from_env(origins=be.parse_origins("2019-12-01"), horizon=6)
+        with mock.patch.dict(be.FORECASTERS, {"naive_backtest": (capture, [])}):
+            be.run_backtests(features, ["naive_backtest"], cfg, max_workers=1)
+
+        self.assertEqual(len(futures), 4)
+        for last, future in futures:
+            self.assertEqual(len(future), 6)
+            self.assertNotIn("y", future.columns)
+            self.assertTrue((future["roll_3_z"] == last).all())
+
+    def test_horizon_follows_dates_across_a_missing_month(self):
+        features = make_features()
+        gap = features["date"] == pd.Timestamp("2020-03-01")
+        features.loc[gap, "hpi_benchmark"] = np.nan
+        futures = []
+
+        def stepped(history, future):
+            futures.append(future)
+            return np.arange(1.0, len(future) + 1), None, None
+
+        cfg = be.config_from_env(origins=be.parse_origins("2019-12-01"), horizon=6)
+        with mock.patch.dict(be.FORECASTERS, {"naive_backtest": (stepped, [])}):
+            res = be.run_backtests(features, ["naive_backtest"], cfg, max_workers=1)
+
+        self.assertTrue(all(len(f) == 6 for f in futures))
+        price = res[(res["city"] == "Calgary") & (res["target"] == "price")]
+        self.assertEqual(price["horizon_months"].tolist(), [1, 2, 4, 5, 6])
+        self.assertEqual(price["yhat"].tolist(), [1.0, 2.0, 4.0, 5.0, 6.0])
+        expected = months_between(price["predict_date"], price["origin"].iloc[0])
+        self.assertEqual(price["horizon_months"].tolist(), expected.tolist())
+
+    def test_fixed_cutoff_origin_is_reserved(self):
+        with self.assertRaises(ValueError):
+            be.config_from_env(origins=be.parse_origins("2020-12-01"))
+        self.assertNotIn(be.FIXED_CUTOFF, be.parse_origins(be.DEFAULT_ORIGINS))
+
+
+class TestMain(unittest.TestCase):
+    def test_rescores_all_backtest_results(self):
+        results = pd.DataFrame({"model_name": ["naive_backtest"], "yhat": [1.0]})
+        with (
+            mock.patch.object(be, "create_engine"),
+            mock.patch.object(be, "load_model_features"),
+            mock.patch.object(be, "run_backtests", return_value=results),
+            mock.patch.object(be, "write_backtests") as write,
+            mock.patch.object(compare_models, "main") as rescore,
+            mock.patch.object(compare_models, "evaluate") as evaluate,
+        ):
+            be.main(models=["naive"])
+
+        write.assert_called_once()
+        rescore.assert_called_once_with()
+        evaluate.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the vectorized model_comparison metrics.
+"""
+
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# compare_models builds its engine at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from ml.src.models import compare_models as cm  # noqa: E402
+
+
+class TestComputeMetrics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        rows = []
+        for model in ["arima_backtest", "lstm_backtest"]:
+            for city in ["Calgary", "Toronto"]:
+                for horizon in [1, 2, 3]:
+                    y = rng.uniform(100, 200, size=6)
+                    for yt, yp in zip(y, y + rng.normal(0, 5, size=6)):
+                        rows.append(
+                            {
+                                "model_name": model,
+                                "city": city,
+                                "target": "price",
+                                "horizon_months": horizon,
+                                "y_true": yt,
+                                "y_pred": yp,
+                            }
+                        )
+        self.df = pd.DataFrame(rows).sample(frac=1, random_state=1)
+
+    def test_matches_per_group_loop(self):
+        got = cm.compute_metrics(self.df).set_index(cm.GROUP_KEYS)
+        self.assertEqual(len(got), 12)
+
+        for key, g in self.df.groupby(cm.GROUP_KEYS):
+            y_true, y_pred = g["y_true"].values, g["y_pred"].values
+            row = got.loc[key]
+            self.assertAlmostEqual(row["mae"], round(cm.mae(y_true, y_pred), 4))
+            self.assertAlmostEqual(row["mape"], round(cm.mape(y_true, y_pred), 4))
+            self.assertAlmostEqual(row["rmse"], round(cm.rmse(y_true, y_pred), 4))
+            self.assertAlmostEqual(row["mse"], round(cm.mse(y_true, y_pred), 4))
+            self.assertAlmostEqual(row["r2"], round(cm.r2_score(y_true, y_pred), 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the bulk series loader and the cached per-city view.
+"""
+
+import unittest
+
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+from ml.src.utils.data_loader import (
+    clear_timeseries_cache,
+    load_timeseries,
+    load_timeseries_batch,
+    load_timeseries_many,
+    series_cache,
+)
+
+
+def make_engine():
+    """In-memory SQLite with a `public` schema holding a small rent_index."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS public"))
+        conn.execute(
+            text(
+                "CREATE TABLE public.rent_index (city TEXT, date TEXT, index_value REAL)"
+            )
+        )
+        rows = [
+            {"city": city, "date": f"2020-{m:02d}-01", "v": 100.0 + m}
+            for city in ["Calgary", "Toronto"]
+            for m in range(1, 7)
+        ]
+        rows.append({"city": "Toronto", "date": "2020-07-01", "v": None})
+        conn.execute(
+            text("INSERT INTO public.rent_index VALUES (:city, :date, :v)"), rows
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE public.metrics "
+                "(metric TEXT, city TEXT, date TEXT, value REAL)"
+            )
+        )
+        conn.execute(
+            text("INSERT INTO public.metrics VALUES ('cpi', 'Canada', :date, 2.5)"),
+            [{"date": f"2020-{m:02d}-01"} for m in range(1, 4)],
+        )
+    return engine
+
+
+class TestLoadTimeseries(unittest.TestCase):
+    def setUp(self):
+        clear_timeseries_cache()
+        self.engine = make_engine()
+        self.queries = []
+        event.listen(
+            self.engine,
+            "before_cursor_execute",
+            lambda conn, cur, stmt, *a: self.queries.append(stmt),
+        )
+
+    def test_many_returns_typed_frames_per_city(self):
+        out = load_timeseries_many(
+            self.engine, "rent_index", ["Calgary", "Toronto", "Nowhere"]
+        )
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual(len(out["Calgary"]), 6)
+        self.assertEqual(len(out["Toronto"]), 6)  # NaN row dropped
+        self.assertTrue(out["Nowhere"].empty)
+        self.assertEqual(out["Calgary"]["y"].dtype, "float64")
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(out["Calgary"]["ds"]))
+
+    def test_per_city_reads_from_primed_cache(self):
+        with series_cache():
+            load_timeseries_many(self.engine, "rent_index", ["Calgary", "Toronto"])
+            n = len(self.queries)
+            df = load_timeseries(self.engine, "rent_index", "Toronto")
+        self.assertEqual(len(self.queries), n)
+        self.assertEqual(list(df.columns), ["ds", "y"])
+        self.assertEqual(df["y"].iloc[-1], 106.0)
+
+    def test_cache_miss_loads_and_copies(self):
+        with series_cache():
+            df = load_timeseries(self.engine, "rent_index", "Calgary")
+            df["y"] = 0.0
+            again = load_timeseries(self.engine, "rent_index", "Calgary")
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual(again["y"].iloc[0], 101.0)
+
+    def test_cache_lives_for_one_run(self):
+        with series_cache():
+            load_timeseries_many(self.engine, "rent_index", ["Calgary"])
+            with series_cache():
+                load_timeseries(self.engine, "rent_index", "Calgary")
+            load_timeseries(self.engine, "rent_index", "Calgary")
+        self.assertEqual(len(self.queries), 1)
+
+        # new data after the run is visible; nothing is cached outside a run
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO public.rent_index VALUES ('Calgary', '2020-07-01', 1)"
+                )
+            )
+        n = len(self.queries)
+        df = load_timeseries(self.engine, "rent_index", "Calgary")
+        load_timeseries(self.engine, "rent_index", "Calgary")
+        self.assertEqual(len(df), 7)
+        self.assertEqual(len(self.queries), n + 2)
+
+    def test_batch_reads_every_target_in_one_query(self):
+        out = load_timeseries_batch(
+            self.engine,
+            [("rent_index", "Calgary"), ("cpi", "Canada"), ("cpi", "Calgary")],
+        )
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual(len(out[("rent_index", "Calgary")]), 6)
+        self.assertEqual(len(out[("cpi", "Canada")]), 3)
+        self.assertTrue(out[("cpi", "Calgary")].empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the local Arrow cache of public.model_features.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+import ml.src.utils.feature_cache as fc
+
+
+def make_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS public"))
+        conn.execute(text("""
+                CREATE TABLE public.model_features (
+                    city TEXT, date TEXT, hpi_benchmark REAL,
+                    rent_avg_city REAL, processed_at TEXT
+                )
+            """))
+        rows = [
+            {"city": c, "date": f"2020-{m:02d}-01", "p": 100.0 * m, "r": 10.0 * m}
+            for c in ["Toronto", "Calgary"]
+            for m in range(1, 4)
+        ]
+        conn.execute(
+            text("""
+                INSERT INTO public.model_features
+                VALUES (:city, :date, :p, :r, '2024-01-01T00:00:00')
+            """),
+            rows,
+        )
+    return engine
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self._orig_dir = fc.CACHE_DIR
+        fc.CACHE_DIR = Path(self.tmp.name)
+        self.engine = make_engine()
+        self.queries = []
+        event.listen(
+            self.engine,
+            "before_cursor_execute",
+            lambda conn, cur, stmt, *a: self.queries.append(stmt),
+        )
+
+    def tearDown(self):
+        fc.CACHE_DIR = self._orig_dir
+        self.tmp.cleanup()
+
+    def extracts(self):
+        return sum("FROM public.model_features ORDER BY" in q for q in self.queries)
+
+    def test_extract_once_then_hit(self):
+        cols = ["date", "city", "hpi_benchmark"]
+        df = fc.load_model_features(self.engine, cols)
+        again = fc.load_model_features(self.engine, cols)
+
+        self.assertEqual(self.extracts(), 1)
+        self.assertEqual(list(df.columns), cols)
+        pd.testing.assert_frame_equal(df, again)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["date"]))
+        # ordered by city, date like the original queries
+        self.assertEqual(df["city"].tolist()[:3], ["Calgary"] * 3)
+        self.assertEqual(len(list(fc.CACHE_DIR.glob("*.arrow"))), 1)
+
+    def test_column_set_is_part_of_the_key(self):
+        fc.load_model_features(self.engine, ["date", "city", "hpi_benchmark"])
+        rent = fc.load_model_features(self.engine, ["city", "rent_avg_city"])
+
+        self.assertEqual(self.extracts(), 2)
+        self.assertEqual(list(rent.columns), ["city", "rent_avg_city"])
+        self.assertEqual(len(list(fc.CACHE_DIR.glob("*.arrow"))), 2)
+
+    def test_new_data_version_reextracts(self):
+        fc.load_model_features(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                    INSERT INTO public.model_features
+                    VALUES ('Toronto', '2020-04-01', 400, 40, '2024-02-01T00:00:00')
+                """))
+        df = fc.load_model_features(self.engine)
+
+        self.assertEqual(self.extracts(), 2)
+        self.assertEqual(len(df), 7)
+        # superseded extract is pruned
+        self.assertEqual(len(list(fc.CACHE_DIR.glob("*.arrow"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
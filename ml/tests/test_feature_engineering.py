@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for segment-wise feature engineering (lags, rolling, YoY, z-scores).
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from ml.src.features.segment_ops import (
+    Segments,
+    segment_pct_change,
+    segment_rolling_mean,
+    segment_shift,
+    segment_stats,
+    warmup_mask,
+)
+
+
+def sample_panel():
+    """Three cities of uneven length with a few gaps."""
+    rng = np.random.default_rng(7)
+    frames = []
+    for city, n in [("Calgary", 30), ("Toronto", 5), ("Vancouver", 40)]:
+        frames.append(
+            pd.DataFrame(
+                {
+                    "city": city,
+                    "date": pd.date_range("2010-01-01", periods=n, freq="MS"),
+                    "value": rng.normal(500, 50, n),
+                }
+            )
+        )
+    df = pd.concat(frames, ignore_index=True)
+    df.loc[[3, 17, 50], "value"] = np.nan
+    return df
+
+
+class TestSegmentOps(unittest.TestCase):
+    """Segment ops must match the pandas groupby calls they replace"""
+
+    def setUp(self):
+        self.df = sample_panel()
+        self.seg = Segments(self.df["city"].to_numpy())
+        self.x = self.df["value"].to_numpy()
+        self.g = self.df.groupby("city")["value"]
+
+    def test_shift(self):
+        for k in (1, 3, 6):
+            np.testing.assert_allclose(
+                segment_shift(self.x, self.seg, k), self.g.shift(k).to_numpy()
+            )
+
+    def test_pct_change(self):
+        expected = self.g.shift(0) / self.g.shift(12) - 1
+        np.testing.assert_allclose(
+            segment_pct_change(self.x, self.seg, 12), expected.to_numpy()
+        )
+
+    def test_rolling_mean(self):
+        for w in (3, 6):
+            expected = self.g.rolling(w).mean().reset_index(level=0, drop=True)
+            np.testing.assert_allclose(
+                segment_rolling_mean(self.x, self.seg, w), expected.to_numpy()
+            )
+
+    def test_stats(self):
+        n, mean, m2 = segment_stats(self.x, self.seg)
+        np.testing.assert_array_equal(n[:, 0], self.g.count().to_numpy())
+        np.testing.assert_allclose(mean[:, 0], self.g.mean().to_numpy())
+        np.testing.assert_allclose(
+            np.sqrt(m2[:, 0] / (n[:, 0] - 1)), self.g.std().to_numpy()
+        )
+
+    def test_warmup_mask(self):
+        mask = warmup_mask(self.seg, 12)
+        expected = self.df.groupby("city").cumcount() >= 12
+        np.testing.assert_array_equal(mask, expected.to_numpy())
+        self.assertFalse(mask[self.df["city"] == "Toronto"].any())
+
+
+if __name__ == "__main__":
+    unittest.main()
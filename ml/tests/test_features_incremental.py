@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the incremental model_features path: appending new months
+with merged z-score state must match a full rebuild.
+"""
+
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# the ETL module builds its engine at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from ml.src.features import features_to_model_etl as etl  # noqa: E402
+
+RAW_COLS = [
+    "hpi_benchmark",
+    "rent_avg_city",
+    "mortgage_rate",
+    "unemployment_rate",
+    "overnight_rate",
+    "population",
+    "median_income",
+    "migration_rate",
+    "gdp_growth",
+    "cpi_yoy",
+]
+
+
+def city_panel(months):
+    rng = np.random.default_rng(5)
+    frames = []
+    for city in ["Calgary", "Toronto"]:
+        df = pd.DataFrame({"city": city, "date": months})
+        for col in RAW_COLS:
+            df[col] = 100 + rng.normal(0, 3, len(months)).cumsum()
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def full_build(raw):
+    feat = etl.add_feature_engineering(raw)
+    cols = [c for c in etl.ZSCORE_COLS if c in feat.columns]
+    stats = etl.column_stats(feat, cols)
+    rows = etl.finalize(etl.apply_zscores(feat, stats, cols))
+    return rows, etl._with_stats_dates(stats, feat)
+
+
+class TestAppendMatchesRebuild(unittest.TestCase):
+    def test_append_zscores_equal_full_recompute(self):
+        months = pd.date_range("2018-01-01", periods=60, freq="MS")
+        raw = city_panel(months)
+        first = raw[raw["date"] < months[48]]
+
+        # state after an earlier run over the first 48 months
+        existing, state = full_build(first)
+
+        # append the last 12 months (lookback window included, as loaded)
+        since = months[47] - pd.DateOffset(months=etl.LOOKBACK_MONTHS)
+        feat = etl.add_feature_engineering(raw[raw["date"] >= since])
+        appended, _ = etl.append_rows(feat, existing, state)
+
+        expected, _ = full_build(raw)
+        zcols = [c for c in expected.columns if c.endswith("_z")]
+        key = ["city", "date"]
+        got = appended.sort_values(key).reset_index(drop=True)
+        exp = expected.sort_values(key).reset_index(drop=True)
+
+        self.assertEqual(len(got), len(exp))
+        pd.testing.assert_frame_equal(got[key], exp[key])
+        np.testing.assert_allclose(
+            got[zcols].to_numpy(dtype=float),
+            exp[zcols].to_numpy(dtype=float),
+            rtol=1e-9,
+            atol=1e-9,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the LSTM training runtime (model reuse, deterministic mode).
+"""
+
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from ml.src.models.forecasting import lstm_common
+
+
+def build_small():
+    import tensorflow as tf
+
+    model = tf.keras.Sequential(
+        [tf.keras.Input((6, 2)), tf.keras.layers.LSTM(4), tf.keras.layers.Dense(1)]
+    )
+    model.compile(optimizer="adam", loss="mse")
+    return model
+
+
+class TestLstmTraining(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.X = rng.normal(size=(40, 6, 2)).astype("float32")
+        self.y = rng.normal(size=40).astype("float32")
+
+    def fit(self, key):
+        lstm_common.seed_training()
+        model = lstm_common.reusable_model(key, build_small)
+        cb = lstm_common.EpochThroughput(len(self.X), "test")
+        model.fit(self.X, self.y, epochs=2, batch_size=8, verbose=0, callbacks=[cb])
+        return model, cb
+
+    @mock.patch.dict(os.environ, {"HIRD_LSTM_DETERMINISTIC": "1"})
+    def test_reused_model_is_reset_and_reproducible(self):
+        first, cb = self.fit("test-reuse")
+        weights = [w.copy() for w in first.get_weights()]
+        self.assertEqual(len(cb.epoch_secs), 2)
+        self.assertTrue((cb.samples_per_sec() > 0).all())
+
+        second, _ = self.fit("test-reuse")
+        self.assertIs(first, second)
+        self.assertEqual(int(second.optimizer.iterations.numpy()), 2 * 5)
+        for a, b in zip(weights, second.get_weights()):
+            np.testing.assert_array_equal(a, b)
+
+
+if __name__ == "__main__":
+    unittest.main()
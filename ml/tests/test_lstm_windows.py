@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the sliding-window LSTM training data builder.
+"""
+
+import unittest
+import numpy as np
+
+from ml.src.models.forecasting.lstm_common import (
+    make_windows,
+    next_pct_change,
+    next_values,
+    stack_windows,
+)
+
+SEQ_LEN = 12
+
+
+def loop_pairs(values, target):
+    """Reference: the original per-window Python loop."""
+    X, y = [], []
+    for i in range(len(values) - SEQ_LEN):
+        X.append(values[i : i + SEQ_LEN])
+        last_target = target[i + SEQ_LEN - 1]
+        y.append((target[i + SEQ_LEN] - last_target) / last_target)
+    return np.array(X), np.array(y)
+
+
+class TestLstmWindows(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.values = rng.normal(100, 5, size=(60, 4))
+        self.target = self.values[:, 0]
+
+    def test_matches_loop_and_is_a_view(self):
+        X = make_windows(self.values, SEQ_LEN)
+        y = next_pct_change(self.target, SEQ_LEN)
+        X_ref, y_ref = loop_pairs(self.values, self.target)
+
+        self.assertEqual(X.shape, (48, SEQ_LEN, 4))
+        np.testing.assert_array_equal(X, X_ref)
+        np.testing.assert_allclose(y, y_ref)
+        self.assertTrue(np.shares_memory(X, self.values))
+
+    def test_univariate_and_short_series(self):
+        series = np.arange(20.0)
+        X = make_windows(series, SEQ_LEN)
+        self.assertEqual(X.shape, (8, SEQ_LEN))
+        np.testing.assert_array_equal(X[-1], series[7:19])
+        np.testing.assert_array_equal(next_values(series, SEQ_LEN), series[12:])
+
+        self.assertEqual(make_windows(series[:SEQ_LEN], SEQ_LEN).shape, (0, SEQ_LEN))
+
+    def test_stack_windows_pools_cities(self):
+        a = np.arange(30.0)
+        b = np.arange(100.0, 115.0)
+        short = np.arange(5.0)
+        X, y, owner = stack_windows([(a, a), (short, short), (b, b)], SEQ_LEN)
+
+        self.assertEqual(X.shape, (18 + 3, SEQ_LEN))
+        np.testing.assert_array_equal(np.bincount(owner), [18, 0, 3])
+        np.testing.assert_array_equal(X[18], b[:SEQ_LEN])
+        self.assertEqual(y[18], b[SEQ_LEN])
+
+
+if __name__ == "__main__":
+    unittest.main()
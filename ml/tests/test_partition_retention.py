@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for run-partition retention planning and model-family bounds.
+"""
+
+import datetime as dt
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from ml.pipelines import partition_retention as pr
+
+TODAY = dt.date(2025, 11, 15)
+
+
+def parts(parent, months):
+    return pd.DataFrame(
+        {
+            "parent": parent,
+            "partition": [f"{parent}_p{m:%Y_%m}" for m in months],
+            "month": months,
+        }
+    )
+
+
+class TestExpiredPartitions(unittest.TestCase):
+    def setUp(self):
+        months = [dt.date(2024, m, 1) for m in range(1, 13)] + [
+            dt.date(2025, m, 1) for m in range(1, 12)
+        ]
+        self.parts = pd.concat(
+            [
+                parts("model_predictions_arima", months),
+                parts("model_predictions_backtest", months),
+            ],
+            ignore_index=True,
+        )
+
+    def test_retention_windows(self):
+        expired = pr.expired_partitions(self.parts, set(), 6, 12, today=TODAY)
+        by_parent = expired.groupby("parent")["month"].max()
+
+        # forecasts: everything before 2025-05; backtests: before 2024-11
+        self.assertEqual(by_parent["model_predictions_arima"], dt.date(2025, 4, 1))
+        self.assertEqual(by_parent["model_predictions_backtest"], dt.date(2024, 10, 1))
+        self.assertEqual(len(expired), 16 + 10)
+
+    def test_latest_run_month_is_kept(self):
+        protected = {("model_predictions_arima", dt.date(2025, 1, 1))}
+        expired = pr.expired_partitions(self.parts, protected, 6, 12, today=TODAY)
+
+        self.assertNotIn("model_predictions_arima_p2025_01", set(expired.partition))
+        self.assertIn("model_predictions_arima_p2024_12", set(expired.partition))
+
+
+class TestEnsurePartitions(unittest.TestCase):
+    def test_missing_partitions(self):
+        months = pr.run_months(2, today=TODAY)
+        self.assertEqual(
+            months, [dt.date(2025, m, 1) for m in (11, 12)] + [dt.date(2026, 1, 1)]
+        )
+        existing = parts("anomaly_signals", [dt.date(2025, 11, 1)])
+        missing = pr.missing_partitions(existing, ["anomaly_signals"], months)
+        self.assertEqual(
+            missing,
+            [
+                ("anomaly_signals", dt.date(2025, 12, 1)),
+                ("anomaly_signals", dt.date(2026, 1, 1)),
+            ],
+        )
+
+    def test_dry_run_creates_nothing(self):
+        engine = mock.Mock()
+        existing = parts("anomaly_signals", [dt.date(2025, 11, 1)])
+        with (
+            mock.patch.object(pr, "list_month_partitions", return_value=existing),
+            mock.patch.object(
+                pr, "run_partition_parents", return_value=["anomaly_signals"]
+            ),
+        ):
+            missing = pr.ensure_partitions(engine, 1, today=TODAY, dry_run=True)
+
+        self.assertEqual(missing, [("anomaly_signals", dt.date(2025, 12, 1))])
+        engine.begin.assert_not_called()
+
+
+class TestModelFamilies(unittest.TestCase):
+    def test_parse_list_bound(self):
+        self.assertEqual(
+            pr.parse_list_bound("FOR VALUES IN ('arima', 'arima1')"),
+            {"arima", "arima1"},
+        )
+        self.assertEqual(pr.parse_list_bound("FOR VALUES IN ('o''brien')"), {"o'brien"})
+        self.assertIsNone(pr.parse_list_bound("DEFAULT"))
+
+    def test_missing_family_values(self):
+        current = {"arima": {"arima", "arima1"}, "lstm": {"lstm", "lstm_old"}}
+        families = {
+            "arima": ["arima", "arima1"],
+            "lstm": ["lstm", "lstm_global"],
+            "naive": ["naive"],
+        }
+        updates = pr.missing_family_values(current, families)
+
+        self.assertNotIn("arima", updates)
+        # existing values stay in the bound
+        self.assertEqual(updates["lstm"], ["lstm", "lstm_global", "lstm_old"])
+        self.assertEqual(updates["naive"], ["naive"])
+
+    def test_partition_month(self):
+        self.assertEqual(
+            pr._partition_month("anomaly_signals_p2025_03"), dt.date(2025, 3, 1)
+        )
+        self.assertIsNone(pr._partition_month("anomaly_signals_default"))
+
+
+if __name__ == "__main__":
+    unittest.main()
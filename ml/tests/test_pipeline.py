@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the macro pipeline: horizon slicing and the single-fit path.
+"""
+
+import os
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("HIRD_PROPHET_UNCERTAINTY_SAMPLES", "0")
+
+from ml.src.models import pipeline  # noqa: E402
+from ml.src.utils.data_loader import clear_timeseries_cache  # noqa: E402
+
+
+def monthly_forecast(start, months, date_col="predict_date"):
+    dates = pd.date_range(start, periods=months, freq="MS")
+    return pd.DataFrame({date_col: dates, "yhat": np.arange(months, dtype=float)})
+
+
+class TestSliceHorizon(unittest.TestCase):
+    def test_keeps_months_up_to_the_horizon(self):
+        fc = monthly_forecast("2025-02-01", pipeline.MAX_HORIZON)
+        for months in pipeline.HORIZONS:
+            out = pipeline._slice_horizon(fc, "2025-01-01", months)
+            self.assertEqual(len(out), months)
+            end = pd.Timestamp("2025-01-01") + pd.DateOffset(months=months)
+            self.assertEqual(out["predict_date"].max(), end)
+
+    def test_accepts_raw_prophet_frame(self):
+        fc = monthly_forecast("2025-02-01", 24, date_col="ds")
+        out = pipeline._slice_horizon(fc, "2025-01-01", 12)
+        self.assertEqual(len(out), 12)
+
+    def test_returns_a_copy(self):
+        fc = monthly_forecast("2025-02-01", 24)
+        out = pipeline._slice_horizon(fc, "2025-01-01", 12)
+        out["model_name"] = "Prophet"
+        self.assertNotIn("model_name", fc.columns)
+
+
+class TestFitOne(unittest.TestCase):
+    def test_one_fit_serves_every_horizon(self):
+        dates = pd.date_range("2020-01-01", periods=48, freq="MS")
+        df = pd.DataFrame({"ds": dates, "y": 1500 + 10 * np.arange(48.0)})
+
+        out = pipeline._fit_one("rent_index", "Kelowna", df)
+
+        fc = out["forecasts"]
+        counts = fc.groupby("horizon_months").size().to_dict()
+        self.assertEqual(counts, {h: h for h in pipeline.HORIZONS})
+        self.assertTrue((fc["predict_date"] > dates[-1]).all())
+
+        # shorter horizons are prefixes of the single MAX_HORIZON path
+        longest = fc[fc.horizon_months == pipeline.MAX_HORIZON]
+        shortest = fc[fc.horizon_months == min(pipeline.HORIZONS)]
+        np.testing.assert_array_equal(
+            shortest["yhat"].values, longest["yhat"].values[: len(shortest)]
+        )
+
+        self.assertEqual(set(out["risks"]["horizon_months"]), set(pipeline.HORIZONS))
+        self.assertEqual(
+            set(out["anomalies"]["horizon_months"]), set(pipeline.HORIZONS)
+        )
+
+
+class TestPrefetchAndWriter(unittest.TestCase):
+    def setUp(self):
+        clear_timeseries_cache()
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        with self.engine.begin() as conn:
+            conn.execute(text("ATTACH DATABASE ':memory:' AS public"))
+            for table in ("rent_index", "house_price_index"):
+                conn.execute(
+                    text(
+                        f"CREATE TABLE public.{table} "
+                        "(city TEXT, date TEXT, index_value REAL)"
+                    )
+                )
+                conn.execute(
+                    text(f"INSERT INTO public.{table} VALUES (:city, :date, 100.0)"),
+                    [
+                        {"city": city, "date": f"2020-{m:02d}-01"}
+                        for city in ("Calgary", "Toronto")
+                        for m in range(1, 5)
+                    ],
+                )
+
+    def test_prefetch_is_one_query(self):
+        queries = []
+        event.listen(
+            self.engine,
+            "before_cursor_execute",
+            lambda conn, cur, stmt, *a: queries.append(stmt),
+        )
+        targets = [
+            ("rent_index", "Calgary"),
+            ("rent_index", "Toronto"),
+            ("house_price_index", "Calgary"),
+        ]
+
+        series, fetch_secs = pipeline._prefetch_series(self.engine, targets)
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(set(series), set(targets))
+        self.assertEqual(set(fetch_secs), set(targets))
+        self.assertTrue(all(len(df) == 4 for df in series.values()))
+
+    def test_writer_drains_in_order_and_survives_errors(self):
+        written = []
+        lock = threading.Lock()
+
+        def fake_write(engine, metric, city, out):
+            if city == "Broken":
+                raise RuntimeError("db down")
+            with lock:
+                written.append((metric, city, out))
+
+        with mock.patch.object(pipeline, "_write_one", fake_write):
+            writer = pipeline._SeriesWriter(self.engine, maxsize=1)
+            for city in ("Calgary", "Broken", "Toronto"):
+                writer.put("rent_index", city, {"forecasts": city})
+            writer.close()
+
+        self.assertEqual([c for _, c, _ in written], ["Calgary", "Toronto"])
+        self.assertEqual(len(writer.timings), 3)
+        self.assertTrue(all(t["write"] >= 0 for t in writer.timings.values()))
+        self.assertFalse(writer.thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the columnar prediction-frame builder and the bulk writer.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from ml.src.utils.db_writer import (
+    backtest_keys,
+    copy_predictions,
+    scorable_backtest_rows,
+)
+from ml.src.utils.prediction_frame import (
+    PREDICTION_COLUMNS,
+    month_offsets,
+    months_between,
+    prediction_frame,
+)
+
+
+class TestMonthArithmetic(unittest.TestCase):
+    def test_month_offsets_match_dateoffset(self):
+        for start in ["2024-11-01", "2024-01-31"]:
+            start = pd.Timestamp(start)
+            expected = [start + pd.DateOffset(months=h) for h in range(1, 15)]
+            self.assertEqual(list(month_offsets(start, 14)), expected)
+
+    def test_months_between(self):
+        dates = pd.to_datetime(["2021-01-01", "2021-12-01", "2023-03-01"])
+        got = months_between(dates, pd.Timestamp("2020-12-01"))
+        self.assertEqual(got.tolist(), [1, 12, 27])
+
+
+class TestPredictionFrame(unittest.TestCase):
+    def test_broadcast_and_clip(self):
+        df = prediction_frame(
+            model_name="arima1",
+            target="price",
+            city="Calgary",
+            predict_date=month_offsets("2024-12-01", 3),
+            horizon_months=np.arange(1, 4),
+            yhat=[-5.0, 10.0, 20.0],
+            yhat_lower=[-1.0, 5.0, 15.0],
+            yhat_upper=[1.0, 15.0, 25.0],
+        )
+        self.assertEqual(list(df.columns), PREDICTION_COLUMNS)
+        self.assertEqual(df["city"].tolist(), ["Calgary"] * 3)
+        self.assertEqual(df["yhat"].tolist(), [0.0, 10.0, 20.0])
+        self.assertEqual(df["yhat_lower"].iloc[0], 0.0)
+        self.assertTrue(df["y_true"].isna().all())
+        self.assertTrue(df["beds"].isna().all())
+        self.assertFalse(df["is_micro"].any())
+
+    def test_length_mismatch_raises(self):
+        with self.assertRaises(ValueError):
+            prediction_frame(
+                model_name="lstm",
+                target="rent",
+                city=["A", "B"],
+                predict_date=month_offsets("2024-12-01", 3),
+                horizon_months=np.arange(1, 4),
+                yhat=[1.0, 2.0, 3.0],
+            )
+
+    def test_copy_falls_back_to_insert(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as conn:
+            conn.execute(text("ATTACH DATABASE ':memory:' AS public"))
+
+        df = prediction_frame(
+            model_name="lstm_backtest",
+            target="rent",
+            city="Toronto",
+            predict_date=month_offsets("2020-12-01", 4),
+            horizon_months=np.arange(1, 5),
+            yhat=[1.0, 2.0, 3.0, 4.0],
+            y_true=[1.5, 2.5, 3.5, 4.5],
+        )
+        self.assertEqual(copy_predictions(engine, df), 4)
+
+        with engine.connect() as conn:
+            total = conn.execute(
+                text("SELECT SUM(y_true) FROM public.model_predictions")
+            ).scalar()
+        self.assertAlmostEqual(total, 12.0)
+
+    def test_backtest_keys_are_exact(self):
+        rows = [
+            ("arima_backtest", "Calgary", "price", "2021-12-01"),
+            ("arima_backtest", "Calgary", "price", "2021-12-01"),
+            ("arima_backtest", "Toronto", "rent", "2022-12-01"),
+        ]
+        df = pd.DataFrame(rows, columns=["model_name", "city", "target", "origin"])
+        keys = backtest_keys(df)
+
+        # one entry per distinct key, not the models x origins product
+        self.assertEqual(keys["city"], ["Calgary", "Toronto"])
+        self.assertEqual(keys["target"], ["price", "rent"])
+        self.assertEqual(
+            keys["origin"],
+            [pd.Timestamp("2021-12-01").date(), pd.Timestamp("2022-12-01").date()],
+        )
+
+    def test_backtest_rows_without_actuals_are_dropped(self):
+        df = prediction_frame(
+            model_name="prophet_backtest",
+            target="rent",
+            city="Toronto",
+            predict_date=month_offsets("2020-12-01", 4),
+            horizon_months=np.arange(1, 5),
+            yhat=[1.0, 2.0, np.nan, 4.0],
+            y_true=[1.5, np.nan, 3.5, 4.5],
+        )
+        kept = scorable_backtest_rows(df)
+        self.assertEqual(kept["horizon_months"].tolist(), [1, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the stage profiler and its training-executor integration.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ml.src.models.training_executor import run_jobs
+from ml.src.utils import profiling
+
+
+def staged_job(city, target):
+    with profiling.stage("fit", "naive", city, target):
+        sum(range(10_000))
+    with profiling.stage("predict", "naive", city, target):
+        pass
+    return city
+
+
+def plain_job(x):
+    return x * 2
+
+
+class TestStage(unittest.TestCase):
+    def setUp(self):
+        profiling.drain()
+
+    def test_records_and_drains(self):
+        with profiling.stage("load", model="arima1"):
+            sum(range(10_000))
+        records = profiling.drain()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].stage, "load")
+        self.assertEqual(records[0].model, "arima1")
+        self.assertGreaterEqual(records[0].wall_s, 0.0)
+        self.assertGreater(records[0].process_peak_rss_mb, 0.0)
+        self.assertEqual(profiling.drain(), [])
+
+
+class TestRunProfile(unittest.TestCase):
+    def test_collects_job_stages(self):
+        jobs = [((c, "price"), (c, "price")) for c in ["Calgary", "Toronto"]]
+        results = run_jobs(staged_job, jobs, max_workers=1)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(results[0].stages), 2)
+        self.assertGreaterEqual(results[0].cpu_seconds, 0.0)
+
+        prof = profiling.RunProfile("test")
+        with prof.stage("load"):
+            pass
+        prof.add_jobs(results, model="naive")
+        df = prof.frame()
+
+        self.assertEqual(len(df), 5)
+        self.assertEqual(set(df["stage"]), {"load", "fit", "predict"})
+        self.assertEqual(set(df["city"].dropna()), {"Calgary", "Toronto"})
+        self.assertTrue((df["run_name"] == "test").all())
+
+    def test_jobs_without_stages_become_rows(self):
+        results = run_jobs(plain_job, [(("x", "rent"), (1,))], max_workers=1)
+        prof = profiling.RunProfile("test")
+        prof.add_jobs(results, model="m", key_fields=("target", "city"))
+        row = prof.frame().iloc[0]
+        self.assertEqual(row["stage"], "job")
+        self.assertEqual((row["target"], row["city"]), ("x", "rent"))
+
+    def test_finish_writes_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.object(profiling, "REPORT_DIR", Path(tmp)):
+                prof = profiling.RunProfile("test")
+                with prof.stage("write"):
+                    pass
+                prof.finish(sink="json")
+                (path,) = Path(tmp).glob("test-*.json")
+                rows = json.loads(path.read_text())
+        self.assertEqual(rows[0]["stage"], "write")
+
+
+if __name__ == "__main__":
+    unittest.main()
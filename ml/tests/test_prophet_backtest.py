@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the fixed-cutoff Prophet backtest (no look-ahead).
+"""
+
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# the backtest script builds its engine at import time
+os.environ.setdefault("NEON_DATABASE_URL", "sqlite://")
+
+from ml.src.models import train_model_prophet_backtest as bt  # noqa: E402
+
+
+class TestFixedCutoffBacktest(unittest.TestCase):
+    def test_regressors_held_at_cutoff(self):
+        dates = pd.date_range("2015-01-01", "2022-12-01", freq="MS")
+        df = pd.DataFrame({"date": dates, "city": "Calgary"})
+        df["hpi_benchmark"] = 100.0 + np.arange(len(dates))
+        for col in bt.REGRESSORS:
+            df[col] = np.arange(len(dates), dtype=float)
+        futures = []
+
+        def fake_fit_predict(train, future, regressors, label=""):
+            futures.append(future)
+            fc = future[["ds"]].assign(yhat=1.0, yhat_lower=0.0, yhat_upper=2.0)
+            return None, fc
+
+        with mock.patch.object(bt.prophet_runner, "fit_predict", fake_fit_predict):
+            frame = bt.backtest_city_target(df, "Calgary", "hpi_benchmark", "price")
+
+        (future,) = futures
+        at_cutoff = df.loc[df["date"] == bt.CUTOFF, bt.REGRESSORS].iloc[0]
+        self.assertEqual(future["ds"].min(), bt.CUTOFF + pd.DateOffset(months=1))
+        for col in bt.REGRESSORS:
+            self.assertTrue((future[col] == at_cutoff[col]).all())
+        self.assertEqual(frame["horizon_months"].tolist(), list(range(1, 25)))
+
+
+if __name__ == "__main__":
+    unittest.main()
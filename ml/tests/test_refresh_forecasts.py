@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for new-observation detection in the incremental refresh.
+"""
+
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# trainers build their engine at import time
+os.environ.setdefault("NEON_DATABASE_URL", "sqlite://")
+
+from ml.src.models.forecasting import refresh_forecasts  # noqa: E402
+from ml.src.models.forecasting.refresh_forecasts import stale_series  # noqa: E402
+
+
+class TestStaleSeries(unittest.TestCase):
+    def setUp(self):
+        dates = pd.date_range("2024-01-01", "2025-03-01", freq="MS")
+        rows = []
+        for city in ["Calgary", "Toronto", "Victoria"]:
+            for d in dates:
+                rows.append({"city": city, "date": d, "hpi": 1.0, "rent": 2.0})
+        self.features = pd.DataFrame(rows)
+        # CMHC rent lags a month for Toronto
+        last = (self.features.city == "Toronto") & (self.features.date == dates[-1])
+        self.features.loc[last, "rent"] = np.nan
+
+        self.origins = pd.DataFrame(
+            {
+                "city": ["Calgary", "Calgary", "Toronto", "Toronto"],
+                "target": ["price", "rent", "price", "rent"],
+                "origin": pd.to_datetime(
+                    ["2025-03-01", "2025-02-01", "2025-02-01", "2025-02-01"]
+                ),
+            }
+        )
+
+    def test_only_appended_or_new_series(self):
+        stale = stale_series(
+            self.features,
+            self.origins,
+            targets=[("hpi", "price"), ("rent", "rent")],
+        )
+        got = set(zip(stale.city, stale.target))
+        self.assertEqual(
+            got,
+            {
+                ("Calgary", "rent"),
+                ("Toronto", "price"),
+                ("Victoria", "price"),
+                ("Victoria", "rent"),
+            },
+        )
+        calgary = stale[(stale.city == "Calgary") & (stale.target == "rent")]
+        self.assertEqual(calgary["new_months"].iloc[0], 1)
+        self.assertTrue(stale[stale.city == "Victoria"]["origin"].isna().all())
+
+
+class TestGlobalRowsExcluded(unittest.TestCase):
+    def test_refresh_skips_pooled_lstm_rows(self):
+        from ml.src.models.forecasting import train_model_lstm
+
+        self.assertEqual(
+            refresh_forecasts.GLOBAL_FEATURES_VERSION,
+            train_model_lstm.GLOBAL_FEATURES_VERSION,
+        )
+        for sql in (refresh_forecasts._ORIGIN_SQL, refresh_forecasts._DELETE_SQL):
+            self.assertIn("features_version IS DISTINCT FROM :global_version", str(sql))
+
+
+if __name__ == "__main__":
+    unittest.main()
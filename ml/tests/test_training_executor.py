@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the shared (city, target) training executor.
+"""
+
+import os
+import signal
+import threading
+import time
+import unittest
+from unittest import mock
+
+from ml.src.models import training_executor
+from ml.src.models.training_executor import gather_rows, run_jobs
+
+
+def thread_env():
+    return os.environ.get("OMP_NUM_THREADS")
+
+
+def stuck(seconds):
+    """Stands in for native code the job's SIGALRM cannot interrupt."""
+    signal.signal(signal.SIGALRM, signal.SIG_IGN)
+    time.sleep(seconds)
+    return seconds
+
+
+class TestTrainingExecutor(unittest.TestCase):
+    def test_inline_results_in_job_order(self):
+        jobs = [(("A", "price"), (7, 2)), (("B", "rent"), (9, 4))]
+        res = run_jobs(divmod, jobs, max_workers=1)
+        self.assertEqual([r.key for r in res], [("A", "price"), ("B", "rent")])
+        self.assertEqual([r.value for r in res], [(3, 1), (2, 1)])
+
+    def test_failure_is_isolated(self):
+        jobs = [("ok", (4, 2)), ("bad", (1, 0))]
+        res = run_jobs(divmod, jobs, max_workers=1)
+        self.assertTrue(res[0].ok)
+        self.assertFalse(res[1].ok)
+        self.assertIn("ZeroDivisionError", res[1].error)
+
+    def test_timeout(self):
+        res = run_jobs(time.sleep, [("slow", (2,))], max_workers=1, timeout=0.2)
+        self.assertFalse(res[0].ok)
+        self.assertIn("timed out", res[0].error)
+
+    def test_process_pool_matches_inline(self):
+        before = os.environ.get("OMP_NUM_THREADS")
+        jobs = [(i, (i * 10, 3)) for i in range(6)]
+        inline = run_jobs(divmod, jobs, max_workers=1)
+        pooled = run_jobs(divmod, jobs, max_workers=2, threads_per_worker=2)
+        self.assertEqual([r.value for r in pooled], [r.value for r in inline])
+        # thread limits are only exported for the pool's lifetime
+        self.assertEqual(os.environ.get("OMP_NUM_THREADS"), before)
+
+    def test_inline_run_is_thread_pinned(self):
+        before = os.environ.get("OMP_NUM_THREADS")
+        res = run_jobs(thread_env, [("a", ())], max_workers=1, threads_per_worker=3)
+        self.assertEqual(res[0].value, "3")
+        self.assertEqual(os.environ.get("OMP_NUM_THREADS"), before)
+
+    def test_timeout_off_main_thread(self):
+        out = {}
+
+        def target():
+            out["res"] = run_jobs(divmod, [("a", (7, 2))], max_workers=1, timeout=5)
+
+        t = threading.Thread(target=target)
+        t.start()
+        t.join()
+        self.assertTrue(out["res"][0].ok)
+
+    def test_parent_gives_up_on_stuck_workers(self):
+        jobs = [("fast", (0.1,)), ("stuck", (60,))]
+        with mock.patch.object(training_executor, "RESULT_GRACE", 5.0):
+            t0 = time.perf_counter()
+            res = run_jobs(stuck, jobs, max_workers=2, timeout=0.5)
+        self.assertLess(time.perf_counter() - t0, 30)
+        self.assertTrue(res[0].ok)
+        self.assertFalse(res[1].ok)
+        self.assertIn("timed out", res[1].error)
+
+    def test_gather_rows_skips_failures(self):
+        jobs = [("a", ([1, 2],)), ("b", (None,)), ("c", ([3],))]
+        res = run_jobs(list, jobs, max_workers=1)
+        self.assertEqual(gather_rows(res), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()